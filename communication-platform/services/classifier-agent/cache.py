@@ -0,0 +1,118 @@
+# Classification result cache for the Classifier Agent service
+
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+import weakref
+from typing import Optional, Type
+from pydantic import BaseModel
+from communication_platform.shared.cache import TTLCache
+
+logger = logging.getLogger("classifier_agent.cache")
+
+def normalize_text(text: str) -> str:
+    """Case- and whitespace-insensitive form of the conversation text."""
+    return " ".join(text.lower().split())
+
+def classification_key(text: str, context: Optional[dict], prompt_version: str, model: str) -> str:
+    """
+    Content hash identifying one classification: the normalized conversation
+    text plus everything else that goes into the prompt (context, prompt
+    version, model), so a prompt or model change never serves stale results.
+    """
+    material = "\x1f".join([
+        prompt_version,
+        model,
+        json.dumps(context or {}, sort_keys=True, default=str),
+        normalize_text(text),
+    ])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+class ClassificationCache:
+    """
+    Two-tier cache of classification results (instances of `result_model`): an
+    in-process TTL LRU in front of an optional Redis tier shared by all
+    replicas. Redis errors are logged and treated as misses so the cache can
+    never fail a classification.
+    """
+    def __init__(
+        self,
+        result_model: Type[BaseModel],
+        maxsize: int = 10000,
+        ttl: float = 86400,
+        redis_url: Optional[str] = None,
+        key_prefix: str = "classification:",
+    ):
+        self.result_model = result_model
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.redis_url = redis_url
+        self.key_prefix = key_prefix
+        # redis.asyncio connections belong to the loop that opened them
+        self._redis_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, object]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+
+    def _redis(self):
+        if not self.redis_url:
+            return None
+        loop = asyncio.get_running_loop()
+        client = self._redis_clients.get(loop)
+        if client is None:
+            import redis.asyncio as aioredis
+            client = aioredis.from_url(self.redis_url, decode_responses=True)
+            self._redis_clients[loop] = client
+        return client
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    async def get(self, key: str) -> Optional[BaseModel]:
+        result = self.local.get(key)
+        if result is not None:
+            self._count("local_hits")
+            return result
+        client = self._redis()
+        if client is not None:
+            try:
+                raw = await client.get(self.key_prefix + key)
+            except Exception as e:
+                self._count("redis_errors")
+                logger.warning(f"Classification cache read from Redis failed: {e}")
+                raw = None
+            if raw:
+                result = self.result_model.model_validate_json(raw)
+                self.local.set(key, result)
+                self._count("redis_hits")
+                return result
+        self._count("misses")
+        return None
+
+    async def set(self, key: str, result: BaseModel):
+        self.local.set(key, result)
+        client = self._redis()
+        if client is not None:
+            try:
+                await client.set(self.key_prefix + key, result.model_dump_json(), ex=int(self.ttl))
+            except Exception as e:
+                self._count("redis_errors")
+                logger.warning(f"Classification cache write to Redis failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.local_hits + self.redis_hits + self.misses
+            return {
+                "size": len(self.local),
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "redis_errors": self.redis_errors,
+                "hit_ratio": round((self.local_hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+                "redis_enabled": bool(self.redis_url),
+            }
@@ -1,101 +1,343 @@
 # Handlers for the Classifier Agent service 
-from typing import List, Dict, Optional
+from typing import List, Dict, NamedTuple, Optional, Sequence, Tuple
 from uuid import UUID
-from sqlalchemy.orm import Session
+from datetime import datetime
+from sqlalchemy import select
 from communication_platform.shared.models import Message, ConversationCategory
 from .models import ClassificationRequest, ClassificationResponse, AIClassificationResult, RuleBasedResult
-from communication_platform.services.conversation_grouper.database import ConversationDB
+from communication_platform.services.conversation_grouper.database import ConversationDB, ConversationMessageDB
 from communication_platform.services.twilio_monitor.database import MessageDB
-from communication_platform.shared.database import SessionLocal
+from communication_platform.shared.database import AsyncSessionLocal
+from .cache import ClassificationCache, classification_key
+from .openai_client import OpenAIClient, OpenAIUnavailable
+from .rules import KeywordMatcher, RULES_SOURCE
+from .local_model import LocalClassifier, load_local_model, LOCAL_MODEL_THRESHOLD, LOCAL_SOURCE_PREFIX
 import os
 import openai
 import asyncio
+import re
 import json
-import random
+import logging
+
+logger = logging.getLogger("classifier_agent.handlers")
 
 # Confidence thresholds
 AI_CONFIDENCE_THRESHOLD = 0.7
 RULE_CONFIDENCE_THRESHOLD = 0.5
 
-# Keyword rules for fallback classification
-CLASSIFICATION_RULES: Dict[ConversationCategory, List[str]] = {
-    ConversationCategory.new_lead: ["interested", "quote", "estimate", "pricing", "new customer"],
-    ConversationCategory.quote_request: ["quote", "estimate", "price", "cost"],
-    ConversationCategory.status_update: ["status", "update", "progress", "check in"],
-    ConversationCategory.reminder: ["reminder", "appointment", "schedule", "upcoming"],
-    ConversationCategory.spam: ["unsubscribe", "spam", "stop", "remove"],
-    ConversationCategory.support: ["help", "support", "issue", "problem", "fix"],
-    ConversationCategory.other: []
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4-turbo")
+# Only the most recent messages of a conversation are classified
+CLASSIFY_MAX_MESSAGES = int(os.getenv("CLASSIFY_MAX_MESSAGES", "50"))
+CLASSIFY_MAX_CHARS = int(os.getenv("CLASSIFY_MAX_CHARS", "8000"))
+# Conversations packed into one OpenAI request by classify_batch_with_openai
+OPENAI_BATCH_SIZE = int(os.getenv("OPENAI_BATCH_SIZE", "10"))
+# Bump whenever the prompt changes so cached results from the old prompt are not reused
+PROMPT_VERSION = "1"
+
+openai_client = OpenAIClient()
+
+# Local tier, tried before OpenAI; None when LOCAL_MODEL_PATH is unset
+local_model: Optional[LocalClassifier] = load_local_model()
+
+classification_cache = ClassificationCache(
+    AIClassificationResult,
+    maxsize=int(os.getenv("CLASSIFICATION_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("CLASSIFICATION_CACHE_TTL_SECONDS", "86400")),
+    redis_url=os.getenv("CLASSIFICATION_CACHE_REDIS_URL") or None,
+)
+
+# Keyword rules for fallback classification: keyword -> weight. A keyword may
+# appear under several categories; the category with the most weight wins.
+CLASSIFICATION_RULES: Dict[ConversationCategory, Dict[str, float]] = {
+    ConversationCategory.new_lead: {"interested": 1.0, "new customer": 1.5, "pricing": 0.5, "quote": 0.5, "estimate": 0.5},
+    ConversationCategory.quote_request: {"quote": 1.0, "estimate": 1.0, "price": 0.75, "pricing": 0.5, "cost": 0.75},
+    ConversationCategory.status_update: {"status": 1.0, "update": 0.75, "progress": 1.0, "check in": 1.0},
+    ConversationCategory.reminder: {"reminder": 1.0, "appointment": 1.0, "schedule": 0.75, "upcoming": 0.75},
+    ConversationCategory.spam: {"unsubscribe": 1.5, "spam": 1.0, "stop": 1.0, "remove": 0.75},
+    ConversationCategory.support: {"help": 1.0, "support": 1.0, "issue": 1.0, "problem": 1.0, "fix": 1.0},
+    ConversationCategory.other: {}
 }
+rule_matcher = KeywordMatcher(CLASSIFICATION_RULES)
+
+# Incremental classification: new messages made up only of these words and
+# phrases (and no more than ACKNOWLEDGEMENT_MAX_TOKENS words) never change a
+# confident label. Words like "no", "problem" or "will" only count inside a phrase.
+ACKNOWLEDGEMENT_WORDS = frozenset({
+    "ok", "okay", "k", "kk", "thanks", "thx", "ty", "great", "cool", "good", "perfect",
+    "yes", "yep", "yeah", "sure", "np", "awesome", "bye", "alright", "nice",
+})
+ACKNOWLEDGEMENT_PHRASES = frozenset(tuple(phrase.split()) for phrase in (
+    "thank you", "thank you so much", "thanks so much", "sounds good", "sounds great",
+    "got it", "will do", "no problem", "see you", "see you then", "appreciate it",
+    "much appreciated",
+))
+ACKNOWLEDGEMENT_PHRASE_MAX_WORDS = max(len(phrase) for phrase in ACKNOWLEDGEMENT_PHRASES)
+ACKNOWLEDGEMENT_MAX_TOKENS = int(os.getenv("ACKNOWLEDGEMENT_MAX_TOKENS", "6"))
+WORD_PATTERN = re.compile(r"[a-z']+")
+
+class PendingClassification(NamedTuple):
+    conversation: ConversationDB
+    text: str
+    context: dict
+    classified_through: object
 
 async def classify_conversation(conversation_id: UUID, trace_id: UUID) -> ClassificationResponse:
     """
     Fetches conversation and messages, tries AI classification, falls back to rule-based, stores and returns result.
+
+    A conversation that already has a confident label is only re-classified when
+    the messages added since it was classified (after `classified_through`) are
+    significant; see needs_reclassification.
+    """
+    async with AsyncSessionLocal() as db:
+        prepared = await prepare_classification(conversation_id, db)
+        if isinstance(prepared, ClassificationResponse):
+            return prepared
+        ai_result = classify_with_local_model(prepared.text) or await classify_with_cache(prepared.text, prepared.context)
+        return await finalize_classification(prepared, ai_result, db)
+
+async def classify_conversations(conversation_ids: List[UUID], trace_id: UUID) -> Tuple[List[ClassificationResponse], List[UUID]]:
+    """
+    Classify several conversations with batched OpenAI requests (see
+    classify_batch_with_cache). Returns (results, failed_ids); a conversation
+    fails when it is missing, has no messages, or could not be stored.
     """
-    with SessionLocal() as db:
-        # Fetch conversation and messages
-        conversation = db.query(ConversationDB).filter(ConversationDB.conversation_id == conversation_id).first()
-        if not conversation:
-            raise ValueError(f"Conversation {conversation_id} not found")
-        messages_orm = conversation.get_messages() if hasattr(conversation, 'get_messages') else []
-        if not messages_orm:
-            raise ValueError(f"No messages found for conversation {conversation_id}")
-        # Convert ORM messages to Pydantic Message models
-        messages = [
-            Message(
-                message_id=m.message_id,
-                type=m.type,
-                **{"from": m.from_phone, "to": m.to_phone},
-                content=m.content,
-                timestamp=m.timestamp.timestamp() if hasattr(m.timestamp, 'timestamp') else float(m.timestamp),
-                customer_id=m.customer_id,
-                conversation_id=m.conversation_id
-            ) for m in messages_orm
-        ]
-        text = extract_conversation_text(messages)
-        context = {"customer_id": conversation.customer_id}
-        # Try AI classification
-        ai_result = await classify_with_openai(text, context)
-        if ai_result and ai_result.confidence >= AI_CONFIDENCE_THRESHOLD:
-            # Store result
-            conversation.category = ai_result.category.value if isinstance(ai_result.category, ConversationCategory) else str(ai_result.category)
-            conversation.confidence = ai_result.confidence
-            db.commit()
-            return ClassificationResponse(
-                conversation_id=conversation_id,
-                category=ai_result.category if isinstance(ai_result.category, ConversationCategory) else ConversationCategory(ai_result.category),
-                confidence=ai_result.confidence,
-                reasoning=ai_result.reasoning
-            )
-        # Fallback to rule-based
-        rule_result = classify_with_rules(text, context)
-        if rule_result and rule_result.confidence >= RULE_CONFIDENCE_THRESHOLD:
-            conversation.category = rule_result.category.value if isinstance(rule_result.category, ConversationCategory) else str(rule_result.category)
-            conversation.confidence = rule_result.confidence
-            db.commit()
-            return ClassificationResponse(
-                conversation_id=conversation_id,
-                category=rule_result.category if isinstance(rule_result.category, ConversationCategory) else ConversationCategory(rule_result.category),
-                confidence=rule_result.confidence,
-                reasoning=rule_result.reasoning
-            )
-        # Default to 'other'
-        conversation.category = ConversationCategory.other.value
-        conversation.confidence = 0.0
-        db.commit()
+    results: List[ClassificationResponse] = []
+    failed: List[UUID] = []
+    pending: List[PendingClassification] = []
+    async with AsyncSessionLocal() as db:
+        for conversation_id in dict.fromkeys(conversation_ids):
+            try:
+                prepared = await prepare_classification(conversation_id, db)
+            except ValueError as e:
+                logger.warning(f"[{trace_id}] Skipping conversation {conversation_id}: {e}")
+                failed.append(conversation_id)
+                continue
+            if isinstance(prepared, ClassificationResponse):
+                results.append(prepared)
+            else:
+                pending.append(prepared)
+        ai_results = [classify_with_local_model(p.text) for p in pending]
+        escalated = [i for i, result in enumerate(ai_results) if result is None]
+        remote_results = await classify_batch_with_cache([(pending[i].text, pending[i].context) for i in escalated])
+        for i, result in zip(escalated, remote_results):
+            ai_results[i] = result
+        for prepared, ai_result in zip(pending, ai_results):
+            try:
+                results.append(await finalize_classification(prepared, ai_result, db))
+            except Exception as e:
+                logger.exception(f"[{trace_id}] Failed to store classification for {prepared.conversation.conversation_id}: {e}")
+                await db.rollback()
+                failed.append(prepared.conversation.conversation_id)
+    return results, failed
+
+async def prepare_classification(conversation_id: UUID, db):
+    """
+    Load what is needed to classify a conversation. Returns a ClassificationResponse
+    when the stored label can be kept, otherwise a PendingClassification.
+    """
+    conversation = await db.get(ConversationDB, conversation_id)
+    if not conversation:
+        raise ValueError(f"Conversation {conversation_id} not found")
+    if not conversation.message_count:
+        raise ValueError(f"No messages found for conversation {conversation_id}")
+    if has_confident_label(conversation):
+        kept = await keep_prior_label(conversation, db)
+        if kept:
+            return kept
+    text, classified_through = await load_conversation_text(conversation_id, db)
+    if classified_through is None:
+        raise ValueError(f"No messages found for conversation {conversation_id}")
+    return PendingClassification(
+        conversation=conversation,
+        text=text,
+        context={"customer_id": conversation.customer_id},
+        classified_through=classified_through
+    )
+
+async def load_conversation_text(conversation_id: UUID, db) -> Tuple[str, Optional[datetime]]:
+    """
+    The prompt text for a conversation and the timestamp of its newest message,
+    from one query that reads only the content of the latest
+    CLASSIFY_MAX_MESSAGES messages. No ORM objects or Pydantic models are built.
+    """
+    result = await db.execute(
+        select(MessageDB.content, MessageDB.timestamp)
+        .join(ConversationMessageDB, ConversationMessageDB.c.message_id == MessageDB.message_id)
+        .where(ConversationMessageDB.c.conversation_id == conversation_id)
+        .order_by(MessageDB.timestamp.desc())
+        .limit(CLASSIFY_MAX_MESSAGES)
+    )
+    rows = result.all()
+    if not rows:
+        return "", None
+    return build_conversation_text([row.content for row in reversed(rows)]), rows[0].timestamp
+
+async def finalize_classification(prepared: PendingClassification, ai_result: Optional[AIClassificationResult], db) -> ClassificationResponse:
+    """Apply the confidence thresholds and rule fallback, then store the result."""
+    conversation = prepared.conversation
+    if ai_result and ai_result.confidence >= AI_CONFIDENCE_THRESHOLD:
+        # Store result
+        await record_classification(conversation, ai_result.category, ai_result.confidence, db, prepared.classified_through, ai_result.model_used)
         return ClassificationResponse(
-            conversation_id=conversation_id,
-            category=ConversationCategory.other,
-            confidence=0.0,
-            reasoning="No confident classification could be made."
+            conversation_id=conversation.conversation_id,
+            category=ai_result.category if isinstance(ai_result.category, ConversationCategory) else ConversationCategory(ai_result.category),
+            confidence=ai_result.confidence,
+            reasoning=ai_result.reasoning
+        )
+    # Fallback to rule-based
+    rule_result = classify_with_rules(prepared.text, prepared.context)
+    if rule_result and rule_result.confidence >= RULE_CONFIDENCE_THRESHOLD:
+        await record_classification(conversation, rule_result.category, rule_result.confidence, db, prepared.classified_through, RULES_SOURCE)
+        return ClassificationResponse(
+            conversation_id=conversation.conversation_id,
+            category=rule_result.category if isinstance(rule_result.category, ConversationCategory) else ConversationCategory(rule_result.category),
+            confidence=rule_result.confidence,
+            reasoning=rule_result.reasoning
+        )
+    # Default to 'other'
+    await record_classification(conversation, ConversationCategory.other, 0.0, db, prepared.classified_through, RULES_SOURCE)
+    return ClassificationResponse(
+        conversation_id=conversation.conversation_id,
+        category=ConversationCategory.other,
+        confidence=0.0,
+        reasoning="No confident classification could be made."
+    )
+
+def has_confident_label(conversation: ConversationDB) -> bool:
+    """
+    Whether the stored label can be kept without re-classifying. Only labels from
+    OpenAI or the local model qualify: a keyword-rule label is a fallback (e.g.
+    from an OpenAI outage) and is re-classified once the models are available.
+    """
+    return (
+        conversation.category is not None
+        and conversation.confidence is not None
+        and conversation.confidence >= AI_CONFIDENCE_THRESHOLD
+        and conversation.classified_through is not None
+        and conversation.classified_by is not None
+        and conversation.classified_by != RULES_SOURCE
+    )
+
+async def keep_prior_label(conversation: ConversationDB, db) -> Optional[ClassificationResponse]:
+    """
+    Return the stored label, advancing the watermark, if nothing significant was
+    added since it was assigned. Returns None when the conversation must be
+    re-classified.
+    """
+    if conversation.last_message_at is not None and conversation.last_message_at <= conversation.classified_through:
+        return prior_classification(conversation, "No new messages since last classification.")
+    result = await db.execute(
+        select(MessageDB.content, MessageDB.timestamp)
+        .join(ConversationMessageDB, ConversationMessageDB.c.message_id == MessageDB.message_id)
+        .where(
+            ConversationMessageDB.c.conversation_id == conversation.conversation_id,
+            MessageDB.timestamp > conversation.classified_through
         )
+        .order_by(MessageDB.timestamp)
+    )
+    new_messages = result.all()
+    if not new_messages:
+        return prior_classification(conversation, "No new messages since last classification.")
+    if needs_reclassification([m.content for m in new_messages], ConversationCategory(conversation.category)):
+        return None
+    conversation.classified_through = new_messages[-1].timestamp
+    await db.commit()
+    return prior_classification(conversation, f"Kept prior label; {len(new_messages)} new message(s) did not change the topic.")
+
+def needs_reclassification(new_contents: List[str], prior_category: ConversationCategory) -> bool:
+    """
+    Cheap rule pass over the messages added since the last classification.
+    Acknowledgements never escalate; otherwise escalate unless the keyword rules
+    agree with the prior category.
+    """
+    if all(is_acknowledgement(content) for content in new_contents):
+        return False
+    rule_result = classify_with_rules("\n".join(new_contents), {})
+    return not (rule_result.confidence >= RULE_CONFIDENCE_THRESHOLD and rule_result.category == prior_category)
+
+def is_acknowledgement(content: str) -> bool:
+    words = WORD_PATTERN.findall((content or "").lower())
+    if len(words) > ACKNOWLEDGEMENT_MAX_TOKENS:
+        return False
+    i = 0
+    while i < len(words):
+        # Longest acknowledgement phrase starting here, else a standalone word
+        for length in range(min(ACKNOWLEDGEMENT_PHRASE_MAX_WORDS, len(words) - i), 1, -1):
+            if tuple(words[i:i + length]) in ACKNOWLEDGEMENT_PHRASES:
+                i += length
+                break
+        else:
+            if words[i] not in ACKNOWLEDGEMENT_WORDS:
+                return False
+            i += 1
+    return True
+
+def prior_classification(conversation: ConversationDB, reasoning: str) -> ClassificationResponse:
+    return ClassificationResponse(
+        conversation_id=conversation.conversation_id,
+        category=ConversationCategory(conversation.category),
+        confidence=conversation.confidence,
+        reasoning=reasoning
+    )
+
+async def record_classification(conversation: ConversationDB, category, confidence: float, db, classified_through=None, classified_by: Optional[str] = None) -> bool:
+    """
+    Store a classification, the newest message it covered and the tier that
+    made it on the conversation, skipping the write when nothing changed.
+    Returns whether anything was written.
+    """
+    category_value = category.value if isinstance(category, ConversationCategory) else str(category)
+    if conversation.category == category_value and conversation.confidence is not None \
+            and abs(conversation.confidence - confidence) < 1e-6 \
+            and conversation.classified_through == classified_through \
+            and conversation.classified_by == classified_by:
+        return False
+    conversation.category = category_value
+    conversation.confidence = confidence
+    conversation.classified_through = classified_through
+    conversation.classified_by = classified_by
+    await db.commit()
+    return True
+
+def classify_with_local_model(text: str) -> Optional[AIClassificationResult]:
+    """
+    The local model's prediction when it is at least LOCAL_MODEL_THRESHOLD
+    confident; None escalates to OpenAI.
+    """
+    if local_model is None:
+        return None
+    category, probability = local_model.predict(text)
+    if probability < LOCAL_MODEL_THRESHOLD:
+        return None
+    return AIClassificationResult(
+        category=ConversationCategory(category),
+        confidence=probability,
+        reasoning=f"Local model predicted '{category}' with probability {probability:.2f}.",
+        model_used=f"{LOCAL_SOURCE_PREFIX}{local_model.version}"
+    )
+
+async def classify_with_cache(text: str, context: dict = None) -> Optional[AIClassificationResult]:
+    """
+    classify_with_openai behind classification_cache, keyed by the normalized
+    text, context, prompt version and model. Only successful AI results are cached.
+    """
+    key = classification_key(text, context, PROMPT_VERSION, OPENAI_MODEL)
+    cached = await classification_cache.get(key)
+    if cached is not None:
+        return cached
+    result = await classify_with_openai(text, context)
+    if result is not None:
+        await classification_cache.set(key, result)
+    return result
 
 async def classify_with_openai(text: str, context: dict = None) -> Optional[AIClassificationResult]:
     """
-    Use OpenAI API to classify the conversation text, expecting a JSON response. Includes retry logic.
+    Use OpenAI API to classify the conversation text, expecting a JSON response.
+    Returns None, so the caller falls back to rules, when OpenAI is unavailable
+    or the response cannot be used; retries are bounded inside openai_client.
     """
-    openai.api_key = os.getenv("OPENAI_API_KEY")
-    if not openai.api_key:
+    if not openai_client.configured:
         return None
     categories = [cat.value for cat in ConversationCategory]
     prompt = (
@@ -103,81 +345,175 @@ async def classify_with_openai(text: str, context: dict = None) -> Optional[AICl
         "Classify the following conversation into one of these categories: "
         f"{categories}. "
         "Respond ONLY in valid JSON with the following fields: category, confidence, reasoning. "
-        "Example: {\\"category\\": \\\"support\\\", \\\"confidence\\\": 0.92, \\\"reasoning\\\": \\\"The user asked for help.\\\"} "
+        "Example: {\"category\": \"support\", \"confidence\": 0.92, \"reasoning\": \"The user asked for help.\"} "
         f"Conversation: {text}\nContext: {context or {}}"
     )
-    max_retries = 5
-    for attempt in range(max_retries):
-        try:
-            response = await openai.ChatCompletion.acreate(
-                model="gpt-4-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a classification assistant."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=256,
-                temperature=0.2
-            )
-            content = response["choices"][0]["message"]["content"]
-            # Try to parse JSON from the response
-            try:
-                # Find the first and last curly braces to extract JSON
-                start = content.find('{')
-                end = content.rfind('}') + 1
-                json_str = content[start:end]
-                data = json.loads(json_str)
-                category = data.get("category", "other").strip().lower()
+    try:
+        content = await openai_client.chat(
+            [
+                {"role": "system", "content": "You are a classification assistant."},
+                {"role": "user", "content": prompt}
+            ],
+            model=OPENAI_MODEL,
+            max_tokens=256,
+            temperature=0.2
+        )
+    except (OpenAIUnavailable, openai.OpenAIError) as e:
+        logger.warning(f"OpenAI classification unavailable, falling back to rules: {e}")
+        return None
+    # Find the first and last curly braces to extract JSON
+    start = content.find('{')
+    end = content.rfind('}') + 1
+    try:
+        return parse_ai_classification(json.loads(content[start:end]))
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Discarding unusable OpenAI classification {content!r}: {e}")
+        return None
+
+def parse_ai_classification(data: dict) -> AIClassificationResult:
+    """Validate one decoded JSON classification; unknown categories map to 'other'."""
+    category = str(data.get("category", "other")).strip().lower()
+    try:
+        category_enum = ConversationCategory(category)
+    except ValueError:
+        category_enum = ConversationCategory.other
+    confidence = float(data.get("confidence", 0.0))
+    if not 0.0 <= confidence <= 1.0:
+        raise ValueError(f"confidence {confidence} is out of range")
+    return AIClassificationResult(
+        category=category_enum,
+        confidence=confidence,
+        reasoning=str(data.get("reasoning", "")),
+        model_used=OPENAI_MODEL
+    )
+
+async def classify_batch_with_cache(items: List[Tuple[str, dict]]) -> List[Optional[AIClassificationResult]]:
+    """
+    Classify (text, context) pairs, serving what it can from classification_cache
+    and packing the rest into requests of up to OPENAI_BATCH_SIZE conversations.
+    Items the batch response did not classify usably are retried one at a time;
+    an item that still fails comes back as None so the caller falls back to rules.
+    """
+    keys = [classification_key(text, context, PROMPT_VERSION, OPENAI_MODEL) for text, context in items]
+    results: List[Optional[AIClassificationResult]] = [await classification_cache.get(key) for key in keys]
+    misses = [i for i, result in enumerate(results) if result is None]
+    chunks = [misses[i:i + OPENAI_BATCH_SIZE] for i in range(0, len(misses), OPENAI_BATCH_SIZE)]
+    chunk_results = await asyncio.gather(*(
+        classify_batch_with_openai([items[i] for i in chunk]) for chunk in chunks
+    ))
+    for chunk, batch_results in zip(chunks, chunk_results):
+        for i, result in zip(chunk, batch_results):
+            if result is None:
+                if openai_client.breaker.is_open:
+                    # OpenAI is degraded: leave the rest to the rules fallback
+                    continue
                 try:
-                    category_enum = ConversationCategory(category)
-                except Exception:
-                    category_enum = ConversationCategory.other
-                confidence = float(data.get("confidence", 0.0))
-                reasoning = data.get("reasoning", "")
-                model_used = "gpt-4-turbo"
-                return AIClassificationResult(
-                    category=category_enum,
-                    confidence=confidence,
-                    reasoning=reasoning,
-                    model_used=model_used
-                )
-            except Exception as parse_err:
-                if attempt == max_retries - 1:
-                    raise
-                await asyncio.sleep(2 ** attempt + random.random())
-                continue
-        except openai.error.RateLimitError as rate_err:
-            if attempt == max_retries - 1:
-                raise
-            await asyncio.sleep(2 ** attempt + random.random())
-            continue
-        except Exception as e:
-            if attempt == max_retries - 1:
-                raise
-            await asyncio.sleep(2 ** attempt + random.random())
-            continue
-    return None
+                    result = await classify_with_openai(*items[i])
+                except Exception as e:
+                    logger.warning(f"Per-item classification fallback failed: {e}")
+            if result is not None:
+                results[i] = result
+                await classification_cache.set(keys[i], result)
+    return results
+
+async def classify_batch_with_openai(items: List[Tuple[str, dict]]) -> List[Optional[AIClassificationResult]]:
+    """
+    Classify several conversations in one request that asks for a JSON array
+    with one element per conversation. Returns a result per item, in order, with
+    None wherever the response had no valid element for it. Only retried inside
+    openai_client: the caller falls back per item.
+    """
+    if not openai_client.configured:
+        return [None] * len(items)
+    categories = [cat.value for cat in ConversationCategory]
+    conversations = "\n\n".join(
+        f"Conversation {i}:\n{text}\nContext: {context or {}}" for i, (text, context) in enumerate(items)
+    )
+    prompt = (
+        "You are an expert conversation classifier. "
+        "Classify each of the following conversations into one of these categories: "
+        f"{categories}. "
+        "Respond ONLY with a valid JSON array containing one object per conversation "
+        "with the following fields: id, category, confidence, reasoning. "
+        "Example: [{\"id\": 0, \"category\": \"support\", \"confidence\": 0.92, \"reasoning\": \"The user asked for help.\"}] "
+        f"\n\n{conversations}"
+    )
+    try:
+        content = await openai_client.chat(
+            [
+                {"role": "system", "content": "You are a classification assistant."},
+                {"role": "user", "content": prompt}
+            ],
+            model=OPENAI_MODEL,
+            max_tokens=min(4096, 160 * len(items)),
+            temperature=0.2
+        )
+    except (OpenAIUnavailable, openai.OpenAIError) as e:
+        logger.warning(f"Batch classification of {len(items)} conversations failed: {e}")
+        return [None] * len(items)
+    return parse_batch_classification(content, len(items))
+
+def parse_batch_classification(content: str, count: int) -> List[Optional[AIClassificationResult]]:
+    results: List[Optional[AIClassificationResult]] = [None] * count
+    # Find the first and last square brackets to extract the JSON array
+    start = content.find('[')
+    end = content.rfind(']') + 1
+    try:
+        elements = json.loads(content[start:end]) if start != -1 else None
+    except ValueError as e:
+        logger.warning(f"Batch classification response is not valid JSON: {e}")
+        return results
+    if not isinstance(elements, list):
+        logger.warning("Batch classification response has no JSON array.")
+        return results
+    for element in elements:
+        try:
+            index = int(element["id"])
+            if 0 <= index < count and results[index] is None:
+                results[index] = parse_ai_classification(element)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            logger.warning(f"Discarding malformed batch classification element {element!r}: {e}")
+    return results
 
 def classify_with_rules(text: str, context: dict) -> Optional[RuleBasedResult]:
     """
-    Rule-based classification using keyword matching.
-    """
-    text_lower = text.lower()
-    for category, keywords in CLASSIFICATION_RULES.items():
-        for kw in keywords:
-            if kw in text_lower:
-                return RuleBasedResult(
-                    category=category,
-                    confidence=0.6,
-                    reasoning=f"Matched keyword '{kw}' for category '{category}'."
-                )
+    Rule-based classification: every keyword hit is found in one pass by
+    rule_matcher and categories are scored by their weighted hits.
+    """
+    match = rule_matcher.match(text)
+    if not match.keywords:
+        return RuleBasedResult(
+            category=ConversationCategory.other,
+            confidence=match.confidence,
+            reasoning="No keyword match found."
+        )
+    keywords = ", ".join(f"'{kw}'" for kw in match.keywords)
     return RuleBasedResult(
-        category=ConversationCategory.other,
-        confidence=0.3,
-        reasoning="No keyword match found."
+        category=match.category,
+        confidence=match.confidence,
+        reasoning=f"Matched keyword(s) {keywords} for category '{match.category.value}'."
     )
 
+def build_conversation_text(contents: Sequence[Optional[str]]) -> str:
+    """
+    Join message contents, oldest first, keeping only the most recent
+    CLASSIFY_MAX_MESSAGES messages and CLASSIFY_MAX_CHARS characters.
+    """
+    kept: List[str] = []
+    budget = CLASSIFY_MAX_CHARS
+    for content in reversed(contents[-CLASSIFY_MAX_MESSAGES:]):
+        if not content:
+            continue
+        if len(content) > budget:
+            if not kept:
+                kept.append(content[-budget:])
+            break
+        kept.append(content)
+        budget -= len(content) + 1
+    return "\n".join(reversed(kept))
+
 def extract_conversation_text(messages: List[Message]) -> str:
     """
     Concatenate message contents for classification.
     """
-    return "\n".join([msg.content for msg in messages if hasattr(msg, 'content')]) 
\ No newline at end of file
+    return build_conversation_text([msg.content for msg in messages if hasattr(msg, 'content')])
@@ -0,0 +1,201 @@
+# Local text classifier for the Classifier Agent service
+"""
+Hashed n-gram features with a multinomial logistic regression, in plain
+Python. Prediction touches only the weights of the n-grams present in the
+text, so a conversation is classified in well under a millisecond on CPU.
+Models are trained offline by train_local_model from the labels the service
+has already stored, and saved as versioned JSON.
+"""
+import os
+import re
+import json
+import math
+import zlib
+import random
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("classifier_agent.local_model")
+
+# Unset disables the local tier
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "")
+# Predictions below this probability are escalated to OpenAI
+LOCAL_MODEL_THRESHOLD = float(os.getenv("LOCAL_MODEL_THRESHOLD", "0.85"))
+
+MODEL_FORMAT = 1
+# classified_by of labels from this tier is the prefix plus the model version
+LOCAL_SOURCE_PREFIX = "local:"
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+# (text, category, sample weight)
+Sample = Tuple[str, str, float]
+
+class LocalClassifier:
+    def __init__(
+        self,
+        categories: Sequence[str],
+        n_features: int = 2 ** 18,
+        ngram_max: int = 2,
+        weights: Optional[Dict[int, List[float]]] = None,
+        bias: Optional[List[float]] = None,
+        version: Optional[str] = None,
+        metrics: Optional[dict] = None,
+    ):
+        self.categories = list(categories)
+        self.n_features = n_features
+        self.ngram_max = ngram_max
+        # Sparse: feature bucket -> one weight per category
+        self.weights: Dict[int, List[float]] = weights or {}
+        self.bias = bias or [0.0] * len(self.categories)
+        self.version = version
+        self.metrics = metrics or {}
+
+    def features(self, text: str) -> Dict[int, float]:
+        """L2-normalized log term frequencies of the hashed word n-grams."""
+        tokens = TOKEN_PATTERN.findall((text or "").lower())
+        counts: Dict[int, float] = {}
+        for n in range(1, self.ngram_max + 1):
+            for i in range(len(tokens) - n + 1):
+                bucket = zlib.crc32(" ".join(tokens[i:i + n]).encode()) % self.n_features
+                counts[bucket] = counts.get(bucket, 0.0) + 1.0
+        values = {bucket: 1.0 + math.log(count) for bucket, count in counts.items()}
+        norm = math.sqrt(sum(v * v for v in values.values())) or 1.0
+        return {bucket: v / norm for bucket, v in values.items()}
+
+    def _probabilities(self, features: Dict[int, float]) -> List[float]:
+        logits = list(self.bias)
+        for bucket, value in features.items():
+            row = self.weights.get(bucket)
+            if row is not None:
+                for k, w in enumerate(row):
+                    logits[k] += w * value
+        top = max(logits)
+        exps = [math.exp(logit - top) for logit in logits]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        return dict(zip(self.categories, self._probabilities(self.features(text))))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        probabilities = self._probabilities(self.features(text))
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self.categories[best], probabilities[best]
+
+    def fit(self, samples: Sequence[Sample], epochs: int = 8, learning_rate: float = 0.5, l2: float = 1e-5, seed: int = 0):
+        """Softmax regression by SGD; regularization is applied lazily to the features each step touches."""
+        index = {category: k for k, category in enumerate(self.categories)}
+        prepared = [(self.features(text), index[label], weight) for text, label, weight in samples if label in index]
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(prepared)
+            rate = learning_rate / (1 + epoch)
+            for features, target, weight in prepared:
+                probabilities = self._probabilities(features)
+                gradient = [p - (1.0 if k == target else 0.0) for k, p in enumerate(probabilities)]
+                for k, g in enumerate(gradient):
+                    self.bias[k] -= rate * weight * g
+                for bucket, value in features.items():
+                    row = self.weights.setdefault(bucket, [0.0] * len(self.categories))
+                    for k, g in enumerate(gradient):
+                        row[k] -= rate * (weight * g * value + l2 * row[k])
+        self.weights = {b: row for b, row in self.weights.items() if any(abs(w) >= 1e-6 for w in row)}
+        self.version = f"{datetime.utcnow():%Y%m%d%H%M%S}-{self._fingerprint()}"
+        return self
+
+    def _fingerprint(self) -> str:
+        payload = json.dumps([self.bias, sorted(self.weights.items())], separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()[:8]
+
+    def to_dict(self) -> dict:
+        return {
+            "format": MODEL_FORMAT,
+            "version": self.version,
+            "categories": self.categories,
+            "n_features": self.n_features,
+            "ngram_max": self.ngram_max,
+            "bias": [round(b, 6) for b in self.bias],
+            "weights": {str(b): [round(w, 6) for w in row] for b, row in self.weights.items()},
+            "metrics": self.metrics,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LocalClassifier":
+        if data.get("format") != MODEL_FORMAT:
+            raise ValueError(f"Unsupported local model format {data.get('format')!r}")
+        return cls(
+            categories=data["categories"],
+            n_features=data["n_features"],
+            ngram_max=data["ngram_max"],
+            weights={int(b): row for b, row in data["weights"].items()},
+            bias=data["bias"],
+            version=data["version"],
+            metrics=data.get("metrics"),
+        )
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalClassifier":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+def load_local_model(path: str = LOCAL_MODEL_PATH) -> Optional[LocalClassifier]:
+    """The model at `path`, or None (local tier disabled) if unset or unreadable."""
+    if not path:
+        return None
+    try:
+        model = LocalClassifier.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Could not load local model from {path}, local tier disabled: {e}")
+        return None
+    logger.info(f"Loaded local model {model.version} ({len(model.weights)} features) from {path}")
+    return model
+
+def split_holdout(samples: Sequence[Sample], keys: Sequence[str], fraction: float) -> Tuple[List[Sample], List[Sample]]:
+    """Deterministic train/holdout split by hashing each sample's key."""
+    train, holdout = [], []
+    for sample, key in zip(samples, keys):
+        (holdout if zlib.crc32(key.encode()) % 1000 < fraction * 1000 else train).append(sample)
+    return train, holdout
+
+def evaluate(model: LocalClassifier, samples: Sequence[Sample], threshold: float = LOCAL_MODEL_THRESHOLD) -> dict:
+    """
+    Accuracy and per-category precision/recall/F1 over `samples`, plus how many
+    would be served locally at `threshold` and how accurate those are.
+    """
+    per_category = {c: {"tp": 0, "fp": 0, "fn": 0, "support": 0} for c in model.categories}
+    correct = served = served_correct = 0
+    for text, label, _ in samples:
+        predicted, probability = model.predict(text)
+        hit = predicted == label
+        correct += hit
+        if probability >= threshold:
+            served += 1
+            served_correct += hit
+        if label in per_category:
+            per_category[label]["support"] += 1
+            if not hit:
+                per_category[label]["fn"] += 1
+        per_category[predicted]["tp" if hit else "fp"] += 1
+    report = {}
+    for category, c in per_category.items():
+        precision = c["tp"] / (c["tp"] + c["fp"]) if c["tp"] + c["fp"] else 0.0
+        recall = c["tp"] / (c["tp"] + c["fn"]) if c["tp"] + c["fn"] else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        report[category] = {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4), "support": c["support"]}
+    n = len(samples)
+    return {
+        "samples": n,
+        "accuracy": round(correct / n, 4) if n else 0.0,
+        "threshold": threshold,
+        "coverage": round(served / n, 4) if n else 0.0,
+        "accuracy_at_threshold": round(served_correct / served, 4) if served else 0.0,
+        "categories": report,
+    }
@@ -4,15 +4,19 @@ import os
 from fastapi import Request, HTTPException
 from uuid import uuid4, UUID
 from communication_platform.shared.service_base import ServiceBase
-from .models import ClassificationRequest, ClassificationResponse
-from .handlers import classify_conversation
+from .models import ClassificationRequest, ClassificationResponse, BatchClassificationRequest, BatchClassificationResponse
+from . import handlers
+from .handlers import classify_conversation, classify_conversations, classification_cache, openai_client
+from .local_model import LOCAL_MODEL_THRESHOLD
 from .events import start_event_consumption
 from communication_platform.shared.models import ConversationCategory
-import openai
+from communication_platform.shared.database import dispose_async_engine
 
 service = ServiceBase("classifier-agent", version="1.0.0")
 app = service.app
 
+MAX_CLASSIFY_BATCH_SIZE = int(os.getenv("MAX_CLASSIFY_BATCH_SIZE", "100"))
+
 @app.on_event("startup")
 def on_startup():
     # Validate OPENAI_API_KEY
@@ -23,6 +27,10 @@ def on_startup():
     thread = threading.Thread(target=start_event_consumption, daemon=True)
     thread.start()
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await dispose_async_engine()
+
 @app.post("/classify", response_model=ClassificationResponse)
 async def classify_endpoint(request: ClassificationRequest, req: Request):
     trace_id = getattr(req.state, "trace_id", str(uuid4()))
@@ -32,6 +40,17 @@ async def classify_endpoint(request: ClassificationRequest, req: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Classification failed: {e}")
 
+@app.post("/classify/batch", response_model=BatchClassificationResponse)
+async def classify_batch_endpoint(request: BatchClassificationRequest, req: Request):
+    if len(request.conversation_ids) > MAX_CLASSIFY_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_CLASSIFY_BATCH_SIZE} conversations per batch.")
+    trace_id = getattr(req.state, "trace_id", str(uuid4()))
+    try:
+        results, failed = await classify_conversations(request.conversation_ids, UUID(str(trace_id)))
+        return BatchClassificationResponse(results=results, failed=failed)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch classification failed: {e}")
+
 @app.get("/categories")
 def get_categories():
     return {"categories": [cat.value for cat in ConversationCategory]}
@@ -44,20 +63,23 @@ async def health_check():
         "service": "classifier-agent",
         "timestamp": str(uuid4()),
         "openai_api_key_set": bool(os.getenv("OPENAI_API_KEY")),
-        "openai_api_status": "unknown"
+        "openai_api_status": "unknown",
+        "openai_client": openai_client.stats(),
+        "classification_cache": classification_cache.stats(),
+        "local_model": {
+            "version": handlers.local_model.version,
+            "threshold": LOCAL_MODEL_THRESHOLD,
+            "holdout_accuracy": handlers.local_model.metrics.get("holdout", {}).get("accuracy"),
+            "holdout_coverage": handlers.local_model.metrics.get("holdout", {}).get("coverage"),
+        } if handlers.local_model else None
     }
-    # Check OpenAI API connectivity
-    api_key = os.getenv("OPENAI_API_KEY")
-    if api_key:
-        try:
-            openai.api_key = api_key
-            # Use a lightweight API call to check connectivity
-            openai.Model.list()
-            health["openai_api_status"] = "ok"
-        except Exception as e:
-            health["openai_api_status"] = f"error: {e}"
-    else:
+    # Report OpenAI health from the circuit breaker rather than probing the API on every check
+    if not openai_client.configured:
         health["openai_api_status"] = "not set"
+    elif openai_client.breaker.state == "closed":
+        health["openai_api_status"] = "ok"
+    else:
+        health["openai_api_status"] = f"degraded: circuit breaker {openai_client.breaker.state}"
     return health
 
 if __name__ == "__main__":
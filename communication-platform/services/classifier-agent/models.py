@@ -1,5 +1,5 @@
 # Models for the Classifier Agent service 
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from uuid import UUID
 from pydantic import BaseModel
 from ...shared.models import ConversationCategory
@@ -24,4 +24,11 @@ class AIClassificationResult(BaseModel):
 class RuleBasedResult(BaseModel):
     category: str
     confidence: float
-    reasoning: str 
\ No newline at end of file
+    reasoning: str 
+
+class BatchClassificationRequest(BaseModel):
+    conversation_ids: List[UUID]
+
+class BatchClassificationResponse(BaseModel):
+    results: List[ClassificationResponse]
+    failed: List[UUID]
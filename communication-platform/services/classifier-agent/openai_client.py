@@ -0,0 +1,292 @@
+# Shared OpenAI client for the Classifier Agent service
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Callable, Dict, List, Optional
+import openai
+
+logger = logging.getLogger("classifier_agent.openai_client")
+
+# Concurrent requests per event loop
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+# Request rate across the whole process (token bucket)
+OPENAI_RATE_LIMIT_RPS = float(os.getenv("OPENAI_RATE_LIMIT_RPS", "5"))
+OPENAI_RATE_LIMIT_BURST = int(os.getenv("OPENAI_RATE_LIMIT_BURST", "10"))
+# A request that would wait longer than this for a token fails fast instead
+OPENAI_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("OPENAI_RATE_LIMIT_MAX_WAIT_SECONDS", "5"))
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "20"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+OPENAI_RETRY_MAX_DELAY_SECONDS = float(os.getenv("OPENAI_RETRY_MAX_DELAY_SECONDS", "2"))
+# Consecutive failed calls that open the breaker, and how long it stays open
+OPENAI_BREAKER_FAILURE_THRESHOLD = int(os.getenv("OPENAI_BREAKER_FAILURE_THRESHOLD", "5"))
+OPENAI_BREAKER_RESET_SECONDS = float(os.getenv("OPENAI_BREAKER_RESET_SECONDS", "30"))
+
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+class OpenAIUnavailable(Exception):
+    """OpenAI is not configured, the breaker is open, or the call failed after retries."""
+
+def is_degraded(error: Exception) -> bool:
+    """Errors that say OpenAI itself is unhealthy: worth a retry, and counted by the breaker."""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+class TokenBucket:
+    """Thread-safe token bucket; tokens can be reserved ahead, so waiters queue fairly."""
+    def __init__(self, rate: float, capacity: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Take a token, returning how long the caller must wait before using it,
+        or None (taking nothing) if that would be longer than `max_wait`.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open ->
+    half_open once `reset_timeout` has passed, letting a single probe call
+    through; the probe's outcome closes or re-opens the breaker.
+    """
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are currently being refused (a half-open breaker is not)."""
+        with self._lock:
+            return self.state == "open" and self._clock() - self.opened_at < self.reset_timeout
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if self._clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("OpenAI circuit breaker closed.")
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened_at = self._clock()
+                self.times_opened += 1
+                logger.warning(f"OpenAI circuit breaker opened after {self.failures} consecutive failure(s).")
+
+    def release(self):
+        """Give up an allowed call without an outcome, freeing the half-open probe slot."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures, "times_opened": self.times_opened}
+
+class LatencyHistogram:
+    """Cumulative latency histogram with fixed millisecond buckets."""
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._counts = [0] * (len(self.buckets_ms) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds: float):
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(self.buckets_ms) if ms <= bound), len(self.buckets_ms))
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            buckets, running = {}, 0
+            for bound, count in zip(self.buckets_ms + ("inf",), self._counts):
+                running += count
+                buckets[f"le_{bound}"] = running
+            return {
+                "count": self.count,
+                "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+                "max_ms": round(self.max_ms, 3),
+                "buckets": buckets,
+            }
+
+class OpenAIClient:
+    """
+    Chat completions through one AsyncOpenAI client per event loop (each keeps
+    its HTTP connection pool for the life of the loop), behind a concurrency
+    cap, a process-wide rate limit and a circuit breaker. Failures are retried
+    a bounded number of times with short backoff; anything that cannot be
+    answered promptly raises OpenAIUnavailable so callers fall back to rules.
+    """
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        max_concurrency: int = OPENAI_MAX_CONCURRENCY,
+        rate_limit: float = OPENAI_RATE_LIMIT_RPS,
+        burst: int = OPENAI_RATE_LIMIT_BURST,
+        max_rate_wait: float = OPENAI_RATE_LIMIT_MAX_WAIT_SECONDS,
+        timeout: float = OPENAI_TIMEOUT_SECONDS,
+        max_retries: int = OPENAI_MAX_RETRIES,
+        retry_max_delay: float = OPENAI_RETRY_MAX_DELAY_SECONDS,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self._api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.max_rate_wait = max_rate_wait
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_max_delay = retry_max_delay
+        self.rate_limiter = TokenBucket(rate_limit, burst)
+        self.breaker = breaker or CircuitBreaker(OPENAI_BREAKER_FAILURE_THRESHOLD, OPENAI_BREAKER_RESET_SECONDS)
+        self.request_latency = LatencyHistogram()
+        self.wait_latency = LatencyHistogram()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.rejected = 0
+        # AsyncOpenAI's connection pool and asyncio.Semaphore both belong to the loop that uses them
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, object]" = weakref.WeakKeyDictionary()
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return self._api_key or os.getenv("OPENAI_API_KEY")
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = openai.AsyncOpenAI(api_key=self.api_key, timeout=self.timeout, max_retries=0)
+            self._clients[loop] = client
+        return client
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _reject(self, reason: str):
+        self._count("rejected")
+        raise OpenAIUnavailable(reason)
+
+    async def chat(self, messages: List[dict], model: str, max_tokens: int, temperature: float = 0.2) -> str:
+        """Return the content of the first choice of a chat completion."""
+        if not self.configured:
+            raise OpenAIUnavailable("OPENAI_API_KEY is not set")
+        if not self.breaker.allow():
+            self._reject("circuit breaker is open")
+        try:
+            return await self._chat_with_retries(messages, model, max_tokens, temperature)
+        except BaseException:
+            # Cancellation skips record_success/record_failure; never leave the
+            # half-open probe slot taken, or the breaker refuses every later call
+            self.breaker.release()
+            raise
+
+    async def _chat_with_retries(self, messages: List[dict], model: str, max_tokens: int, temperature: float) -> str:
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(min(self.retry_max_delay, 0.25 * 2 ** attempt) * (0.5 + random.random() / 2))
+            waited_from = time.perf_counter()
+            delay = self.rate_limiter.reserve(self.max_rate_wait)
+            if delay is None:
+                self.breaker.release()
+                self._reject("rate limit exceeded")
+            if delay:
+                await asyncio.sleep(delay)
+            async with self._semaphore():
+                self.wait_latency.record(time.perf_counter() - waited_from)
+                started = time.perf_counter()
+                self._count("requests")
+                try:
+                    response = await self._client().chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature
+                    )
+                except Exception as e:
+                    self.request_latency.record(time.perf_counter() - started)
+                    self._count("failures")
+                    if not is_degraded(e):
+                        # The API answered; the request itself was bad
+                        self.breaker.record_success()
+                        raise
+                    logger.warning(f"OpenAI request failed (attempt {attempt + 1}/{self.max_retries + 1}): {e}")
+                    last_error = e
+                    continue
+            self.request_latency.record(time.perf_counter() - started)
+            self.breaker.record_success()
+            return response.choices[0].message.content or ""
+        self.breaker.record_failure()
+        raise OpenAIUnavailable(f"OpenAI request failed after {self.max_retries + 1} attempt(s): {last_error}") from last_error
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            counters = {"requests": self.requests, "failures": self.failures, "rejected": self.rejected}
+        return {
+            "configured": self.configured,
+            **counters,
+            "circuit_breaker": self.breaker.snapshot(),
+            "request_latency": self.request_latency.snapshot(),
+            "wait_latency": self.wait_latency.snapshot(),
+        }
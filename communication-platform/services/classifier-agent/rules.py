@@ -0,0 +1,84 @@
+# Keyword rules for the Classifier Agent service
+import re
+import math
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Tuple, Union
+from communication_platform.shared.models import ConversationCategory
+
+# A category's rules: keyword -> weight, or a plain list of keywords weighted 1.0
+KeywordRules = Mapping[ConversationCategory, Union[Mapping[str, float], Iterable[str]]]
+
+# Calibration: confidence = BASE + SPAN * (1 - exp(-score / SATURATION)) * share,
+# where `share` is the winning category's fraction of all weighted hits. A single
+# unambiguous weight-1 hit lands at ~0.6; agreeing hits approach BASE + SPAN, and
+# hits split between categories pull the confidence back towards BASE.
+CONFIDENCE_BASE = 0.4
+CONFIDENCE_SPAN = 0.5
+SCORE_SATURATION = 2.0
+NO_MATCH_CONFIDENCE = 0.3
+# classified_by of labels assigned by the rules
+RULES_SOURCE = "rules"
+
+class RuleMatch(NamedTuple):
+    category: ConversationCategory
+    confidence: float
+    keywords: List[str]
+
+def _normalize(keyword: str) -> str:
+    return " ".join(keyword.lower().split())
+
+class KeywordMatcher:
+    """
+    All keyword rules compiled into one case-insensitive alternation regex, so
+    every hit is found in a single pass over the text however many keywords
+    there are. Keywords match on word boundaries (with an optional plural
+    suffix), multi-word keywords match across any whitespace, and a keyword may
+    count towards several categories with different weights.
+    """
+    def __init__(self, rules: KeywordRules):
+        self._weights: Dict[str, List[Tuple[ConversationCategory, float]]] = {}
+        self._order: Dict[ConversationCategory, int] = {}
+        for category, keywords in rules.items():
+            self._order[category] = len(self._order)
+            weighted = keywords.items() if isinstance(keywords, Mapping) else ((kw, 1.0) for kw in keywords)
+            for keyword, weight in weighted:
+                self._weights.setdefault(_normalize(keyword), []).append((category, float(weight)))
+        # Longest first, so "new customer" is preferred over any shorter keyword it contains
+        alternatives = [
+            r"\s+".join(re.escape(word) for word in keyword.split())
+            for keyword in sorted(self._weights, key=len, reverse=True)
+        ]
+        self._pattern = re.compile(r"\b(" + "|".join(alternatives) + r")(?:e?s)?\b", re.IGNORECASE) if alternatives else None
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+    def hits(self, text: str) -> List[str]:
+        """Every keyword occurrence in `text`, normalized, in order of appearance."""
+        if self._pattern is None or not text:
+            return []
+        return [_normalize(m.group(1)) for m in self._pattern.finditer(text)]
+
+    def scores(self, text: str) -> Tuple[Dict[ConversationCategory, float], Dict[ConversationCategory, List[str]]]:
+        scores: Dict[ConversationCategory, float] = {}
+        matched: Dict[ConversationCategory, List[str]] = {}
+        for keyword in self.hits(text):
+            for category, weight in self._weights[keyword]:
+                scores[category] = scores.get(category, 0.0) + weight
+                if keyword not in matched.setdefault(category, []):
+                    matched[category].append(keyword)
+        return scores, matched
+
+    def match(self, text: str) -> RuleMatch:
+        """
+        The category with the highest weighted hit count (ties go to the category
+        listed first in the rules), with its calibrated confidence.
+        """
+        scores, matched = self.scores(text)
+        positive = {category: score for category, score in scores.items() if score > 0}
+        if not positive:
+            return RuleMatch(ConversationCategory.other, NO_MATCH_CONFIDENCE, [])
+        best = max(positive, key=lambda category: (positive[category], -self._order[category]))
+        share = positive[best] / sum(positive.values())
+        strength = 1 - math.exp(-positive[best] / SCORE_SATURATION)
+        confidence = CONFIDENCE_BASE + CONFIDENCE_SPAN * strength * share
+        return RuleMatch(best, round(confidence, 4), matched[best])
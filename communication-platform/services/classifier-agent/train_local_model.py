@@ -0,0 +1,100 @@
+# Offline training for the Classifier Agent's local model
+"""
+Train a LocalClassifier from the labels already stored on conversations,
+evaluate it on a deterministic holdout split, and save it with its
+evaluation report:
+
+    python -m communication_platform.services.classifier_agent.train_local_model \
+        --output /models/classifier.json
+
+Labels assigned by the rules or by a previous local model are excluded, so the
+local tier learns only from OpenAI's classifications. Labels stored before
+classified_by was recorded (NULL) may come from any tier and are excluded too,
+unless --include-legacy is given.
+"""
+import sys
+import json
+import asyncio
+import argparse
+import logging
+from typing import List, Tuple
+from sqlalchemy import select, and_, or_
+from communication_platform.shared.database import AsyncSessionLocal
+from communication_platform.shared.models import ConversationCategory
+from communication_platform.services.conversation_grouper.database import ConversationDB, ConversationMessageDB
+from communication_platform.services.twilio_monitor.database import MessageDB
+from .local_model import LocalClassifier, Sample, LOCAL_MODEL_THRESHOLD, LOCAL_SOURCE_PREFIX, split_holdout, evaluate
+from .rules import RULES_SOURCE
+from .handlers import build_conversation_text
+
+logger = logging.getLogger("classifier_agent.train_local_model")
+
+def trainable_source(include_legacy: bool = False):
+    """Filter on classified_by keeping OpenAI labels, plus unattributed legacy labels if asked."""
+    openai_label = ~or_(ConversationDB.classified_by == RULES_SOURCE, ConversationDB.classified_by.startswith(LOCAL_SOURCE_PREFIX))
+    if include_legacy:
+        return or_(ConversationDB.classified_by.is_(None), openai_label)
+    # NOT (...) is NULL for a NULL classified_by, so legacy rows drop out here
+    return and_(ConversationDB.classified_by.isnot(None), openai_label)
+
+async def load_training_samples(min_confidence: float, include_legacy: bool = False) -> Tuple[List[Sample], List[str]]:
+    """(text, category, confidence) per labelled conversation, and the conversation ids."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(ConversationDB.conversation_id, ConversationDB.category, ConversationDB.confidence, MessageDB.content)
+            .join(ConversationMessageDB, ConversationMessageDB.c.conversation_id == ConversationDB.conversation_id)
+            .join(MessageDB, MessageDB.message_id == ConversationMessageDB.c.message_id)
+            .where(
+                ConversationDB.category.isnot(None),
+                ConversationDB.confidence >= min_confidence,
+                trainable_source(include_legacy)
+            )
+            .order_by(ConversationDB.conversation_id, MessageDB.timestamp)
+        )
+        conversations = {}
+        for row in result:
+            entry = conversations.setdefault(row.conversation_id, (row.category, row.confidence, []))
+            entry[2].append(row.content or "")
+    # Same truncation as at classification time, so the model sees what it will be served
+    samples = [(build_conversation_text(contents), category, confidence) for category, confidence, contents in conversations.values()]
+    return samples, [str(conversation_id) for conversation_id in conversations]
+
+def train(samples: List[Sample], keys: List[str], args) -> LocalClassifier:
+    train_samples, holdout = split_holdout(samples, keys, args.holdout)
+    model = LocalClassifier([c.value for c in ConversationCategory], n_features=args.n_features, ngram_max=args.ngram_max)
+    model.fit(train_samples, epochs=args.epochs, learning_rate=args.learning_rate)
+    model.metrics = {
+        "train_samples": len(train_samples),
+        "holdout": evaluate(model, holdout, args.threshold),
+    }
+    return model
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the classifier's local model from stored classifications.")
+    parser.add_argument("--output", required=True, help="Path to write the model JSON to")
+    parser.add_argument("--min-confidence", type=float, default=0.7, help="Ignore stored labels below this confidence")
+    parser.add_argument("--include-legacy", action="store_true", help="Also train on labels stored without classified_by, which may be rule labels")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of conversations held out for evaluation")
+    parser.add_argument("--threshold", type=float, default=LOCAL_MODEL_THRESHOLD, help="Escalation threshold to report coverage at")
+    parser.add_argument("--epochs", type=int, default=8)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--n-features", type=int, default=2 ** 18)
+    parser.add_argument("--ngram-max", type=int, default=2)
+    parser.add_argument("--min-samples", type=int, default=100, help="Refuse to train on fewer labelled conversations")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args(argv)
+    samples, keys = asyncio.run(load_training_samples(args.min_confidence, args.include_legacy))
+    if len(samples) < args.min_samples:
+        logger.error(f"Only {len(samples)} labelled conversations found, need at least {args.min_samples}.")
+        return 1
+    model = train(samples, keys, args)
+    model.save(args.output)
+    logger.info(f"Saved local model {model.version} to {args.output}")
+    print(json.dumps({"version": model.version, **model.metrics}, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+from uuid import UUID
+from ...shared.cache import TTLCache
+from .segmentation import SegmentProfile
+
+class ActiveConversation(NamedTuple):
+    conversation_id: UUID
+    window_end: datetime
+    message_count: int
+    # Running content profile, when this replica has seen the conversation's recent messages
+    profile: Optional[SegmentProfile] = None
+
+class ActiveConversationCache:
+    """
+    Per-process map of participant phone -> open conversation.
+
+    An entry mirrors what find_existing_conversation would return for that phone:
+    it is valid for messages timestamped within `window` of the conversation's
+    last activity, and is evicted `window` after it was written. Entries are
+    replaced on every write by this replica and invalidated when another replica
+    reports a CONVERSATION_UPDATED for the same phone.
+    """
+    def __init__(self, window: timedelta, maxsize: int = 10000):
+        self.window = window
+        self._entries = TTLCache(maxsize=maxsize, ttl=window.total_seconds())
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, phone_number: str, timestamp: datetime) -> Optional[ActiveConversation]:
+        entry = self._entries.get(phone_number) if self.enabled else None
+        if entry is None or not (entry.window_end - 2 * self.window <= timestamp <= entry.window_end):
+            return None
+        return entry
+
+    def get(self, phone_number: str, timestamp: datetime) -> Optional[ActiveConversation]:
+        entry = self._lookup(phone_number, timestamp)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def profile(self, phone_number: str, timestamp: datetime) -> Optional[SegmentProfile]:
+        """The open conversation's content profile, without counting a lookup."""
+        entry = self._lookup(phone_number, timestamp)
+        return entry.profile if entry else None
+
+    def put(self, phone_number: str, conversation_id: UUID, last_activity: datetime, message_count: int, profile: Optional[SegmentProfile] = None):
+        if not self.enabled:
+            return
+        self._entries.set(phone_number, ActiveConversation(conversation_id, last_activity + self.window, message_count, profile))
+
+    def invalidate(self, phone_number: str):
+        self._entries.pop(phone_number)
+
+    def clear(self):
+        self._entries.clear()
+
+    def disable(self):
+        """Stop serving and storing entries, e.g. once invalidation events can no longer be received."""
+        self.enabled = False
+        self._entries.clear()
+
+    def enable(self):
+        """Serve and store entries again, starting empty, e.g. once invalidation events flow again."""
+        self._entries.clear()
+        self.enabled = True
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,10 +1,10 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Table, Float
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Table, Float, Index, Integer
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
 from ...shared.database import Base
-from ..twilio-monitor.database import MessageDB
+from communication_platform.services.twilio_monitor.database import MessageDB
 
 # Association table for many-to-many relationship
 ConversationMessageDB = Table(
@@ -22,9 +22,25 @@ class ConversationDB(Base):
     category = Column(String(50), nullable=True)
     confidence = Column(Float, nullable=True)
     customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.customer_id"), nullable=True)
+    # Denormalized counterparty phone so open conversations can be found without
+    # joining through conversation_message
+    participant_phone = Column(String(20), nullable=True)
+    # Maintained by the grouper as messages are attached, so counts and recency
+    # never require reading the conversation's messages
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    first_message_at = Column(DateTime, nullable=True)
+    last_message_at = Column(DateTime, nullable=True)
+    # Newest message covered by the stored category/confidence (set by the classifier)
+    classified_through = Column(DateTime, nullable=True)
+    # Which classifier assigned the category: the OpenAI model, "rules" or "local:<version>"
+    classified_by = Column(String(64), nullable=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("idx_conversations_participant_last_message", "participant_phone", last_message_at.desc()),
+    )
+
     messages = relationship(
         "MessageDB",
         secondary=ConversationMessageDB,
@@ -1,13 +1,39 @@
-from typing import List, Optional
+import os
+import threading
+from typing import List, Optional, Tuple
 from uuid import UUID, uuid4
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from ...shared.models import Message
 from .models import GroupingResponse, ConversationSummary
-from .database import ConversationDB, MessageDB
+from .database import ConversationDB, ConversationMessageDB, MessageDB
+from .cache import ActiveConversationCache
+from .segmentation import Segmenter, SegmentProfile
 from ...shared.database import SessionLocal
 
 GROUPING_WINDOW_HOURS = 2
+ACTIVE_CONVERSATION_CACHE_SIZE = int(os.getenv("ACTIVE_CONVERSATION_CACHE_SIZE", "10000"))
+
+active_conversations = ActiveConversationCache(
+    timedelta(hours=GROUPING_WINDOW_HOURS),
+    maxsize=ACTIVE_CONVERSATION_CACHE_SIZE
+)
+segmenter = Segmenter(window_seconds=GROUPING_WINDOW_HOURS * 3600)
+
+# Grouping for one phone is serialized: in process by a striped lock, since
+# subscriber workers run batches concurrently, and across replicas by a
+# transaction-scoped advisory lock (see lock_participant)
+PHONE_LOCK_STRIPES = int(os.getenv("PHONE_LOCK_STRIPES", "256"))
+_phone_locks = [threading.RLock() for _ in range(PHONE_LOCK_STRIPES)]
+
+def phone_lock(phone_number: str) -> threading.RLock:
+    return _phone_locks[hash(phone_number) % len(_phone_locks)]
+
+def lock_participant(phone_number: str, db: Session):
+    """Hold the phone's advisory lock until the current transaction ends."""
+    db.execute(select(func.pg_advisory_xact_lock(func.hashtext(phone_number))))
 
 async def group_messages(message_ids: List[UUID], trace_id: UUID) -> GroupingResponse:
     """
@@ -28,24 +54,20 @@ async def group_messages(message_ids: List[UUID], trace_id: UUID) -> GroupingRes
             conversation_id=m.conversation_id if isinstance(m.conversation_id, UUID) else uuid4()
         ) for m in orm_messages]
         if should_group_messages(messages):
-            # Try to find existing conversation
-            phone_number = messages[0].from_phone
-            timestamp = datetime.utcfromtimestamp(messages[0].timestamp)
-            conversation = find_existing_conversation(phone_number, timestamp, db)
-            action = "updated" if conversation else "created"
-            if not conversation:
-                conversation = ConversationDB()
-                db.add(conversation)
-            for msg in orm_messages:
-                conversation.add_message(msg)
-            db.commit()
-            conv_id = conversation.conversation_id
-            if not isinstance(conv_id, UUID):
-                conv_id = uuid4()
+            timestamps = [msg.timestamp for msg in messages]
+            with phone_lock(messages[0].from_phone):
+                conv_id, action, message_count = assign_to_conversation(
+                    messages[0].from_phone,
+                    datetime.utcfromtimestamp(min(timestamps)),
+                    [m.message_id for m in orm_messages],
+                    db,
+                    last_timestamp=datetime.utcfromtimestamp(max(timestamps))
+                )
             return GroupingResponse(
                 conversation_id=conv_id,
                 action=action,
-                message_count=conversation.get_messages().__len__()
+                message_count=message_count,
+                participant_phone=messages[0].from_phone
             )
         else:
             return GroupingResponse(
@@ -54,27 +76,191 @@ async def group_messages(message_ids: List[UUID], trace_id: UUID) -> GroupingRes
                 message_count=len(messages)
             )
 
+async def group_incoming_messages(phone_number: str, messages: List[Tuple[float, UUID, str]], trace_id: UUID) -> List[GroupingResponse]:
+    """
+    Group just-received messages from one sender, given as (timestamp,
+    message_id, content) in timestamp order, without reading the message rows.
+
+    Messages are segmented against the open conversation's running profile
+    (see load_open_profile). The first segment continues that conversation;
+    each later segment starts a new conversation. Batches for the same
+    phone are processed one at a time.
+    """
+    with phone_lock(phone_number):
+        try:
+            return _group_incoming_messages(phone_number, messages)
+        except Exception:
+            active_conversations.invalidate(phone_number)
+            raise
+
+def _group_incoming_messages(phone_number: str, messages: List[Tuple[float, UUID, str]]) -> List[GroupingResponse]:
+    with SessionLocal() as db:
+        # Held until the first segment commits, so replicas grouping the same
+        # phone cannot both decide to start or extend a conversation
+        lock_participant(phone_number, db)
+        # Grouping for this phone is serialized, so the cached profile is extended
+        # in place; it is dropped below if the batch fails before committing
+        profile = load_open_profile(phone_number, datetime.utcfromtimestamp(messages[0][0]), db)
+        segments: List[Tuple[List[UUID], SegmentProfile, bool, List[float]]] = []
+        for timestamp, message_id, content in messages:
+            fresh = segmenter.append(profile, content, timestamp)
+            if fresh is None:
+                if not segments:
+                    segments.append(([], profile, False, []))
+            else:
+                # A fresh profile means a new conversation unless nothing was known to continue
+                segments.append(([], fresh, bool(segments) or profile is not None, []))
+                profile = fresh
+            segments[-1][0].append(message_id)
+            segments[-1][3].append(timestamp)
+        responses = []
+        for message_ids, segment_profile, start_new, timestamps in segments:
+            conv_id, action, message_count = assign_to_conversation(
+                phone_number,
+                datetime.utcfromtimestamp(timestamps[0]),
+                message_ids,
+                db,
+                profile=segment_profile,
+                start_new=start_new,
+                last_timestamp=datetime.utcfromtimestamp(timestamps[-1])
+            )
+            responses.append(GroupingResponse(
+                conversation_id=conv_id,
+                action=action,
+                message_count=message_count,
+                participant_phone=phone_number
+            ))
+    return responses
+
+def load_open_profile(phone_number: str, timestamp: datetime, db: Session) -> Optional[SegmentProfile]:
+    """
+    The open conversation's segment profile. When this replica has none cached
+    (cold start, invalidation, or a conversation extended through /group) it is
+    rebuilt from the conversation's messages and cached, so a message stream
+    segments the same way whatever the cache state.
+    """
+    profile = active_conversations.profile(phone_number, timestamp)
+    if profile is not None:
+        return profile
+    conversation = find_existing_conversation(phone_number, timestamp, db)
+    if conversation is None:
+        return None
+    rows = db.execute(
+        select(MessageDB.content, MessageDB.timestamp)
+        .join(ConversationMessageDB, ConversationMessageDB.c.message_id == MessageDB.message_id)
+        .where(ConversationMessageDB.c.conversation_id == conversation.conversation_id)
+        .order_by(MessageDB.timestamp)
+    ).all()
+    if not rows:
+        return None
+    profile = SegmentProfile()
+    for content, sent_at in rows:
+        profile.add(segmenter.features(content or ""), sent_at.replace(tzinfo=timezone.utc).timestamp())
+    active_conversations.put(phone_number, conversation.conversation_id, conversation.last_message_at, conversation.message_count, profile)
+    return profile
+
+def assign_to_conversation(
+    phone_number: str,
+    timestamp: datetime,
+    message_ids: List[UUID],
+    db: Session,
+    profile: Optional[SegmentProfile] = None,
+    start_new: bool = False,
+    last_timestamp: Optional[datetime] = None
+) -> Tuple[UUID, str, int]:
+    """
+    Attach messages sent between `timestamp` and `last_timestamp` to the
+    participant's open conversation, creating one if none is open (or start_new
+    is set), and commit. Returns (conversation_id, action, message_count).
+    `profile` is cached alongside for later segmentation.
+
+    When the conversation is in active_conversations no reads are issued: the
+    cost of a follow-up message is the association insert and one counter update.
+    """
+    now = datetime.utcnow()
+    first_at = timestamp
+    last_at = max(timestamp, last_timestamp or timestamp)
+    try:
+        lock_participant(phone_number, db)
+        cached = None if start_new else active_conversations.get(phone_number, timestamp)
+        if cached:
+            conversation_id = cached.conversation_id
+        else:
+            conversation = None if start_new else find_existing_conversation(phone_number, timestamp, db)
+            conversation_id = conversation.conversation_id if conversation else None
+        if conversation_id is not None:
+            action = "updated"
+            added = attach_messages(conversation_id, message_ids, db)
+            message_count = record_activity(conversation_id, added, first_at, last_at, now, db)
+        else:
+            action = "created"
+            conversation_id = uuid4()
+            message_ids = list(dict.fromkeys(message_ids))
+            message_count = len(message_ids)
+            db.add(ConversationDB(
+                conversation_id=conversation_id,
+                participant_phone=phone_number,
+                message_count=message_count,
+                first_message_at=first_at,
+                last_message_at=last_at,
+                created_at=now,
+                updated_at=now
+            ))
+            db.flush()
+            attach_messages(conversation_id, message_ids, db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        active_conversations.invalidate(phone_number)
+        raise
+    active_conversations.put(phone_number, conversation_id, last_at, message_count, profile)
+    return conversation_id, action, message_count
+
+def attach_messages(conversation_id: UUID, message_ids: List[UUID], db: Session) -> int:
+    """Link messages to a conversation, skipping ones already linked. Returns how many were new."""
+    if not message_ids:
+        return 0
+    result = db.execute(
+        pg_insert(ConversationMessageDB)
+        .values([{"conversation_id": conversation_id, "message_id": m} for m in message_ids])
+        .on_conflict_do_nothing()
+    )
+    return result.rowcount
+
+def record_activity(conversation_id: UUID, added: int, first_at: datetime, last_at: datetime, now: datetime, db: Session) -> int:
+    """
+    Fold newly attached messages into the conversation's counters with a single
+    UPDATE, so concurrent writers never lose increments. Returns the new
+    message_count.
+    """
+    # LEAST/GREATEST skip NULLs in Postgres, so empty conversations take the new bounds
+    return db.execute(
+        update(ConversationDB)
+        .where(ConversationDB.conversation_id == conversation_id)
+        .values(
+            message_count=ConversationDB.message_count + added,
+            first_message_at=func.least(ConversationDB.first_message_at, first_at),
+            last_message_at=func.greatest(ConversationDB.last_message_at, last_at),
+            updated_at=now
+        )
+        .returning(ConversationDB.message_count)
+    ).scalar_one()
+
 def should_group_messages(messages: List[Message]) -> bool:
     """
-    Group if all messages are within 2 hours, phone numbers match, and content is similar.
+    Group if phone numbers match and the messages form a single segment: no gap
+    or span beyond the grouping window, and each message either replies quickly
+    or is similar to the conversation so far (see segmentation.Segmenter).
     """
     if not messages:
         return False
-    # Time window check
-    timestamps = [msg.timestamp for msg in messages]
-    if max(timestamps) - min(timestamps) > GROUPING_WINDOW_HOURS * 3600:
-        return False
     # Phone number check
     from_phones = {msg.from_phone for msg in messages}
     to_phones = {msg.to_phone for msg in messages}
     if len(from_phones) > 1 or len(to_phones) > 1:
         return False
-    # Content similarity (basic keyword matching)
-    keywords = set(messages[0].content.lower().split())
-    for msg in messages[1:]:
-        if not keywords.intersection(set(msg.content.lower().split())):
-            return False
-    return True
+    ordered = sorted(messages, key=lambda msg: msg.timestamp)
+    return len(segmenter.segment([(msg.timestamp, msg.content) for msg in ordered])) == 1
 
 def create_conversation_summary(messages: List[Message]) -> ConversationSummary:
     """
@@ -83,10 +269,10 @@ def create_conversation_summary(messages: List[Message]) -> ConversationSummary:
     if not messages:
         return ConversationSummary(conversation_id=uuid4(), summary="", confidence=0.0)
     summary = f"{len(messages)} messages between {messages[0].from_phone} and {messages[0].to_phone}."
-    # Confidence: fraction of messages with overlapping keywords
-    keywords = set(messages[0].content.lower().split())
-    overlap = sum(1 for msg in messages if keywords.intersection(set(msg.content.lower().split())))
-    confidence = overlap / len(messages)
+    # Confidence: fraction of messages that opened or joined the first segment on content
+    ordered = sorted(messages, key=lambda msg: msg.timestamp)
+    _, profile = segmenter.segment([(msg.timestamp, msg.content) for msg in ordered])[0]
+    confidence = (1 + profile.similar_count) / len(messages)
     conv_id = messages[0].conversation_id
     if not isinstance(conv_id, UUID):
         conv_id = uuid4()
@@ -98,13 +284,14 @@ def create_conversation_summary(messages: List[Message]) -> ConversationSummary:
 
 def find_existing_conversation(phone_number: str, timestamp: datetime, db: Session) -> Optional[ConversationDB]:
     """
-    Find a conversation by phone number and time window.
+    Find the conversation with this phone number whose latest message is most
+    recent, within the grouping window. Served by a single range probe on
+    idx_conversations_participant_last_message (participant_phone, last_message_at DESC).
     """
     window_start = timestamp - timedelta(hours=GROUPING_WINDOW_HOURS)
     window_end = timestamp + timedelta(hours=GROUPING_WINDOW_HOURS)
-    return db.query(ConversationDB).join(ConversationDB.messages).filter(
-        (MessageDB.from_phone == phone_number) |
-        (MessageDB.to_phone == phone_number),
-        ConversationDB.created_at >= window_start,
-        ConversationDB.created_at <= window_end
-    ).first() 
\ No newline at end of file
+    return db.query(ConversationDB).filter(
+        ConversationDB.participant_phone == phone_number,
+        ConversationDB.last_message_at >= window_start,
+        ConversationDB.last_message_at <= window_end
+    ).order_by(ConversationDB.last_message_at.desc()).first() 
\ No newline at end of file
@@ -1,11 +1,14 @@
+import os
+import time
 import asyncio
 import logging
+import threading
 from uuid import uuid4, UUID
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
 from .models import GroupingRequest, GroupingResponse
-from .handlers import group_messages
-from .events import start_event_consumption, subscriber, setup_event_subscriber
+from .handlers import group_messages, active_conversations
+from .events import start_event_consumption, start_cache_invalidation, subscriber, setup_event_subscriber, publish_conversation_updated_event
 from ...shared.service_base import ServiceBase
 from datetime import datetime
 
@@ -24,13 +27,47 @@ def run_event_consumer_bg():
         logger.exception(f"Event consumer stopped: {e}")
         event_consumer_status["running"] = False
 
+# Reconnect backoff for the cache invalidation consumer, doubling up to the max
+CACHE_INVALIDATION_RETRY_SECONDS = float(os.getenv("CACHE_INVALIDATION_RETRY_SECONDS", "1"))
+CACHE_INVALIDATION_RETRY_MAX_SECONDS = float(os.getenv("CACHE_INVALIDATION_RETRY_MAX_SECONDS", "30"))
+cache_invalidation_stop = threading.Event()
+
+def run_cache_invalidation_bg():
+    """
+    Keep the cache invalidation consumer running. Whenever it stops (it also
+    returns normally when the broker connection drops) the cache is disabled,
+    since it may go stale; start_cache_invalidation re-enables it, empty, once
+    a new consumer is subscribed.
+    """
+    delay = CACHE_INVALIDATION_RETRY_SECONDS
+    while not cache_invalidation_stop.is_set():
+        started = time.monotonic()
+        try:
+            start_cache_invalidation()
+        except Exception as e:
+            logger.exception(f"Cache invalidation consumer stopped: {e}")
+        finally:
+            active_conversations.disable()
+        if cache_invalidation_stop.is_set():
+            break
+        if time.monotonic() - started > CACHE_INVALIDATION_RETRY_MAX_SECONDS:
+            delay = CACHE_INVALIDATION_RETRY_SECONDS
+        logger.warning(f"Cache invalidation consumer exited; active conversation cache disabled, reconnecting in {delay:.1f}s.")
+        cache_invalidation_stop.wait(delay)
+        delay = min(delay * 2, CACHE_INVALIDATION_RETRY_MAX_SECONDS)
+
 @app.on_event("startup")
 async def startup_event():
     setup_event_subscriber()
     loop = asyncio.get_event_loop()
     loop.run_in_executor(None, run_event_consumer_bg)
+    loop.run_in_executor(None, run_cache_invalidation_bg)
     logger.info("Started event consumer in background.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    cache_invalidation_stop.set()
+
 @app.post("/group", response_model=GroupingResponse)
 async def group_endpoint(request: GroupingRequest, req: Request):
     trace_id = getattr(req.state, "trace_id", None)
@@ -38,6 +75,13 @@ async def group_endpoint(request: GroupingRequest, req: Request):
         trace_id = uuid4()
     try:
         response = await group_messages(request.message_ids, trace_id)
+        if response.participant_phone:
+            # Other replicas drop their cached view of this phone
+            published = await asyncio.get_running_loop().run_in_executor(
+                None, publish_conversation_updated_event, response.conversation_id, response.action, trace_id, response.participant_phone
+            )
+            if not published:
+                logger.warning(f"[{trace_id}] CONVERSATION_UPDATED for conversation {response.conversation_id} was not published")
         return response
     except Exception as e:
         logger.exception(f"Error in /group: {e}")
@@ -49,5 +93,6 @@ async def health_check():
         "status": "ok",
         "service": service.service_name,
         "timestamp": datetime.utcnow().isoformat(),
-        "event_consumer_status": event_consumer_status["running"]
+        "event_consumer_status": event_consumer_status["running"],
+        "active_conversation_cache": active_conversations.stats()
     } 
\ No newline at end of file
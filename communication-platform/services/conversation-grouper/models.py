@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 from pydantic import BaseModel, Field
 from ...shared.models import Conversation, Message
@@ -24,6 +24,7 @@ class GroupingResponse(BaseModel):
     conversation_id: UUID = Field(..., description="ID of the grouped conversation.")
     action: str = Field(..., description="Action taken: created, updated, or merged.")
     message_count: int = Field(..., description="Number of messages in the conversation.")
+    participant_phone: Optional[str] = Field(default=None, description="Phone number the conversation is with, when grouped.")
 
     class Config:
         json_schema_extra = {
@@ -31,7 +32,8 @@ class GroupingResponse(BaseModel):
                 {
                     "conversation_id": "123e4567-e89b-12d3-a456-426614174999",
                     "action": "created",
-                    "message_count": 5
+                    "message_count": 5,
+                    "participant_phone": "+15551234567"
                 }
             ]
         }
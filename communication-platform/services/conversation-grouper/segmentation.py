@@ -0,0 +1,181 @@
+"""
+Incremental conversation segmentation.
+
+Each open conversation keeps a SegmentProfile: the shingles seen so far (or a
+fixed-size MinHash signature of them) and its first/last activity. A new
+message is tokenized once and scored against the profile in time proportional
+to its own length, however long the conversation already is.
+"""
+import os
+import re
+import random
+import hashlib
+from typing import FrozenSet, List, Optional, Sequence, Tuple
+
+# "overlap": |A∩P| / min(|A|, |P|), exact. Does not dilute as a thread grows.
+# "jaccard": |A∩P| / |A∪P|, exact.
+# "minhash": MinHash estimate of jaccard; the profile is a fixed-size signature
+#            instead of the full shingle set.
+SEGMENT_SIMILARITY = os.getenv("SEGMENT_SIMILARITY", "overlap")
+SEGMENT_THRESHOLD = float(os.getenv("SEGMENT_THRESHOLD", "0.1"))
+SEGMENT_SHINGLE_SIZE = int(os.getenv("SEGMENT_SHINGLE_SIZE", "1"))
+# Replies within this gap join the conversation whatever their content...
+SEGMENT_REPLY_GAP_MINUTES = float(os.getenv("SEGMENT_REPLY_GAP_MINUTES", "10"))
+# ...and a silence longer than this always starts a new one
+SEGMENT_MAX_GAP_MINUTES = float(os.getenv("SEGMENT_MAX_GAP_MINUTES", "120"))
+SEGMENT_MINHASH_PERMUTATIONS = int(os.getenv("SEGMENT_MINHASH_PERMUTATIONS", "64"))
+
+SIMILARITY_METHODS = ("overlap", "jaccard", "minhash")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "at", "be", "but", "by", "for", "i", "i'm", "in", "is", "it",
+    "it's", "me", "my", "of", "on", "or", "so", "that", "the", "this", "to", "we", "you",
+})
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+def tokenize(content: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(content.lower()) if t not in STOPWORDS]
+
+def shingle(tokens: Sequence[str], size: int) -> FrozenSet[str]:
+    if size <= 1 or len(tokens) < size:
+        return frozenset(tokens)
+    return frozenset(" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1))
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+class MessageFeatures:
+    __slots__ = ("shingles", "signature")
+
+    def __init__(self, shingles: FrozenSet[str], signature: Optional[List[int]] = None):
+        self.shingles = shingles
+        self.signature = signature
+
+class SegmentProfile:
+    """Running content profile and activity bounds of one conversation segment."""
+    __slots__ = ("shingles", "signature", "first_timestamp", "last_timestamp", "message_count", "similar_count")
+
+    def __init__(self):
+        self.shingles: set = set()
+        self.signature: Optional[List[int]] = None
+        self.first_timestamp: Optional[float] = None
+        self.last_timestamp: Optional[float] = None
+        self.message_count = 0
+        # Messages that joined on content rather than being the first or a quick reply
+        self.similar_count = 0
+
+    def add(self, features: MessageFeatures, timestamp: float, similar: bool = False):
+        if features.signature is not None:
+            if self.signature is None:
+                self.signature = list(features.signature)
+            else:
+                self.signature = [min(a, b) for a, b in zip(self.signature, features.signature)]
+        else:
+            self.shingles.update(features.shingles)
+        self.first_timestamp = timestamp if self.first_timestamp is None else min(self.first_timestamp, timestamp)
+        self.last_timestamp = timestamp if self.last_timestamp is None else max(self.last_timestamp, timestamp)
+        self.message_count += 1
+        if similar:
+            self.similar_count += 1
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.shingles and self.signature is None
+
+class Segmenter:
+    """
+    Decides whether each new message continues a segment:
+
+    - a gap longer than max_gap_seconds, or a segment spanning more than
+      window_seconds, always splits;
+    - a reply within reply_gap_seconds, or a message with no content tokens,
+      always joins;
+    - otherwise the message joins if its similarity to the profile reaches
+      `threshold`.
+    """
+    def __init__(
+        self,
+        similarity: str = SEGMENT_SIMILARITY,
+        threshold: float = SEGMENT_THRESHOLD,
+        shingle_size: int = SEGMENT_SHINGLE_SIZE,
+        reply_gap_seconds: float = SEGMENT_REPLY_GAP_MINUTES * 60,
+        max_gap_seconds: float = SEGMENT_MAX_GAP_MINUTES * 60,
+        window_seconds: float = 2 * 3600,
+        num_perm: int = SEGMENT_MINHASH_PERMUTATIONS,
+    ):
+        if similarity not in SIMILARITY_METHODS:
+            raise ValueError(f"Unknown similarity '{similarity}', expected one of {SIMILARITY_METHODS}")
+        self.similarity = similarity
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.reply_gap_seconds = reply_gap_seconds
+        self.max_gap_seconds = max_gap_seconds
+        self.window_seconds = window_seconds
+        rng = random.Random(1)
+        self._permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ] if similarity == "minhash" else []
+
+    def features(self, content: str) -> MessageFeatures:
+        shingles = shingle(tokenize(content or ""), self.shingle_size)
+        if not self._permutations or not shingles:
+            return MessageFeatures(shingles)
+        hashes = [_hash64(s) for s in shingles]
+        signature = [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._permutations]
+        return MessageFeatures(shingles, signature)
+
+    def score(self, features: MessageFeatures, profile: SegmentProfile) -> float:
+        if self.similarity == "minhash":
+            if features.signature is None or profile.signature is None:
+                return 0.0
+            return sum(1 for a, b in zip(features.signature, profile.signature) if a == b) / len(self._permutations)
+        if not features.shingles or not profile.shingles:
+            return 0.0
+        common = sum(1 for s in features.shingles if s in profile.shingles)
+        if self.similarity == "overlap":
+            return common / min(len(features.shingles), len(profile.shingles))
+        return common / (len(features.shingles) + len(profile.shingles) - common)
+
+    def assess(self, profile: SegmentProfile, features: MessageFeatures, timestamp: float) -> Tuple[bool, bool]:
+        """Returns (joins, joined_on_content) for a message against a non-empty segment."""
+        gap = abs(timestamp - profile.last_timestamp)
+        span = max(profile.last_timestamp, timestamp) - min(profile.first_timestamp, timestamp)
+        if gap > self.max_gap_seconds or span > self.window_seconds:
+            return False, False
+        similar = bool(features.shingles) and not profile.is_empty and self.score(features, profile) >= self.threshold
+        if similar:
+            return True, True
+        if gap <= self.reply_gap_seconds or not features.shingles or profile.is_empty:
+            return True, False
+        return False, False
+
+    def append(self, profile: Optional[SegmentProfile], content: str, timestamp: float) -> Optional[SegmentProfile]:
+        """
+        Add a message to `profile` if it continues that segment and return None;
+        otherwise return a new profile started from the message.
+        """
+        features = self.features(content)
+        if profile is not None and profile.message_count:
+            joins, similar = self.assess(profile, features, timestamp)
+            if joins:
+                profile.add(features, timestamp, similar)
+                return None
+        fresh = SegmentProfile()
+        fresh.add(features, timestamp)
+        return fresh
+
+    def segment(self, messages: Sequence[Tuple[float, str]]) -> List[Tuple[List[int], SegmentProfile]]:
+        """Split (timestamp, content) pairs, in order, into runs of indices with their profiles."""
+        segments: List[Tuple[List[int], SegmentProfile]] = []
+        profile = None
+        for i, (timestamp, content) in enumerate(messages):
+            fresh = self.append(profile, content, timestamp)
+            if fresh is None:
+                segments[-1][0].append(i)
+            else:
+                profile = fresh
+                segments.append(([i], profile))
+        return segments
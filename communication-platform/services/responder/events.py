@@ -54,5 +54,6 @@ def handle_missed_call(event_data: Dict[str, Any]):
     pass  # Implement as needed
 
 def subscribe_to_events():
-    subscriber.subscribe("conversation.categorized.*", lambda event_data: handle_conversation_categorized(event_data))
-    subscriber.subscribe("call.missed", lambda event_data: handle_missed_call(event_data)) 
\ No newline at end of file
+    subscriber.subscribe("conversation.categorized.#", lambda event_data: handle_conversation_categorized(event_data))
+    subscriber.subscribe("call.missed", lambda event_data: handle_missed_call(event_data))
+    subscriber.start_consuming() 
\ No newline at end of file
@@ -1 +1,25 @@
-# Placeholder for spam-detector database logic 
\ No newline at end of file
+# Database models for the spam-detector service
+from sqlalchemy import Column, String, Text, DateTime, Float, Integer, BigInteger
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+import uuid
+from ...shared.database import Base
+
+class SpamRuleDB(Base):
+    __tablename__ = "spam_rules"
+
+    rule_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    rule_type = Column(String(20), nullable=False)
+    pattern = Column(Text, nullable=False)
+    weight = Column(Float, nullable=False, default=0.2)
+    description = Column(Text, nullable=False, default="")
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class SpamRulesetVersionDB(Base):
+    """Single row whose version is bumped in the same transaction as every rule change."""
+    __tablename__ = "spam_ruleset_version"
+
+    id = Column(Integer, primary_key=True, default=1)
+    version = Column(BigInteger, nullable=False, default=1)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
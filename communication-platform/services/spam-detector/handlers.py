@@ -1,85 +1,93 @@
 # Placeholder for spam-detector handlers 
+import os
 import re
 from datetime import datetime
 from uuid import UUID
 from typing import List, Tuple, Optional
-import httpx
-import asyncio
-import aioredis
-from .models import SpamEvaluationResponse, Action
+from .models import SpamEvaluationResponse, Action, SpamRule
+from .ruleset import get_ruleset, set_rules
+from .reputation import ReputationCache
+from .signals import SignalPipeline, SignalContext, SignalResult
+from .velocity import VelocityTracker, VelocityLimits
 
-# Spam detection configuration
+# Spam detection configuration: the default ruleset, replaceable through PUT /rules
 SPAM_KEYWORDS = [
     "free", "win", "winner", "prize", "cash", "urgent", "claim", "click", "buy now", "limited offer"
 ]
 SPAM_PATTERNS = [
-    re.compile(r"\\b(?:\d{10,})\\b"),  # long digit sequences
-    re.compile(r"http[s]?://[\\w./-]+"),  # URLs
+    re.compile(r"\b(?:\d{10,})\b"),  # long digit sequences
+    re.compile(r"http[s]?://[\w./-]+"),  # URLs
     re.compile(r"[A-Z]{5,}"),  # long uppercase words
 ]
+RULE_WEIGHT = 0.2
 BLOCK_THRESHOLD = 0.8
 FLAG_THRESHOLD = 0.6
+ACTION_SEVERITY = {Action.ALLOW: 0, Action.FLAG: 1, Action.BLOCK: 2}
+
+def default_spam_rules() -> List[SpamRule]:
+    rules = [SpamRule(rule_type="keyword", pattern=keyword, weight=RULE_WEIGHT, description=f"Keyword: {keyword}") for keyword in SPAM_KEYWORDS]
+    rules += [SpamRule(rule_type="pattern", pattern=pattern.pattern, weight=RULE_WEIGHT, description=f"Pattern: {pattern.pattern}") for pattern in SPAM_PATTERNS]
+    return rules
+
+# Installed as version 0 so the first poll of the rule store (seeded at
+# version 1) always replaces them with the stored rules and their ids
+set_rules(default_spam_rules(), version=0)
 
 # Redis and rate limit config
-REDIS_URL = "redis://localhost:6379/0"
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 REDIS_EXPIRE = 3600  # 1 hour
 RATE_LIMIT = 10  # max 10 external calls per minute
 RATE_LIMIT_KEY = "external_api_rate_limit"
+EXTERNAL_SPAM_API_URL = os.getenv("EXTERNAL_SPAM_API_URL", "https://public-spam-api.example.com/lookup")
+# Failed, empty and rate-limited lookups are remembered for this long
+REPUTATION_NEGATIVE_TTL = float(os.getenv("REPUTATION_NEGATIVE_TTL_SECONDS", "60"))
+REPUTATION_LOCAL_TTL = float(os.getenv("REPUTATION_LOCAL_TTL_SECONDS", "300"))
+REPUTATION_CACHE_SIZE = int(os.getenv("REPUTATION_CACHE_SIZE", "10000"))
+
+reputation_cache = ReputationCache(
+    REDIS_URL,
+    EXTERNAL_SPAM_API_URL,
+    ttl=REDIS_EXPIRE,
+    negative_ttl=REPUTATION_NEGATIVE_TTL,
+    local_ttl=REPUTATION_LOCAL_TTL,
+    maxsize=REPUTATION_CACHE_SIZE,
+    rate_limit=RATE_LIMIT,
+    rate_limit_key=RATE_LIMIT_KEY,
+)
 
-redis = None
+# Signals still outstanding after this long are dropped from the evaluation
+SPAM_EVALUATION_DEADLINE = float(os.getenv("SPAM_EVALUATION_DEADLINE_MS", "250")) / 1000
+spam_signals = SignalPipeline(SPAM_EVALUATION_DEADLINE)
 
-async def get_redis():
-    global redis
-    if redis is None:
-        redis = aioredis.from_url(REDIS_URL, decode_responses=True)
-    return redis
+# Per-sender velocity limits. Reaching one scores the timing signal 1.0 (nothing
+# else does) and raises the action to at least VELOCITY_LIMIT_ACTION, since the
+# timing signal's weight alone cannot push a clean-content sender past FLAG
+VELOCITY_LIMIT_ACTION = Action(os.getenv("VELOCITY_LIMIT_ACTION", Action.FLAG.value))
+VELOCITY_LIMIT_SCORE = 1.0
+velocity_tracker = VelocityTracker(
+    VelocityLimits(
+        per_minute=int(os.getenv("VELOCITY_MAX_PER_MINUTE", "20")),
+        per_hour=int(os.getenv("VELOCITY_MAX_PER_HOUR", "200")),
+        per_day=int(os.getenv("VELOCITY_MAX_PER_DAY", "1000")),
+        burst=int(os.getenv("VELOCITY_BURST_THRESHOLD", "10")),
+        burst_seconds=int(os.getenv("VELOCITY_BURST_WINDOW_SECONDS", "10")),
+    ),
+    max_senders=int(os.getenv("VELOCITY_MAX_SENDERS", "50000")),
+)
 
 async def check_external_spam_db(phone_number: str) -> Optional[float]:
     """
     Query an external spam database (Truecaller-style) for phone reputation.
     Returns a score (0.0 good, 1.0 bad) or None if unavailable.
-    Caches results in Redis and rate limits external calls.
+    Results, including misses, are cached in-process and in Redis, and
+    external calls are rate limited; see ReputationCache.
     """
-    redis_conn = await get_redis()
-    cache_key = f"spamdb:{phone_number}"
-    cached = await redis_conn.get(cache_key)
-    if cached is not None:
-        return float(cached)
-    # Rate limiting
-    calls = await redis_conn.incr(RATE_LIMIT_KEY)
-    if calls == 1:
-        await redis_conn.expire(RATE_LIMIT_KEY, 60)
-    if calls > RATE_LIMIT:
-        return None  # Rate limit exceeded, fallback
-    # External API call (placeholder URL)
-    try:
-        async with httpx.AsyncClient(timeout=5) as client:
-            resp = await client.get(f"https://public-spam-api.example.com/lookup?phone={phone_number}")
-            if resp.status_code == 200:
-                data = resp.json()
-                score = float(data.get("spam_score", 0.0))  # 0.0-1.0
-                await redis_conn.set(cache_key, score, ex=REDIS_EXPIRE)
-                return score
-    except Exception as e:
-        # Log error (placeholder)
-        pass
-    return None  # Fallback if API fails
+    return await reputation_cache.lookup(phone_number)
 
 async def evaluate_spam(phone_number: str, message: str, timestamp: datetime, trace_id: UUID) -> SpamEvaluationResponse:
-    # Run detection methods
-    content_score, content_reasons = analyze_message_content(message)
-    # Try external spam DB first
-    external_score = await check_external_spam_db(phone_number)
-    if external_score is not None:
-        reputation_score = external_score
-    else:
-        reputation_score = await check_phone_reputation(phone_number)
-    timing_score = check_timing_patterns(phone_number, timestamp)
-
-    # Combine scores (weighted average)
-    weights = [0.5, 0.3, 0.2]  # content, reputation, timing
-    scores = [content_score, reputation_score, timing_score]
-    score = sum(w * s for w, s in zip(weights, scores))
+    # Run every registered signal concurrently under the evaluation deadline
+    evaluation = await spam_signals.evaluate(SignalContext(phone_number, message, timestamp, trace_id))
+    score = evaluation.score
 
     # Determine action
     if score >= BLOCK_THRESHOLD:
@@ -88,25 +96,17 @@ async def evaluate_spam(phone_number: str, message: str, timestamp: datetime, tr
         action = Action.FLAG
     else:
         action = Action.ALLOW
-
-    # Collect reasons
-    reasons = content_reasons
-    if reputation_score > 0.5:
-        reasons.append("Phone number has poor reputation.")
-    if timing_score > 0.5:
-        reasons.append("Suspicious timing pattern detected.")
-    if external_score is not None:
-        reasons.append("External spam DB checked.")
-    else:
-        reasons.append("External spam DB unavailable, used internal rules.")
+    timing = evaluation.scores.get("timing")
+    if timing is not None and timing >= VELOCITY_LIMIT_SCORE and ACTION_SEVERITY[action] < ACTION_SEVERITY[VELOCITY_LIMIT_ACTION]:
+        action = VELOCITY_LIMIT_ACTION
 
     # Store evaluation result (placeholder)
     # TODO: Implement database storage
 
     return SpamEvaluationResponse(
-        is_spam=score >= FLAG_THRESHOLD,
+        is_spam=action != Action.ALLOW,
         score=score,
-        reasons=reasons,
+        reasons=evaluation.reasons,
         action=action
     )
 
@@ -118,23 +118,36 @@ async def check_phone_reputation(phone_number: str) -> float:
     return 0.1  # good reputation
 
 def analyze_message_content(message: str) -> Tuple[float, List[str]]:
-    reasons = []
-    score = 0.0
-    lower_msg = message.lower()
-    for keyword in SPAM_KEYWORDS:
-        if keyword in lower_msg:
-            score += 0.2
-            reasons.append(f"Keyword detected: '{keyword}'")
-    for pattern in SPAM_PATTERNS:
-        if pattern.search(message):
-            score += 0.2
-            reasons.append(f"Pattern matched: {pattern.pattern}")
-    score = min(score, 1.0)
-    return score, reasons
-
-def check_timing_patterns(phone_number: str, timestamp: datetime) -> float:
-    # Placeholder: Simulate timing pattern analysis
-    # TODO: Implement real timing analysis
+    # Single pass over the message with the active compiled ruleset
+    return get_ruleset().evaluate(message)
+
+def check_timing_patterns(phone_number: str, timestamp: datetime) -> Tuple[float, List[str]]:
+    # Counts this message towards the sender's velocity, so call it once per evaluation
+    velocity_score, reasons = velocity_tracker.score(velocity_tracker.record(phone_number, timestamp))
     if timestamp.hour < 6 or timestamp.hour > 22:
-        return 0.7  # suspicious time
-    return 0.1  # normal time 
\ No newline at end of file
+        reasons.append("Message sent at an unusual hour.")
+        return max(velocity_score, 0.7), reasons  # suspicious time
+    return max(velocity_score, 0.1), reasons
+
+# Registered spam signals, combined as a weighted mean by spam_signals
+@spam_signals.register("content", weight=0.5)
+def content_signal(context: SignalContext) -> SignalResult:
+    return SignalResult(*analyze_message_content(context.message))
+
+async def internal_reputation_signal(context: SignalContext) -> SignalResult:
+    score = await check_phone_reputation(context.phone_number)
+    reasons = ["Phone number has poor reputation."] if score > 0.5 else []
+    return SignalResult(score, reasons + ["External spam DB unavailable, used internal rules."])
+
+@spam_signals.register("reputation", weight=0.3, fallback=internal_reputation_signal)
+async def reputation_signal(context: SignalContext) -> Optional[SignalResult]:
+    score = await check_external_spam_db(context.phone_number)
+    if score is None:
+        return None
+    reasons = ["Phone number has poor reputation."] if score > 0.5 else []
+    return SignalResult(score, reasons + ["External spam DB checked."])
+
+@spam_signals.register("timing", weight=0.2)
+def timing_signal(context: SignalContext) -> SignalResult:
+    score, reasons = check_timing_patterns(context.phone_number, context.timestamp)
+    return SignalResult(score, (["Suspicious timing pattern detected."] if score > 0.5 else []) + reasons)
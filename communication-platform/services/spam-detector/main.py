@@ -5,16 +5,28 @@ from typing import List
 from datetime import datetime
 from ...shared.service_base import ServiceBase
 from .models import SpamEvaluationRequest, SpamEvaluationResponse, SpamRule
-from .handlers import evaluate_spam, check_phone_reputation, SPAM_KEYWORDS, SPAM_PATTERNS
+from .handlers import evaluate_spam, check_phone_reputation, reputation_cache
+from .ruleset import get_ruleset, get_active
+from . import rule_store
+from ...shared.database import SessionLocal
 from .events import handle_message_received, subscribe_to_message_received
 
 service = ServiceBase("spam-detector", "0.1.0")
 app = service.app
 
+rule_poller = rule_store.RulePoller()
+
 @app.on_event("startup")
 def startup_event():
     # Start background event consumption
     subscribe_to_message_received()
+    # Load the stored rules, and reload them whenever their version changes
+    rule_poller.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    rule_poller.stop()
+    await reputation_cache.close()
 
 @app.post("/evaluate", response_model=SpamEvaluationResponse)
 async def evaluate(request: SpamEvaluationRequest):
@@ -39,10 +51,52 @@ async def report_spam(request: ReportRequest):
 
 @app.get("/rules", response_model=List[SpamRule])
 def get_rules():
-    # Return current spam detection rules (keywords and patterns)
-    rules = []
-    for keyword in SPAM_KEYWORDS:
-        rules.append(SpamRule(rule_type="keyword", pattern=keyword, weight=0.2, description=f"Keyword: {keyword}"))
-    for pattern in SPAM_PATTERNS:
-        rules.append(SpamRule(rule_type="pattern", pattern=pattern.pattern, weight=0.2, description=f"Pattern: {pattern.pattern}"))
-    return rules 
\ No newline at end of file
+    # Return the active spam detection rules (keywords and patterns)
+    return list(get_ruleset().rules)
+
+@app.get("/rules/version")
+def get_rules_version():
+    active = get_active()
+    return {"version": active.version, "rules": len(active.ruleset)}
+
+@app.put("/rules", response_model=List[SpamRule])
+def replace_all_rules(rules: List[SpamRule]):
+    # Replace the stored rules; the old ruleset stays active if any rule is invalid
+    with SessionLocal() as db:
+        try:
+            return rule_store.replace_rules(db, rules)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/rules", response_model=SpamRule, status_code=201)
+def create_rule(rule: SpamRule):
+    with SessionLocal() as db:
+        try:
+            return rule_store.create_rule(db, rule)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/rules/{rule_id}", response_model=SpamRule)
+def get_rule(rule_id: UUID):
+    with SessionLocal() as db:
+        rule = rule_store.get_rule(db, rule_id)
+    if rule is None:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    return rule
+
+@app.put("/rules/{rule_id}", response_model=SpamRule)
+def update_rule(rule_id: UUID, rule: SpamRule):
+    with SessionLocal() as db:
+        try:
+            updated = rule_store.update_rule(db, rule_id, rule)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    return updated
+
+@app.delete("/rules/{rule_id}", status_code=204)
+def delete_rule(rule_id: UUID):
+    with SessionLocal() as db:
+        if not rule_store.delete_rule(db, rule_id):
+            raise HTTPException(status_code=404, detail="Rule not found")
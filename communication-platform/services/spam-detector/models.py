@@ -1,6 +1,7 @@
 from datetime import datetime
 from enum import Enum
-from typing import List
+from typing import List, Optional
+from uuid import UUID
 from pydantic import BaseModel
 from ...shared.models import SpamEvaluation
 
@@ -21,6 +22,7 @@ class SpamEvaluationResponse(BaseModel):
     action: Action
 
 class SpamRule(BaseModel):
+    rule_id: Optional[UUID] = None  # assigned by the rule store
     rule_type: str
     pattern: str
     weight: float
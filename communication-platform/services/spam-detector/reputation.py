@@ -0,0 +1,197 @@
+# Phone reputation lookups for the spam-detector service
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+import httpx
+from ...shared.cache import TTLCache
+
+logger = logging.getLogger("spam_detector.reputation")
+
+# One round trip for the cache check and, on a miss, the rate limit. Returns
+# {1, value} on a hit, {0, calls} when a lookup may go out, {2, calls} when
+# the external API is rate limited.
+CHECK_AND_RATE_LIMIT = """
+local cached = redis.call('GET', KEYS[1])
+if cached then
+    return {1, cached}
+end
+local calls = redis.call('INCR', KEYS[2])
+if calls == 1 then
+    redis.call('EXPIRE', KEYS[2], ARGV[2])
+end
+if calls > tonumber(ARGV[1]) then
+    return {2, calls}
+end
+return {0, calls}
+"""
+
+# Redis value recording that the external API had no usable answer for a number
+NEGATIVE = "none"
+_NEGATIVE = object()
+
+class ReputationCache:
+    """
+    External phone reputation lookups behind two cache tiers: an in-process
+    TTL LRU in front of Redis. Failed, empty and rate-limited lookups are
+    cached as negative entries with a short TTL, so a hot unknown number
+    neither hammers the API nor pays a Redis round trip per message.
+    Concurrent lookups of the same number share one in-flight request.
+    """
+    def __init__(
+        self,
+        redis_url: str,
+        api_url: str,
+        ttl: float = 3600,
+        negative_ttl: float = 60,
+        local_ttl: float = 300,
+        maxsize: int = 10000,
+        rate_limit: int = 10,
+        rate_window: int = 60,
+        rate_limit_key: str = "external_api_rate_limit",
+        key_prefix: str = "spamdb:",
+        timeout: float = 5,
+    ):
+        self.redis_url = redis_url
+        self.api_url = api_url
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.local_ttl = local_ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=local_ttl)
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.rate_limit_key = rate_limit_key
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+        # Redis and httpx clients, and in-flight lookups, belong to the loop that created them
+        self._redis_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, object]" = weakref.WeakKeyDictionary()
+        self._http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self._scripts: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, object]" = weakref.WeakKeyDictionary()
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.counters = {
+            "local_hits": 0, "redis_hits": 0, "negative_hits": 0, "coalesced": 0,
+            "api_calls": 0, "api_failures": 0, "rate_limited": 0, "redis_errors": 0,
+        }
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _redis(self):
+        loop = asyncio.get_running_loop()
+        client = self._redis_clients.get(loop)
+        if client is None:
+            import redis.asyncio as aioredis
+            client = aioredis.from_url(self.redis_url, decode_responses=True)
+            self._redis_clients[loop] = client
+            self._scripts[loop] = client.register_script(CHECK_AND_RATE_LIMIT)
+        return client
+
+    def _http(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._http_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+            self._http_clients[loop] = client
+        return client
+
+    def _remember(self, phone_number: str, score: Optional[float]):
+        if score is None:
+            self.local.set(phone_number, _NEGATIVE, ttl=min(self.negative_ttl, self.local_ttl))
+        else:
+            self.local.set(phone_number, score)
+
+    async def lookup(self, phone_number: str) -> Optional[float]:
+        """Reputation score (0.0 good, 1.0 bad) or None if unknown or unavailable."""
+        cached = self.local.get(phone_number)
+        if cached is not None:
+            if cached is _NEGATIVE:
+                self._count("negative_hits")
+                return None
+            self._count("local_hits")
+            return cached
+        inflight = self._inflight.setdefault(asyncio.get_running_loop(), {})
+        task = inflight.get(phone_number)
+        if task is not None:
+            self._count("coalesced")
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(self._fetch(phone_number))
+        inflight[phone_number] = task
+        task.add_done_callback(lambda _: inflight.pop(phone_number, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, phone_number: str) -> Optional[float]:
+        try:
+            status, value = await self._check_redis(phone_number)
+        except Exception as e:
+            # Without Redis the shared rate limit cannot be enforced; fall back to internal rules
+            self._count("redis_errors")
+            logger.warning(f"Reputation cache check failed for {phone_number}: {e}")
+            self._remember(phone_number, None)
+            return None
+        if status == 1:
+            score = None if value == NEGATIVE else float(value)
+            self._count("redis_hits" if score is not None else "negative_hits")
+            self._remember(phone_number, score)
+            return score
+        if status == 2:
+            self._count("rate_limited")
+            self._remember(phone_number, None)
+            return None
+        score = await self._fetch_external(phone_number)
+        self._remember(phone_number, score)
+        try:
+            await self._store_redis(phone_number, score)
+        except Exception as e:
+            self._count("redis_errors")
+            logger.warning(f"Reputation cache write failed for {phone_number}: {e}")
+        return score
+
+    def _script(self):
+        self._redis()
+        return self._scripts[asyncio.get_running_loop()]
+
+    async def _check_redis(self, phone_number: str) -> Tuple[int, object]:
+        status, value = await self._script()(
+            keys=[self.key_prefix + phone_number, self.rate_limit_key],
+            args=[self.rate_limit, self.rate_window]
+        )
+        return int(status), value
+
+    async def _store_redis(self, phone_number: str, score: Optional[float]):
+        if score is None:
+            await self._redis().set(self.key_prefix + phone_number, NEGATIVE, ex=int(self.negative_ttl))
+        else:
+            await self._redis().set(self.key_prefix + phone_number, score, ex=int(self.ttl))
+
+    async def _fetch_external(self, phone_number: str) -> Optional[float]:
+        self._count("api_calls")
+        try:
+            resp = await self._http().get(self.api_url, params={"phone": phone_number})
+            if resp.status_code == 200:
+                return float(resp.json().get("spam_score", 0.0))  # 0.0-1.0
+            logger.warning(f"Reputation lookup for {phone_number} returned HTTP {resp.status_code}")
+        except Exception as e:
+            logger.warning(f"Reputation lookup for {phone_number} failed: {e}")
+        self._count("api_failures")
+        return None
+
+    async def close(self):
+        """Close the running loop's Redis and HTTP clients, e.g. from a shutdown hook."""
+        loop = asyncio.get_running_loop()
+        http_client = self._http_clients.pop(loop, None)
+        redis_client = self._redis_clients.pop(loop, None)
+        self._scripts.pop(loop, None)
+        if http_client is not None:
+            await http_client.aclose()
+        if redis_client is not None:
+            await redis_client.aclose()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self.local), **self.counters}
@@ -0,0 +1,142 @@
+# Persistent spam rule store for the spam-detector service
+import os
+import logging
+import threading
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from ...shared.database import SessionLocal
+from .database import SpamRuleDB, SpamRulesetVersionDB
+from .models import SpamRule
+from .ruleset import compile_ruleset, get_active, set_rules
+
+logger = logging.getLogger("spam_detector.rule_store")
+
+RULES_POLL_INTERVAL_SECONDS = float(os.getenv("RULES_POLL_INTERVAL_SECONDS", "10"))
+
+def _to_model(row: SpamRuleDB) -> SpamRule:
+    return SpamRule(rule_id=row.rule_id, rule_type=row.rule_type, pattern=row.pattern, weight=row.weight, description=row.description)
+
+def current_version(db: Session) -> int:
+    return db.execute(select(SpamRulesetVersionDB.version).where(SpamRulesetVersionDB.id == 1)).scalar_one_or_none() or 0
+
+def load_rules(db: Session) -> Tuple[int, List[SpamRule]]:
+    """
+    The stored version and rules. The version is read first: a change committed
+    in between is then picked up again on the next refresh, never lost.
+    """
+    version = current_version(db)
+    rows = db.execute(select(SpamRuleDB).order_by(SpamRuleDB.created_at, SpamRuleDB.rule_id)).scalars().all()
+    return version, [_to_model(row) for row in rows]
+
+def refresh_ruleset(db: Session) -> bool:
+    """Recompile the active ruleset if the stored version moved. Returns whether it did."""
+    if current_version(db) == get_active().version:
+        return False
+    version, rules = load_rules(db)
+    set_rules(rules, version=version)
+    logger.info(f"Loaded spam ruleset version {version} ({len(rules)} rules)")
+    return True
+
+def _bump_version(db: Session) -> int:
+    version = db.execute(
+        update(SpamRulesetVersionDB)
+        .where(SpamRulesetVersionDB.id == 1)
+        .values(version=SpamRulesetVersionDB.version + 1, updated_at=datetime.utcnow())
+        .returning(SpamRulesetVersionDB.version)
+    ).scalar_one_or_none()
+    if version is None:
+        db.add(SpamRulesetVersionDB(id=1, version=1))
+        version = 1
+    return version
+
+def _commit_change(db: Session, candidate: List[SpamRule]):
+    """
+    Validate that `candidate` (the full rule list after the change) compiles,
+    then bump the version and commit alongside the pending row changes, and
+    apply the new ruleset to this worker straight away.
+    """
+    try:
+        compile_ruleset(candidate)
+    except ValueError:
+        db.rollback()
+        raise
+    _bump_version(db)
+    db.commit()
+    refresh_ruleset(db)
+
+def list_rules(db: Session) -> List[SpamRule]:
+    return load_rules(db)[1]
+
+def get_rule(db: Session, rule_id: UUID) -> Optional[SpamRule]:
+    row = db.get(SpamRuleDB, rule_id)
+    return _to_model(row) if row else None
+
+def create_rule(db: Session, rule: SpamRule) -> SpamRule:
+    row = SpamRuleDB(rule_type=rule.rule_type, pattern=rule.pattern, weight=rule.weight, description=rule.description)
+    db.add(row)
+    db.flush()
+    created = _to_model(row)
+    _commit_change(db, list_rules(db))
+    return created
+
+def update_rule(db: Session, rule_id: UUID, rule: SpamRule) -> Optional[SpamRule]:
+    row = db.get(SpamRuleDB, rule_id)
+    if row is None:
+        return None
+    row.rule_type, row.pattern, row.weight, row.description = rule.rule_type, rule.pattern, rule.weight, rule.description
+    row.updated_at = datetime.utcnow()
+    db.flush()
+    updated = _to_model(row)
+    _commit_change(db, list_rules(db))
+    return updated
+
+def delete_rule(db: Session, rule_id: UUID) -> bool:
+    row = db.get(SpamRuleDB, rule_id)
+    if row is None:
+        return False
+    db.delete(row)
+    db.flush()
+    _commit_change(db, list_rules(db))
+    return True
+
+def replace_rules(db: Session, rules: List[SpamRule]) -> List[SpamRule]:
+    db.query(SpamRuleDB).delete()
+    for rule in rules:
+        db.add(SpamRuleDB(rule_type=rule.rule_type, pattern=rule.pattern, weight=rule.weight, description=rule.description))
+    db.flush()
+    stored = list_rules(db)
+    _commit_change(db, stored)
+    return stored
+
+class RulePoller:
+    """Background thread that reloads the ruleset whenever the stored version changes."""
+    def __init__(self, interval: float = RULES_POLL_INTERVAL_SECONDS, session_factory=SessionLocal):
+        self.interval = interval
+        self.session_factory = session_factory
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll_once(self) -> bool:
+        try:
+            with self.session_factory() as db:
+                return refresh_ruleset(db)
+        except Exception as e:
+            logger.warning(f"Could not refresh spam rules, keeping version {get_active().version}: {e}")
+            return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="spam-rule-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,224 @@
+"""
+Compiled spam content rules.
+
+Keyword rules are merged into one Aho-Corasick automaton, and pattern rules
+into one RE2 pattern set that reports every matching pattern in a single pass
+over the message; only the patterns that matched are then searched again for
+their positions. Patterns RE2 cannot run (lookarounds, backreferences), or
+all of them when google-re2 is not installed, fall back to Python's re: one
+alternation regex clears messages none of them match, and messages it does
+match are checked pattern by pattern. Patterns are validated with Python's re
+either way, so the same rules are accepted everywhere. Note that RE2's word
+and digit classes are ASCII-only.
+
+The active ruleset is an immutable CompiledRuleset that is swapped atomically
+when the rules change; compiled rulesets are cached by content so re-applying
+a known rule list is free.
+"""
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+from .models import SpamRule
+
+try:
+    import re2
+except ImportError:  # pragma: no cover - google-re2 is in requirements.txt
+    re2 = None
+
+RULE_TYPES = ("keyword", "pattern")
+COMPILED_CACHE_SIZE = 8
+
+class RuleHit(NamedTuple):
+    rule: SpamRule
+    start: int
+    end: int
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over lowercased keywords; matches only on word boundaries."""
+    def __init__(self, keywords: Sequence[Tuple[str, int]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # state -> (rule index, keyword length) of every keyword ending in that state
+        self._out: List[List[Tuple[int, int]]] = [[]]
+        for keyword, rule_index in keywords:
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((rule_index, len(keyword)))
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def scan(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """(start, end, rule index) of every keyword occurrence in `text`, which must be lowercased."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for rule_index, length in out[state]:
+                start, end = i - length + 1, i + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    yield start, end, rule_index
+
+def _re2_options():
+    options = re2.Options()
+    options.log_errors = False
+    return options
+
+class CompiledRuleset:
+    def __init__(self, rules: Sequence[SpamRule]):
+        self.rules: Tuple[SpamRule, ...] = tuple(rules)
+        keywords = []
+        # RE2 pattern set: set index -> rule index, and each pattern compiled for positions
+        self._set = re2.Set.SearchSet(_re2_options()) if re2 is not None else None
+        self._set_rules: List[int] = []
+        self._re2_patterns: Dict[int, object] = {}
+        # Patterns RE2 cannot run, scanned with Python's re
+        self._fallback: List[Tuple[int, "re.Pattern"]] = []
+        for index, rule in enumerate(self.rules):
+            if not 0.0 <= rule.weight <= 1.0:
+                raise ValueError(f"Rule {rule.pattern!r} has weight {rule.weight}, expected 0.0-1.0")
+            if rule.rule_type == "keyword":
+                keyword = " ".join(rule.pattern.lower().split())
+                if not keyword:
+                    raise ValueError("Keyword rules must not be empty")
+                keywords.append((keyword, index))
+            elif rule.rule_type == "pattern":
+                try:
+                    compiled = re.compile(rule.pattern)
+                except re.error as e:
+                    raise ValueError(f"Invalid pattern {rule.pattern!r}: {e}")
+                if not self._add_to_set(index, rule.pattern):
+                    self._fallback.append((index, compiled))
+            else:
+                raise ValueError(f"Unknown rule_type {rule.rule_type!r}, expected one of {RULE_TYPES}")
+        self._automaton = KeywordAutomaton(keywords)
+        if self._set_rules:
+            self._set.Compile()
+        try:
+            self._fallback_pattern = re.compile(
+                "|".join(f"(?P<r{index}>{compiled.pattern})" for index, compiled in self._fallback)
+            ) if self._fallback else None
+        except re.error as e:
+            # e.g. numbered backreferences or inline global flags, which only work in a standalone regex
+            raise ValueError(f"Patterns cannot be combined into one expression: {e}")
+
+    def _add_to_set(self, index: int, pattern: str) -> bool:
+        if self._set is None:
+            return False
+        try:
+            compiled = re2.compile(pattern, _re2_options())
+            self._set.Add(pattern)
+        except re2.error:
+            return False
+        self._set_rules.append(index)
+        self._re2_patterns[index] = compiled
+        return True
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def scan(self, message: str) -> List[RuleHit]:
+        """
+        Rule hits in `message`. Keyword hits are every occurrence, and may overlap
+        each other and the pattern hits. Every pattern rule that matches reports
+        its non-overlapping matches, except fallback patterns that lose to another
+        fallback pattern everywhere, which report their first match.
+        """
+        hits = [RuleHit(self.rules[i], start, end) for start, end, i in self._automaton.scan(message.lower())]
+        if self._set_rules:
+            for set_index in self._set.Match(message) or ():
+                index = self._set_rules[set_index]
+                for match in self._re2_patterns[index].finditer(message):
+                    hits.append(RuleHit(self.rules[index], match.start(), match.end()))
+        if self._fallback_pattern is not None:
+            matched: Set[int] = set()
+            for match in self._fallback_pattern.finditer(message):
+                index = int(match.lastgroup[1:])
+                matched.add(index)
+                hits.append(RuleHit(self.rules[index], match.start(), match.end()))
+            # No combined match means no fallback pattern matches anywhere
+            if matched:
+                for index, compiled in self._fallback:
+                    if index in matched:
+                        continue
+                    match = compiled.search(message)
+                    if match is not None:
+                        hits.append(RuleHit(self.rules[index], match.start(), match.end()))
+        return hits
+
+    def evaluate(self, message: str) -> Tuple[float, List[str]]:
+        """Sum of the weights of the distinct rules hit (capped at 1.0), and a reason per rule."""
+        fired: Set[int] = set()
+        reasons: List[str] = []
+        score = 0.0
+        for hit in sorted(self.scan(message), key=lambda h: h.start):
+            if id(hit.rule) in fired:
+                continue
+            fired.add(id(hit.rule))
+            score += hit.rule.weight
+            if hit.rule.rule_type == "keyword":
+                reasons.append(f"Keyword detected: '{hit.rule.pattern}'")
+            else:
+                reasons.append(f"Pattern matched: {hit.rule.pattern}")
+        return min(score, 1.0), reasons
+
+def _rules_key(rules: Sequence[SpamRule]) -> tuple:
+    return tuple((r.rule_id, r.rule_type, r.pattern, r.weight, r.description) for r in rules)
+
+class ActiveRuleset(NamedTuple):
+    ruleset: CompiledRuleset
+    version: int
+
+_compiled: "OrderedDict[tuple, CompiledRuleset]" = OrderedDict()
+_lock = threading.Lock()
+_active = ActiveRuleset(CompiledRuleset([]), 0)
+
+def compile_ruleset(rules: Sequence[SpamRule]) -> CompiledRuleset:
+    """Compile `rules`, reusing a cached compilation of the same rule list. Raises ValueError for invalid rules."""
+    key = _rules_key(rules)
+    with _lock:
+        cached = _compiled.get(key)
+        if cached is not None:
+            _compiled.move_to_end(key)
+            return cached
+    ruleset = CompiledRuleset(rules)
+    with _lock:
+        _compiled[key] = ruleset
+        while len(_compiled) > COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return ruleset
+
+def get_ruleset() -> CompiledRuleset:
+    return _active.ruleset
+
+def get_active() -> ActiveRuleset:
+    return _active
+
+def set_rules(rules: Sequence[SpamRule], version: Optional[int] = None) -> ActiveRuleset:
+    """
+    Compile `rules` and make them active as `version` (by default the next
+    version). Scans already running finish on the ruleset they started with.
+    """
+    global _active
+    ruleset = compile_ruleset(rules)
+    with _lock:
+        _active = ActiveRuleset(ruleset, _active.version + 1 if version is None else version)
+        return _active
@@ -0,0 +1,120 @@
+# Spam signal pipeline for the spam-detector service
+import time
+import asyncio
+import inspect
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from uuid import UUID
+
+logger = logging.getLogger("spam_detector.signals")
+
+class SignalContext(NamedTuple):
+    phone_number: str
+    message: str
+    timestamp: datetime
+    trace_id: Optional[UUID] = None
+
+class SignalResult(NamedTuple):
+    score: float  # 0.0 - 1.0
+    reasons: List[str] = []
+
+# A signal function takes the context and returns a SignalResult, or None when
+# it has no opinion; it may be sync (must be cheap) or async.
+SignalFunction = Callable[[SignalContext], Any]
+
+class Signal(NamedTuple):
+    name: str
+    weight: float
+    func: SignalFunction
+    # Local, fast stand-in used when `func` misses the deadline, fails or returns None
+    fallback: Optional[SignalFunction] = None
+
+class PipelineResult(NamedTuple):
+    score: float
+    reasons: List[str]
+    # Score each signal contributed, None for signals that were dropped
+    scores: Dict[str, Optional[float]]
+
+async def _call(func: SignalFunction, context: SignalContext) -> Optional[SignalResult]:
+    result = func(context)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+class SignalPipeline:
+    """
+    Weighted spam signals evaluated concurrently under one deadline. Every
+    signal (and its fallback) starts at once; whatever has not answered when
+    the deadline passes is cancelled and dropped. The score is the weighted
+    mean of the signals that answered, so a missing signal neither counts as
+    clean nor as spam, and each absence is recorded in the reasons.
+    """
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.signals: List[Signal] = []
+
+    def register(self, name: str, weight: float, fallback: Optional[SignalFunction] = None):
+        """Decorator registering a signal function under `name`."""
+        def decorator(func: SignalFunction) -> SignalFunction:
+            self.add(Signal(name, weight, func, fallback))
+            return func
+        return decorator
+
+    def add(self, signal: Signal):
+        if any(s.name == signal.name for s in self.signals):
+            raise ValueError(f"Signal '{signal.name}' is already registered")
+        self.signals.append(signal)
+
+    def remove(self, name: str):
+        self.signals = [s for s in self.signals if s.name != name]
+
+    @staticmethod
+    def _result(task: Optional[asyncio.Task], name: str) -> Optional[SignalResult]:
+        if task is None or not task.done() or task.cancelled():
+            return None
+        if task.exception() is not None:
+            logger.warning(f"Spam signal '{name}' failed: {task.exception()!r}")
+            return None
+        return task.result()
+
+    async def evaluate(self, context: SignalContext) -> PipelineResult:
+        started = time.monotonic()
+        signals = list(self.signals)
+        primaries = {s.name: asyncio.ensure_future(_call(s.func, context)) for s in signals}
+        fallbacks = {s.name: asyncio.ensure_future(_call(s.fallback, context)) for s in signals if s.fallback}
+        try:
+            await asyncio.wait(primaries.values(), timeout=self.deadline)
+            needed = [
+                fallbacks[s.name] for s in signals
+                if s.name in fallbacks and self._result(primaries[s.name], s.name) is None
+            ]
+            remaining = self.deadline - (time.monotonic() - started)
+            if needed and remaining > 0:
+                await asyncio.wait(needed, timeout=remaining)
+        finally:
+            for task in list(primaries.values()) + list(fallbacks.values()):
+                if not task.done():
+                    task.cancel()
+
+        reasons: List[str] = []
+        scores: Dict[str, Optional[float]] = {}
+        weighted = total_weight = 0.0
+        deadline_ms = int(self.deadline * 1000)
+        for signal in signals:
+            primary = primaries[signal.name]
+            result = self._result(primary, signal.name)
+            if result is None:
+                if not primary.done() or primary.cancelled():
+                    reasons.append(f"Signal '{signal.name}' missed the {deadline_ms}ms deadline.")
+                result = self._result(fallbacks.get(signal.name), signal.name)
+            if result is None:
+                scores[signal.name] = None
+                reasons.append(f"Signal '{signal.name}' unavailable; excluded from score.")
+                continue
+            score = min(max(result.score, 0.0), 1.0)
+            scores[signal.name] = score
+            weighted += signal.weight * score
+            total_weight += signal.weight
+            reasons.extend(result.reasons)
+        return PipelineResult(weighted / total_weight if total_weight else 0.0, reasons, scores)
@@ -0,0 +1,115 @@
+# Per-sender message velocity for the spam-detector service
+import threading
+from array import array
+from datetime import datetime
+from typing import List, NamedTuple, Tuple
+from ...shared.cache import TTLCache
+
+class RingCounter:
+    """
+    Message count over a sliding window of `buckets` buckets of `bucket_seconds`
+    each. Moving the window forward clears each expired bucket once, so
+    recording is O(1) amortized however long a sender has been quiet.
+    """
+    __slots__ = ("bucket_seconds", "counts", "head", "total")
+
+    def __init__(self, bucket_seconds: int, buckets: int):
+        self.bucket_seconds = bucket_seconds
+        self.counts = array("I", [0] * buckets)
+        self.head = None  # absolute index of the newest bucket
+        self.total = 0
+
+    def _advance(self, index: int):
+        if self.head is None or index - self.head >= len(self.counts):
+            for i in range(len(self.counts)):
+                self.counts[i] = 0
+            self.total = 0
+        else:
+            for absolute in range(self.head + 1, index + 1):
+                slot = absolute % len(self.counts)
+                self.total -= self.counts[slot]
+                self.counts[slot] = 0
+        self.head = index
+
+    def add(self, ts: float):
+        index = int(ts // self.bucket_seconds)
+        if self.head is None or index > self.head:
+            self._advance(index)
+        elif index <= self.head - len(self.counts):
+            return  # older than the window
+        self.counts[index % len(self.counts)] += 1
+        self.total += 1
+
+    def recent(self, buckets: int) -> int:
+        """Count in the newest `buckets` buckets of the window."""
+        if self.head is None:
+            return 0
+        n = len(self.counts)
+        return sum(self.counts[(self.head - i) % n] for i in range(min(buckets, n)))
+
+class Velocity(NamedTuple):
+    per_minute: int
+    per_hour: int
+    per_day: int
+    burst: int  # messages within the burst window
+
+class VelocityLimits(NamedTuple):
+    per_minute: int = 20
+    per_hour: int = 200
+    per_day: int = 1000
+    burst: int = 10
+    burst_seconds: int = 10
+
+class SenderWindows:
+    __slots__ = ("minute", "hour", "day")
+
+    def __init__(self):
+        self.minute = RingCounter(1, 60)
+        self.hour = RingCounter(60, 60)
+        self.day = RingCounter(3600, 24)
+
+class VelocityTracker:
+    """
+    Sliding-window message counts per sender (last minute, hour and day, plus
+    a short burst window), kept in process. Senders are held in an LRU of
+    `max_senders`, so a quiet sender is forgotten before an active one.
+    """
+    def __init__(self, limits: VelocityLimits = VelocityLimits(), max_senders: int = 50000):
+        if not 1 <= limits.burst_seconds <= 60:
+            raise ValueError("burst_seconds must be between 1 and 60")
+        self.limits = limits
+        self._senders = TTLCache(maxsize=max_senders)
+        self._lock = threading.Lock()
+
+    def record(self, phone_number: str, timestamp: datetime) -> Velocity:
+        """Count a message from `phone_number` sent at `timestamp` and return the sender's velocity."""
+        ts = timestamp.timestamp()
+        with self._lock:
+            windows = self._senders.get(phone_number)
+            if windows is None:
+                windows = SenderWindows()
+                self._senders.set(phone_number, windows)
+            windows.minute.add(ts)
+            windows.hour.add(ts)
+            windows.day.add(ts)
+            return Velocity(
+                windows.minute.total,
+                windows.hour.total,
+                windows.day.total,
+                windows.minute.recent(self.limits.burst_seconds),
+            )
+
+    def score(self, velocity: Velocity) -> Tuple[float, List[str]]:
+        """0.0-1.0 by how close the busiest window is to its limit, and a reason per exceeded limit."""
+        limits = self.limits
+        checks = [
+            (velocity.burst, limits.burst, f"Burst of {velocity.burst} messages within {limits.burst_seconds}s."),
+            (velocity.per_minute, limits.per_minute, f"High sending rate: {velocity.per_minute} messages in the last minute."),
+            (velocity.per_hour, limits.per_hour, f"High sending rate: {velocity.per_hour} messages in the last hour."),
+            (velocity.per_day, limits.per_day, f"High sending rate: {velocity.per_day} messages in the last day."),
+        ]
+        reasons = [reason for count, limit, reason in checks if count >= limit]
+        return min(max(count / limit for count, limit, _ in checks), 1.0), reasons
+
+    def __len__(self) -> int:
+        return len(self._senders)
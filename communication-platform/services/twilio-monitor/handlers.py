@@ -1,12 +1,17 @@
 import re
 import logging
-from uuid import UUID
-from datetime import datetime
+from uuid import UUID, uuid4
+from datetime import datetime, timezone
+from typing import Any, List, Optional, Tuple, Union
+from pydantic import ValidationError
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from communication_platform.shared.models import Message, MessageType
 from communication_platform.shared.database import get_db
+from communication_platform.shared.events import MessageReceivedEvent, EventType
+from communication_platform.shared.outbox import add_outbox_event, add_outbox_events
 from .database import MessageDB
-from .models import IncomingMessageRequest
+from .models import IncomingMessageRequest, BatchItemStatus
 
 logger = logging.getLogger("twilio_monitor.handlers")
 
@@ -25,8 +30,30 @@ def sanitize_content(content: str) -> str:
     return sanitized[:1600]
 
 
-def store_message_in_db(message: Message, db: Session) -> MessageDB:
-    """Store a Message in the database."""
+def build_message_received_event(message: Message, trace_id: UUID) -> MessageReceivedEvent:
+    return MessageReceivedEvent(
+        event_id=uuid4(),
+        event_type=EventType.MESSAGE_RECEIVED,
+        timestamp=datetime.utcnow(),
+        trace_id=trace_id,
+        source_service="twilio-monitor",
+        # Sender, timestamp and content ride along so consumers can route the
+        # message (e.g. onto an open conversation) without reading it back
+        payload={
+            "message_id": str(message.message_id),
+            "from_phone": message.from_phone,
+            "to_phone": message.to_phone,
+            "timestamp": message.timestamp,
+            "content": message.content,
+        }
+    )
+
+
+def store_message_in_db(message: Message, db: Session, trace_id: UUID) -> MessageDB:
+    """
+    Store a Message and its MESSAGE_RECEIVED event in one transaction.
+    The event goes to the outbox and is published by the relay after commit.
+    """
     db_message = MessageDB(
         message_id=message.message_id,
         type=message.type.value,
@@ -39,35 +66,132 @@ def store_message_in_db(message: Message, db: Session) -> MessageDB:
         created_at=datetime.utcnow(),
     )
     db.add(db_message)
+    event = build_message_received_event(message, trace_id)
+    add_outbox_event(db, event, routing_key=f"message.received.{message.type.value}")
     db.commit()
-    db.refresh(db_message)
     return db_message
 
 
+def store_messages_bulk(messages: List[Message], db: Session, trace_id: UUID) -> List[UUID]:
+    """
+    Store many Messages and their MESSAGE_RECEIVED events in one transaction,
+    using multi-row INSERT ... RETURNING for the messages and the outbox.
+    """
+    now = datetime.utcnow()
+    inserted = db.execute(
+        insert(MessageDB).returning(MessageDB.message_id),
+        [
+            {
+                "message_id": message.message_id,
+                "type": message.type.value,
+                "from_phone": message.from_phone,
+                "to_phone": message.to_phone,
+                "content": message.content,
+                "timestamp": datetime.utcfromtimestamp(message.timestamp),
+                "customer_id": message.customer_id,
+                "conversation_id": message.conversation_id,
+                "created_at": now,
+            }
+            for message in messages
+        ]
+    ).scalars().all()
+    add_outbox_events(db, [
+        (build_message_received_event(message, trace_id), f"message.received.{message.type.value}")
+        for message in messages
+    ])
+    db.commit()
+    return list(inserted)
+
+
+def to_epoch(timestamp: datetime) -> float:
+    """Seconds since the epoch; a naive timestamp is taken as UTC, not local time."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+def parse_request(item: Any) -> Tuple[Optional[IncomingMessageRequest], Optional[str]]:
+    """Validate one raw batch item. Returns (request, None) or (None, reason)."""
+    if isinstance(item, IncomingMessageRequest):
+        return item, None
+    try:
+        return IncomingMessageRequest.model_validate(item), None
+    except ValidationError as e:
+        return None, "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'item'}: {error['msg']}" for error in e.errors()
+        )
+
+
+def build_message(request: IncomingMessageRequest, timestamp: float) -> Tuple[Optional[Message], Optional[str]]:
+    """
+    Validate and sanitize a request. Returns (message, None) or (None, reason).
+    `timestamp` is used unless the request carries its original send time.
+    """
+    if not validate_phone_number(request.from_phone):
+        return None, "Invalid from_phone format"
+    if not validate_phone_number(request.to_phone):
+        return None, "Invalid to_phone format"
+    message = Message(
+        type=request.type,
+        from_phone=request.from_phone,
+        to_phone=request.to_phone,
+        content=sanitize_content(request.content),
+        timestamp=to_epoch(request.timestamp) if request.timestamp else timestamp,
+    )
+    return message, None
+
+
 async def process_incoming_message(request: IncomingMessageRequest, trace_id: UUID, db: Session) -> dict:
     """
     Process an incoming message: validate, sanitize, store, and return status.
     """
     try:
-        if not validate_phone_number(request.from_phone):
-            logger.error(f"[{trace_id}] Invalid from_phone: {request.from_phone}")
-            return {"status": "error", "reason": "Invalid from_phone format"}
-        if not validate_phone_number(request.to_phone):
-            logger.error(f"[{trace_id}] Invalid to_phone: {request.to_phone}")
-            return {"status": "error", "reason": "Invalid to_phone format"}
-
-        sanitized_content = sanitize_content(request.content)
-        now = datetime.utcnow().timestamp()
-        message = Message(
-            type=request.type,
-            from_phone=request.from_phone,
-            to_phone=request.to_phone,
-            content=sanitized_content,
-            timestamp=now,
-        )
-        db_message = store_message_in_db(message, db)
-        logger.info(f"[{trace_id}] Stored message {db_message.message_id}")
-        return {"message_id": str(db_message.message_id), "status": "received"}
+        message, reason = build_message(request, to_epoch(datetime.utcnow()))
+        if message is None:
+            logger.error(f"[{trace_id}] {reason}: from={request.from_phone} to={request.to_phone}")
+            return {"status": "error", "reason": reason}
+        store_message_in_db(message, db, trace_id)
+        logger.info(f"[{trace_id}] Stored message {message.message_id}")
+        return {"message_id": str(message.message_id), "status": "received"}
     except Exception as e:
         logger.exception(f"[{trace_id}] Failed to process incoming message: {e}")
-        return {"status": "error", "reason": str(e)} 
\ No newline at end of file
+        return {"status": "error", "reason": str(e)}
+
+
+async def process_incoming_batch(requests: List[Union[IncomingMessageRequest, Any]], trace_id: UUID, db: Session) -> List[BatchItemStatus]:
+    """
+    Validate and sanitize a list of incoming messages in one pass, persist every
+    valid one (plus its MESSAGE_RECEIVED event) in a single transaction, and
+    return a status per input item in request order. Items may be raw JSON
+    objects; one that fails validation is reported as an error on its own.
+    """
+    now = to_epoch(datetime.utcnow())
+    statuses: List[BatchItemStatus] = []
+    valid: List[Message] = []
+    for index, item in enumerate(requests):
+        request, reason = parse_request(item)
+        message = None
+        if request is not None:
+            try:
+                message, reason = build_message(request, now)
+            except Exception as e:
+                reason = str(e)
+        if message is None:
+            statuses.append(BatchItemStatus(index=index, status="error", reason=reason))
+            continue
+        valid.append(message)
+        statuses.append(BatchItemStatus(index=index, message_id=str(message.message_id), status="received"))
+    if not valid:
+        return statuses
+    try:
+        store_messages_bulk(valid, db, trace_id)
+        logger.info(f"[{trace_id}] Stored {len(valid)} of {len(requests)} messages in batch")
+    except Exception as e:
+        db.rollback()
+        logger.exception(f"[{trace_id}] Failed to store message batch: {e}")
+        for item in statuses:
+            if item.status == "received":
+                item.status = "error"
+                item.reason = "Batch could not be stored"
+                item.message_id = None
+    return statuses
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
 from communication_platform.shared.models import MessageType
@@ -9,6 +9,7 @@ class IncomingMessageRequest(BaseModel):
     to_phone: str = Field(..., alias="to", description="Recipient's phone number in E.164 format")
     content: str = Field(..., description="Message content")
     media_urls: Optional[List[str]] = Field(None, description="List of media URLs attached to the message")
+    timestamp: Optional[datetime] = Field(None, description="Original send time (ISO 8601), e.g. for backfills; defaults to receipt time")
 
     class Config:
         allow_population_by_field_name = True
@@ -54,4 +55,36 @@ class WebhookValidationRequest(BaseModel):
                     "payload": "body=...&from=...&to=..."
                 }
             ]
-        } 
\ No newline at end of file
+        } 
+
+class IncomingBatchRequest(BaseModel):
+    # Items are validated one by one (see handlers.parse_request), so a malformed
+    # item is reported in its BatchItemStatus instead of rejecting the batch
+    messages: List[Any] = Field(..., description="Messages to ingest in one transaction, each an IncomingMessageRequest")
+
+class BatchItemStatus(BaseModel):
+    index: int = Field(..., description="Position of the item in the request")
+    message_id: Optional[str] = Field(None, description="Unique message identifier, if stored")
+    status: str = Field(..., description="received or error")
+    reason: Optional[str] = Field(None, description="Why the item was rejected")
+
+class BatchMessageResponse(BaseModel):
+    received: int = Field(..., description="Number of messages stored")
+    failed: int = Field(..., description="Number of messages rejected")
+    items: List[BatchItemStatus]
+    timestamp: datetime = Field(..., description="Timestamp of the batch (ISO 8601)")
+
+    class Config:
+        json_schema_extra = {
+            "examples": [
+                {
+                    "received": 1,
+                    "failed": 1,
+                    "items": [
+                        {"index": 0, "message_id": "abc123-def456", "status": "received", "reason": None},
+                        {"index": 1, "message_id": None, "status": "error", "reason": "Invalid from_phone format"}
+                    ],
+                    "timestamp": "2024-06-01T12:00:00Z"
+                }
+            ]
+        }
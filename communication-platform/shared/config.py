@@ -3,7 +3,6 @@ import json
 import threading
 from typing import Optional, Dict, Any
 from pydantic import BaseModel, Field, ValidationError
-from cryptography.fernet import Fernet, InvalidToken
 
 CONFIG_ENV_VAR = "APP_ENV"
 DEFAULT_ENV = "dev"
@@ -18,6 +17,36 @@ class FeatureFlags(BaseModel):
     maintenance_mode: bool = False
     # Add more feature flags as needed
 
+class DatabasePoolConfig(BaseModel):
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800  # seconds; keep below the server/proxy idle timeout
+    pool_pre_ping: bool = False
+    slow_checkout_ms: float = 100.0
+    # Event loops sharing the async budget (pool_size + max_overflow); unset
+    # means the API loop plus one per subscriber worker (EVENT_WORKERS + 1)
+    async_loops: Optional[int] = Field(default=None, ge=1)
+
+    @classmethod
+    def from_env(cls, base: Optional["DatabasePoolConfig"] = None) -> "DatabasePoolConfig":
+        """Apply DB_POOL_* environment overrides on top of `base` (or the defaults)."""
+        values = (base or cls()).model_dump()
+        env_map = {
+            "pool_size": "DB_POOL_SIZE",
+            "max_overflow": "DB_MAX_OVERFLOW",
+            "pool_timeout": "DB_POOL_TIMEOUT",
+            "pool_recycle": "DB_POOL_RECYCLE",
+            "pool_pre_ping": "DB_POOL_PRE_PING",
+            "slow_checkout_ms": "DB_POOL_SLOW_CHECKOUT_MS",
+            "async_loops": "DB_ASYNC_LOOPS",
+        }
+        for field, env_var in env_map.items():
+            raw = os.getenv(env_var)
+            if raw is not None:
+                values[field] = raw
+        return cls(**values)
+
 class AppConfig(BaseModel):
     version: str = Field(..., description="Config version")
     db_url: str
@@ -25,6 +54,7 @@ class AppConfig(BaseModel):
     rabbitmq_url: str
     api_key: str
     feature_flags: FeatureFlags = FeatureFlags()
+    db_pool: DatabasePoolConfig = DatabasePoolConfig()
     # Add more config fields as needed
 
     class Config:
@@ -34,6 +64,9 @@ class AppConfig(BaseModel):
     @staticmethod
     def decrypt_value(value: str, key: str) -> str:
         if value.startswith("enc:"):
+            # Imported here so modules that only need the config models (e.g. database)
+            # don't pull in cryptography
+            from cryptography.fernet import Fernet, InvalidToken
             f = Fernet(key.encode())
             try:
                 return f.decrypt(value[4:].encode()).decode()
@@ -1,19 +1,31 @@
+import asyncio
 import json
 import logging
-from typing import Optional
+import threading
+from typing import Optional, List, Tuple
 import pika
+import aio_pika
 from pika.exceptions import AMQPError
 from pika.adapters.blocking_connection import BlockingChannel
 from .events import BaseEvent
 
 logger = logging.getLogger(__name__)
 
+def _event_headers(event: BaseEvent) -> dict:
+    return {
+        "event_type": event.event_type.value,
+        "trace_id": str(event.trace_id),
+        "source_service": event.source_service,
+    }
+
 class EventPublisher:
     def __init__(self, rabbitmq_url: str, exchange_name: str = "communication_platform"):
         self.rabbitmq_url = rabbitmq_url
         self.exchange_name = exchange_name
         self.connection: Optional[pika.BlockingConnection] = None
         self.channel: Optional[BlockingChannel] = None
+        # Subscriber worker threads share one publisher; pika channels are not thread-safe
+        self._lock = threading.Lock()
         try:
             self.connection = pika.BlockingConnection(pika.URLParameters(self.rabbitmq_url))
             self.channel = self.connection.channel()
@@ -36,18 +48,15 @@ class EventPublisher:
             properties = pika.BasicProperties(
                 delivery_mode=2,  # persistent
                 content_type="application/json",
-                headers={
-                    "event_type": event.event_type.value,
-                    "trace_id": str(event.trace_id),
-                    "source_service": event.source_service,
-                },
-            )
-            self.channel.basic_publish(
-                exchange=self.exchange_name,
-                routing_key=routing_key,
-                body=body,
-                properties=properties
+                headers=_event_headers(event),
             )
+            with self._lock:
+                self.channel.basic_publish(
+                    exchange=self.exchange_name,
+                    routing_key=routing_key,
+                    body=body,
+                    properties=properties
+                )
             logger.info(f"Published event '{event.event_type.value}' with routing_key '{routing_key}'")
             return True
         except AMQPError as e:
@@ -62,4 +71,146 @@ class EventPublisher:
                 self.connection.close()
             logger.info("Closed RabbitMQ connection and channel.")
         except AMQPError as e:
-            logger.error(f"Error closing RabbitMQ connection or channel: {e}") 
\ No newline at end of file
+            logger.error(f"Error closing RabbitMQ connection or channel: {e}")
+
+class AsyncEventPublisher:
+    """
+    asyncio-native counterpart of EventPublisher for use inside FastAPI handlers.
+
+    Events are queued and flushed by a background task: everything that arrives
+    within `confirm_window` seconds (up to `max_batch_size` events) is published
+    together on a publisher-confirms channel and the confirms are awaited as one
+    batch. Each caller gets a future that resolves to True once the broker has
+    confirmed its event, or False if it was nacked, could not be sent or was not
+    confirmed within `confirm_timeout` seconds. close() waits up to
+    `close_timeout` seconds for queued events and fails whatever is left.
+    """
+    def __init__(
+        self,
+        rabbitmq_url: str,
+        exchange_name: str = "communication_platform",
+        confirm_window: float = 0.005,
+        max_batch_size: int = 100,
+        confirm_timeout: float = 10.0,
+        close_timeout: float = 30.0,
+    ):
+        self.rabbitmq_url = rabbitmq_url
+        self.exchange_name = exchange_name
+        self.confirm_window = confirm_window
+        self.max_batch_size = max_batch_size
+        self.confirm_timeout = confirm_timeout
+        self.close_timeout = close_timeout
+        self.connection: Optional[aio_pika.abc.AbstractRobustConnection] = None
+        self.channel: Optional[aio_pika.abc.AbstractChannel] = None
+        self.exchange: Optional[aio_pika.abc.AbstractExchange] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        # The batch the flusher is publishing, failed by close() if it gives up on it
+        self._batch: List[Tuple[aio_pika.Message, str, str, asyncio.Future]] = []
+
+    async def connect(self):
+        try:
+            self.connection = await aio_pika.connect_robust(self.rabbitmq_url)
+            self.channel = await self.connection.channel(publisher_confirms=True)
+            self.exchange = await self.channel.declare_exchange(
+                self.exchange_name,
+                aio_pika.ExchangeType.TOPIC,
+                durable=True
+            )
+        except aio_pika.exceptions.AMQPException as e:
+            logger.error(f"Failed to connect to RabbitMQ: {e}")
+            raise
+        self._queue = asyncio.Queue()
+        self._flusher = asyncio.create_task(self._flush_loop())
+        logger.info(f"Connected to RabbitMQ (async) and declared exchange '{self.exchange_name}'")
+
+    def publish_nowait(self, event: BaseEvent, routing_key: str) -> "asyncio.Future[bool]":
+        """Queue an event for the next flush and return a future for its confirm."""
+        future = asyncio.get_running_loop().create_future()
+        if self._queue is None or self.exchange is None:
+            logger.error("Cannot publish event: publisher is not connected.")
+            future.set_result(False)
+            return future
+        message = aio_pika.Message(
+            body=event.model_dump_json().encode("utf-8"),
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            content_type="application/json",
+            headers=_event_headers(event),
+        )
+        self._queue.put_nowait((message, routing_key, event.event_type.value, future))
+        return future
+
+    async def publish(self, event: BaseEvent, routing_key: str) -> bool:
+        return await self.publish_nowait(event, routing_key)
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.confirm_window
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._batch = batch
+            try:
+                await self._publish_batch(batch)
+            finally:
+                self._batch = []
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _publish_batch(self, batch: List[Tuple[aio_pika.Message, str, str, asyncio.Future]]):
+        # Publishes are pipelined on the confirm channel; gather waits for all confirms,
+        # each bounded by confirm_timeout so a stalled broker fails the batch instead of hanging it
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(self.exchange.publish(message, routing_key=routing_key), self.confirm_timeout)
+                for message, routing_key, _, _ in batch
+            ),
+            return_exceptions=True
+        )
+        for (_, routing_key, event_type, future), result in zip(batch, results):
+            ok = not isinstance(result, BaseException)
+            if ok:
+                logger.info(f"Published event '{event_type}' with routing_key '{routing_key}'")
+            elif isinstance(result, asyncio.TimeoutError):
+                logger.error(f"Publish of event '{event_type}' with routing_key '{routing_key}' was not confirmed within {self.confirm_timeout}s")
+            else:
+                logger.error(f"Failed to publish event '{event_type}' with routing_key '{routing_key}': {result}")
+            if not future.done():
+                future.set_result(ok)
+
+    async def close(self):
+        if self._flusher:
+            # Let queued events go out before tearing the channel down
+            try:
+                await asyncio.wait_for(self._queue.join(), self.close_timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"Events still unconfirmed after {self.close_timeout}s; failing them")
+            pending = list(self._batch)
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+                self._queue.task_done()
+            for _, _, _, future in pending:
+                if not future.done():
+                    future.set_result(False)
+        try:
+            if self.connection and not self.connection.is_closed:
+                await self.connection.close()
+            logger.info("Closed async RabbitMQ connection.")
+        except aio_pika.exceptions.AMQPException as e:
+            logger.error(f"Error closing async RabbitMQ connection: {e}")
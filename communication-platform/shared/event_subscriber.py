@@ -1,21 +1,78 @@
 import json
+import asyncio
+import inspect
 import logging
-from typing import Callable, Dict, Optional
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 import pika
 from pika.exceptions import AMQPError
 from pika.adapters.blocking_connection import BlockingChannel
+from .topic_router import TopicRouter
 
 logger = logging.getLogger(__name__)
 
+class _BatchSubscription:
+    """Deliveries buffered for one subscribe_batch() pattern; touched only on the connection thread."""
+    __slots__ = ("handler", "max_batch", "max_wait", "pending", "timer")
+
+    def __init__(self, handler: Callable, max_batch: int, max_wait: float):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.pending: List[Tuple[int, str, bytes]] = []
+        self.timer = None
+
 class EventSubscriber:
-    def __init__(self, rabbitmq_url: str, service_name: str, exchange_name: str = "communication_platform"):
+    """
+    Consumes events from the service queue and dispatches them to handlers.
+
+    With workers=1 (the default) each message is handled inline on the
+    connection thread. With workers > 1 messages are handed to a thread pool and
+    acknowledged from the connection thread once their handler finishes, so acks
+    may complete out of order. prefetch_count bounds the number of unacked
+    messages the broker will deliver, which is what applies backpressure when all
+    workers are busy; it defaults to the number of workers.
+
+    subscribe() takes AMQP topic patterns (`*`, `#`); incoming routing keys are
+    resolved against them with a TopicRouter. When several handlers match, all of
+    them run and the message is acked only if every one succeeds.
+
+    Handlers may be plain callables or return an awaitable (async handlers, or
+    lambdas wrapping them). Awaitables are run to completion on an event loop
+    owned by the consuming thread, and the message is only acked afterwards.
+
+    By default all replicas of a service share one durable queue, so each event
+    goes to one of them. Pass exclusive=True with a per-replica queue_name to get
+    a private, auto-deleted queue instead, e.g. for fan-out cache invalidation.
+
+    subscribe_batch() registers a handler that receives a list of events instead;
+    see its docstring for how batches are formed and settled.
+    """
+    def __init__(
+        self,
+        rabbitmq_url: str,
+        service_name: str,
+        exchange_name: str = "communication_platform",
+        prefetch_count: Optional[int] = None,
+        workers: int = 1,
+        queue_name: Optional[str] = None,
+        exclusive: bool = False,
+    ):
         self.rabbitmq_url = rabbitmq_url
         self.exchange_name = exchange_name
         self.service_name = service_name
-        self.queue_name = f"{service_name}_queue"
+        self.queue_name = queue_name or f"{service_name}_queue"
+        self.exclusive = exclusive
+        self.workers = max(1, workers)
+        self.prefetch_count = prefetch_count if prefetch_count is not None else self.workers
         self.connection: Optional[pika.BlockingConnection] = None
         self.channel: Optional[BlockingChannel] = None
-        self.handlers: Dict[str, Callable] = {}
+        self.handlers: Dict[str, List[Callable]] = {}
+        self.router = TopicRouter()
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
         try:
             self.connection = pika.BlockingConnection(pika.URLParameters(self.rabbitmq_url))
             self.channel = self.connection.channel()
@@ -24,59 +81,189 @@ class EventSubscriber:
                 exchange_type="topic",
                 durable=True
             )
-            self.channel.queue_declare(queue=self.queue_name, durable=True)
+            if self.exclusive:
+                self.channel.queue_declare(queue=self.queue_name, exclusive=True, auto_delete=True)
+            else:
+                self.channel.queue_declare(queue=self.queue_name, durable=True)
             logger.info(f"Connected to RabbitMQ, declared exchange '{self.exchange_name}' and queue '{self.queue_name}'")
         except AMQPError as e:
             logger.error(f"Failed to connect to RabbitMQ: {e}")
             raise
 
-    def subscribe(self, routing_key: str, handler: Callable):
-        self.handlers[routing_key] = handler
+    def _bind(self, routing_key: str, handler: Callable):
         if not self.channel:
             raise RuntimeError("Channel is not initialized.")
         try:
-            self.channel.queue_bind(
-                exchange=self.exchange_name,
-                queue=self.queue_name,
-                routing_key=routing_key
-            )
-            logger.info(f"Subscribed to routing_key '{routing_key}' with handler '{handler.__name__}'")
+            if routing_key not in self.handlers:
+                self.channel.queue_bind(
+                    exchange=self.exchange_name,
+                    queue=self.queue_name,
+                    routing_key=routing_key
+                )
+            self.handlers.setdefault(routing_key, []).append(handler)
         except AMQPError as e:
             logger.error(f"Failed to bind queue to routing_key '{routing_key}': {e}")
             raise
 
+    def subscribe(self, routing_key: str, handler: Callable):
+        self._bind(routing_key, handler)
+        self.router.add(routing_key, handler)
+        logger.info(f"Subscribed to routing_key '{routing_key}' with handler '{handler.__name__}'")
+
+    def subscribe_batch(self, routing_key: str, handler: Callable, max_batch: int = 100, max_wait: float = 0.05):
+        """
+        Deliver matching events to `handler` as a list.
+
+        Deliveries are buffered on the connection thread until `max_batch` have
+        arrived or `max_wait` seconds have passed since the first one, then the
+        handler runs once for the whole list (on a worker when workers > 1).
+        Every event in the batch is acked if the handler returns and nacked if it
+        raises. The pattern must not overlap with a subscribe() pattern.
+
+        prefetch_count is raised to at least max_batch * workers so each worker
+        can fill a batch while others are still being processed.
+        """
+        self._bind(routing_key, handler)
+        self.router.add(routing_key, _BatchSubscription(handler, max(1, max_batch), max_wait))
+        if self.prefetch_count < max_batch * self.workers:
+            self.prefetch_count = max_batch * self.workers
+            logger.info(f"Raised prefetch to {self.prefetch_count} for batches of {max_batch}")
+        logger.info(f"Subscribed to routing_key '{routing_key}' with batch handler '{handler.__name__}' (max_batch={max_batch}, max_wait={max_wait}s)")
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        # One long-lived loop per consuming thread, reused across messages
+        loop = getattr(self._local, "loop", None)
+        if loop is None or loop.is_closed():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._local.loop = loop
+        return loop
+
+    def _handle(self, handlers: Tuple[Callable, ...], routing_key: str, body: bytes) -> bool:
+        try:
+            event_data = json.loads(body)
+            for handler in handlers:
+                result = handler(event_data)
+                if inspect.isawaitable(result):
+                    self._event_loop().run_until_complete(result)
+            return True
+        except Exception as e:
+            logger.error(f"Error processing message for routing_key '{routing_key}': {e}")
+            return False
+
+    def _handle_batch(self, handler: Callable, items: List[Tuple[int, str, bytes]]) -> List[bool]:
+        results = [False] * len(items)
+        decoded, events = [], []
+        for i, (_, routing_key, body) in enumerate(items):
+            try:
+                events.append(json.loads(body))
+                decoded.append(i)
+            except ValueError as e:
+                logger.error(f"Dropping undecodable message for routing_key '{routing_key}': {e}")
+        if not events:
+            return results
+        try:
+            result = handler(events)
+            if inspect.isawaitable(result):
+                self._event_loop().run_until_complete(result)
+        except Exception as e:
+            logger.error(f"Error processing batch of {len(events)} events: {e}")
+            return results
+        for i in decoded:
+            results[i] = True
+        return results
+
+    def _settle(self, ch, delivery_tag: int, routing_key: str, ok: bool):
+        # Must run on the connection thread; pika channels are not thread-safe.
+        if not ch.is_open:
+            logger.warning(f"Channel closed before message for routing_key '{routing_key}' could be settled; it will be redelivered.")
+            return
+        if ok:
+            ch.basic_ack(delivery_tag=delivery_tag)
+            logger.info(f"Handled event for routing_key '{routing_key}' and acknowledged message.")
+        else:
+            ch.basic_nack(delivery_tag=delivery_tag, requeue=False)
+
+    def _settle_batch(self, ch, items: List[Tuple[int, str, bytes]], results: List[bool]):
+        for (delivery_tag, routing_key, _), ok in zip(items, results):
+            self._settle(ch, delivery_tag, routing_key, ok)
+
+    def _handle_in_worker(self, ch, handlers: Tuple[Callable, ...], delivery_tag: int, routing_key: str, body: bytes):
+        ok = self._handle(handlers, routing_key, body)
+        self.connection.add_callback_threadsafe(
+            functools.partial(self._settle, ch, delivery_tag, routing_key, ok)
+        )
+
+    def _handle_batch_in_worker(self, ch, handler: Callable, items: List[Tuple[int, str, bytes]]):
+        results = self._handle_batch(handler, items)
+        self.connection.add_callback_threadsafe(
+            functools.partial(self._settle_batch, ch, items, results)
+        )
+
+    def _buffer(self, ch, batch: _BatchSubscription, delivery_tag: int, routing_key: str, body: bytes):
+        batch.pending.append((delivery_tag, routing_key, body))
+        if len(batch.pending) >= batch.max_batch:
+            if batch.timer is not None:
+                self.connection.remove_timeout(batch.timer)
+            self._flush_batch(ch, batch)
+        elif batch.timer is None:
+            batch.timer = self.connection.call_later(batch.max_wait, functools.partial(self._flush_batch, ch, batch))
+
+    def _flush_batch(self, ch, batch: _BatchSubscription):
+        batch.timer = None
+        items, batch.pending = batch.pending, []
+        if not items:
+            return
+        if self.executor:
+            self.executor.submit(self._handle_batch_in_worker, ch, batch.handler, items)
+        else:
+            self._settle_batch(ch, items, self._handle_batch(batch.handler, items))
+
     def start_consuming(self):
         def callback(ch, method, properties, body):
             routing_key = method.routing_key
-            try:
-                event_data = json.loads(body)
-                handler = self.handlers.get(routing_key)
-                if handler:
-                    handler(event_data)
-                    ch.basic_ack(delivery_tag=method.delivery_tag)
-                    logger.info(f"Handled event for routing_key '{routing_key}' and acknowledged message.")
-                else:
-                    logger.warning(f"No handler for routing_key '{routing_key}'. Message not processed.")
-                    ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
-            except Exception as e:
-                logger.error(f"Error processing message for routing_key '{routing_key}': {e}")
+            handlers = self.router.match(routing_key)
+            if not handlers:
+                logger.warning(f"No handler for routing_key '{routing_key}'. Message not processed.")
                 ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                return
+            if any(isinstance(h, _BatchSubscription) for h in handlers):
+                if len(handlers) > 1:
+                    logger.error(f"routing_key '{routing_key}' matches a batch subscription and other handlers. Message not processed.")
+                    ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                    return
+                self._buffer(ch, handlers[0], method.delivery_tag, routing_key, body)
+                return
+            if self.executor:
+                self.executor.submit(self._handle_in_worker, ch, handlers, method.delivery_tag, routing_key, body)
+            else:
+                ok = self._handle(handlers, routing_key, body)
+                self._settle(ch, method.delivery_tag, routing_key, ok)
 
         if not self.channel:
             raise RuntimeError("Channel is not initialized.")
         try:
+            self.channel.basic_qos(prefetch_count=self.prefetch_count)
+            if self.workers > 1:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix=f"{self.service_name}-worker"
+                )
             self.channel.basic_consume(
                 queue=self.queue_name,
                 on_message_callback=callback,
                 auto_ack=False
             )
-            logger.info(f"Started consuming on queue '{self.queue_name}'")
+            logger.info(f"Started consuming on queue '{self.queue_name}' with {self.workers} worker(s), prefetch {self.prefetch_count}")
             self.channel.start_consuming()
         except AMQPError as e:
             logger.error(f"Error during consuming: {e}")
         except KeyboardInterrupt:
             logger.info("Consumption interrupted by user.")
         finally:
+            if self.executor:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
             if self.connection and self.connection.is_open:
                 self.connection.close()
-                logger.info("Closed RabbitMQ connection.") 
\ No newline at end of file
+                logger.info("Closed RabbitMQ connection.")
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Tuple
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, insert
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Session
+from .database import Base, SessionLocal
+from .events import BaseEvent
+from .event_publisher import AsyncEventPublisher
+
+logger = logging.getLogger(__name__)
+
+class OutboxEventDB(Base):
+    __tablename__ = "event_outbox"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    event_id = Column(UUID(as_uuid=True), nullable=False, unique=True)
+    event_type = Column(String(50), nullable=False)
+    routing_key = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return (
+            f"<OutboxEventDB(id={self.id}, event_id={self.event_id}, event_type={self.event_type}, "
+            f"routing_key={self.routing_key}, attempts={self.attempts})>"
+        )
+
+def add_outbox_event(db: Session, event: BaseEvent, routing_key: str) -> OutboxEventDB:
+    """
+    Stage an event in the outbox as part of the caller's transaction.
+    The caller commits; the event is only published once that commit succeeds.
+    """
+    row = OutboxEventDB(
+        event_id=event.event_id,
+        event_type=event.event_type.value,
+        routing_key=routing_key,
+        body=event.model_dump_json(),
+        attempts=0,
+        created_at=datetime.utcnow(),
+    )
+    db.add(row)
+    return row
+
+def add_outbox_events(db: Session, events: Sequence[Tuple[BaseEvent, str]]):
+    """
+    Stage many (event, routing_key) pairs with a single multi-row INSERT in the
+    caller's transaction.
+    """
+    if not events:
+        return
+    now = datetime.utcnow()
+    db.execute(insert(OutboxEventDB), [
+        {
+            "event_id": event.event_id,
+            "event_type": event.event_type.value,
+            "routing_key": routing_key,
+            "body": event.model_dump_json(),
+            "attempts": 0,
+            "created_at": now,
+        }
+        for event, routing_key in events
+    ])
+
+class OutboxRelay:
+    """
+    Background task that drains event_outbox to RabbitMQ.
+
+    Each pass locks up to `batch_size` rows (FOR UPDATE SKIP LOCKED, so several
+    replicas can relay concurrently), publishes them through an
+    AsyncEventPublisher, and deletes the rows the broker confirmed in the same
+    transaction. Unconfirmed rows stay in the table and are retried on the next
+    pass. Delivery is at-least-once: a crash between confirm and commit
+    republishes the batch.
+    """
+    def __init__(
+        self,
+        publisher: AsyncEventPublisher,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: int = 100,
+        poll_interval: float = 0.5,
+    ):
+        self.publisher = publisher
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Started outbox relay.")
+
+    def notify(self):
+        """Wake the relay early, e.g. right after a request committed new events."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Final drain so a clean shutdown doesn't leave committed events behind
+        try:
+            while await self.drain_once() == self.batch_size:
+                pass
+        except Exception as e:
+            logger.error(f"Outbox drain on shutdown failed: {e}")
+        logger.info("Stopped outbox relay.")
+
+    async def _run(self):
+        while True:
+            try:
+                published = await self.drain_once()
+            except Exception as e:
+                logger.exception(f"Outbox relay pass failed: {e}")
+                published = 0
+            if published == self.batch_size:
+                continue  # more rows are likely waiting
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _claim_batch(self, db: Session) -> List[OutboxEventDB]:
+        return (
+            db.query(OutboxEventDB)
+            .order_by(OutboxEventDB.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    def _finish_batch(self, db: Session, published_ids: List[int], failed: List[OutboxEventDB]):
+        if published_ids:
+            db.query(OutboxEventDB).filter(OutboxEventDB.id.in_(published_ids)).delete(synchronize_session=False)
+        for row in failed:
+            row.attempts = row.attempts + 1
+        db.commit()
+
+    async def drain_once(self) -> int:
+        """Publish one batch from the outbox. Returns the number of rows published."""
+        db = self.session_factory()
+        try:
+            rows = await asyncio.to_thread(self._claim_batch, db)
+            if not rows:
+                await asyncio.to_thread(db.rollback)
+                return 0
+            futures = [
+                self.publisher.publish_nowait(BaseEvent.model_validate_json(row.body), row.routing_key)
+                for row in rows
+            ]
+            results = await asyncio.gather(*futures)
+            published_ids = [row.id for row, ok in zip(rows, results) if ok]
+            failed = [row for row, ok in zip(rows, results) if not ok]
+            await asyncio.to_thread(self._finish_batch, db, published_ids, failed)
+            if failed:
+                logger.warning(f"Outbox relay: {len(failed)} of {len(rows)} events not confirmed; will retry.")
+            return len(published_ids)
+        except Exception:
+            await asyncio.to_thread(db.rollback)
+            raise
+        finally:
+            db.close()
@@ -56,4 +56,10 @@ class ServiceBase:
                 "status": "ok",
                 "service": self.service_name,
                 "timestamp": datetime.utcnow().isoformat()
-            } 
\ No newline at end of file
+            }
+
+        @self.app.get("/health/db-pool")
+        async def db_pool_status():
+            # Imported lazily so services without a database don't build an engine
+            from .database import get_pool_status
+            return get_pool_status() 
\ No newline at end of file
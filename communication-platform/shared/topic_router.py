@@ -0,0 +1,66 @@
+"""AMQP topic-pattern matching for routing consumed events to handlers."""
+from typing import Callable, Dict, List, Tuple
+
+class _Node:
+    __slots__ = ("children", "subscriptions")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.subscriptions: List[Tuple[int, Callable]] = []
+
+class TopicRouter:
+    """
+    Trie of dot-separated binding patterns supporting AMQP `*` (exactly one word)
+    and `#` (zero or more words) wildcards.
+
+    match() walks the trie once per word of the concrete routing key and caches
+    the resolved handlers for that key, so steady-state dispatch is a dict hit.
+    Several handlers may be registered for the same pattern; they are returned in
+    subscription order.
+    """
+    def __init__(self, cache_size: int = 4096):
+        self._root = _Node()
+        self._seq = 0
+        self._cache: Dict[str, Tuple[Callable, ...]] = {}
+        self.cache_size = cache_size
+
+    def add(self, pattern: str, handler: Callable):
+        node = self._root
+        for word in pattern.split("."):
+            node = node.children.setdefault(word, _Node())
+        node.subscriptions.append((self._seq, handler))
+        self._seq += 1
+        self._cache.clear()
+
+    def match(self, routing_key: str) -> Tuple[Callable, ...]:
+        cached = self._cache.get(routing_key)
+        if cached is not None:
+            return cached
+        found: Dict[int, Callable] = {}
+        self._collect(self._root, routing_key.split("."), 0, found)
+        handlers = tuple(found[seq] for seq in sorted(found))
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[routing_key] = handlers
+        return handlers
+
+    def _collect(self, node: _Node, words: List[str], i: int, found: Dict[int, Callable]):
+        if i == len(words):
+            found.update(node.subscriptions)
+            hash_node = node.children.get("#")
+            if hash_node is not None:
+                self._collect(hash_node, words, i, found)
+            return
+        exact = node.children.get(words[i])
+        if exact is not None:
+            self._collect(exact, words, i + 1, found)
+        star = node.children.get("*")
+        if star is not None:
+            self._collect(star, words, i + 1, found)
+        hash_node = node.children.get("#")
+        if hash_node is not None:
+            for j in range(i, len(words) + 1):
+                self._collect(hash_node, words, j, found)
+
+    def __len__(self) -> int:
+        return self._seq
@@ -0,0 +1,11 @@
+-- Transactional outbox: events are written in the same transaction as the
+-- rows they describe and relayed to RabbitMQ afterwards.
+CREATE TABLE IF NOT EXISTS event_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    event_id UUID NOT NULL UNIQUE,
+    event_type VARCHAR(50) NOT NULL,
+    routing_key VARCHAR(255) NOT NULL,
+    body TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
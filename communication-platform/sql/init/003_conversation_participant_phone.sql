@@ -0,0 +1,24 @@
+-- Association table used by the conversation-grouper ORM models
+CREATE TABLE IF NOT EXISTS conversation_message (
+    conversation_id UUID REFERENCES conversations(conversation_id),
+    message_id UUID REFERENCES messages(message_id),
+    PRIMARY KEY (conversation_id, message_id)
+);
+
+-- Denormalized counterparty phone for open-conversation lookup
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS participant_phone VARCHAR(20);
+
+-- Backfill from the earliest message of each conversation
+UPDATE conversations c
+SET participant_phone = first_message.from_phone
+FROM (
+    SELECT DISTINCT ON (cm.conversation_id) cm.conversation_id, m.from_phone
+    FROM conversation_message cm
+    JOIN messages m ON m.message_id = cm.message_id
+    ORDER BY cm.conversation_id, m.timestamp
+) first_message
+WHERE c.conversation_id = first_message.conversation_id
+  AND c.participant_phone IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_conversations_participant_recent
+    ON conversations(participant_phone, updated_at DESC);
@@ -0,0 +1,25 @@
+-- Message count and activity bounds maintained by the conversation-grouper
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS first_message_at TIMESTAMP;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMP;
+
+-- Backfill from the messages already linked to each conversation
+UPDATE conversations c
+SET message_count = stats.message_count,
+    first_message_at = stats.first_message_at,
+    last_message_at = stats.last_message_at
+FROM (
+    SELECT cm.conversation_id,
+           COUNT(*) AS message_count,
+           MIN(m.timestamp) AS first_message_at,
+           MAX(m.timestamp) AS last_message_at
+    FROM conversation_message cm
+    JOIN messages m ON m.message_id = cm.message_id
+    GROUP BY cm.conversation_id
+) stats
+WHERE c.conversation_id = stats.conversation_id;
+
+-- Open-conversation lookup now orders by message time rather than write time
+DROP INDEX IF EXISTS idx_conversations_participant_recent;
+CREATE INDEX IF NOT EXISTS idx_conversations_participant_last_message
+    ON conversations(participant_phone, last_message_at DESC);
@@ -0,0 +1,3 @@
+-- Newest message covered by the stored category/confidence, so the classifier
+-- only looks at messages added since the last classification
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS classified_through TIMESTAMP;
@@ -0,0 +1,3 @@
+-- Which classifier tier assigned the stored category, so the local model is
+-- only ever trained on OpenAI's labels
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS classified_by VARCHAR(64);
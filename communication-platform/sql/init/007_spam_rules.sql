@@ -0,0 +1,37 @@
+-- Spam content rules, editable at runtime through the spam-detector's /rules API
+CREATE TABLE IF NOT EXISTS spam_rules (
+    rule_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    rule_type VARCHAR(20) NOT NULL CHECK (rule_type IN ('keyword', 'pattern')),
+    pattern TEXT NOT NULL,
+    weight DOUBLE PRECISION NOT NULL DEFAULT 0.2,
+    description TEXT NOT NULL DEFAULT '',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Bumped with every rule change; workers recompile only when it moves
+CREATE TABLE IF NOT EXISTS spam_ruleset_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO spam_ruleset_version (id, version) VALUES (1, 1) ON CONFLICT (id) DO NOTHING;
+
+INSERT INTO spam_rules (rule_type, pattern, weight, description)
+SELECT rule_type, pattern, weight, description FROM (VALUES
+    ('keyword', 'free', 0.2, 'Keyword: free'),
+    ('keyword', 'win', 0.2, 'Keyword: win'),
+    ('keyword', 'winner', 0.2, 'Keyword: winner'),
+    ('keyword', 'prize', 0.2, 'Keyword: prize'),
+    ('keyword', 'cash', 0.2, 'Keyword: cash'),
+    ('keyword', 'urgent', 0.2, 'Keyword: urgent'),
+    ('keyword', 'claim', 0.2, 'Keyword: claim'),
+    ('keyword', 'click', 0.2, 'Keyword: click'),
+    ('keyword', 'buy now', 0.2, 'Keyword: buy now'),
+    ('keyword', 'limited offer', 0.2, 'Keyword: limited offer'),
+    ('pattern', '\b(?:\d{10,})\b', 0.2, 'Pattern: \b(?:\d{10,})\b'),
+    ('pattern', 'http[s]?://[\w./-]+', 0.2, 'Pattern: http[s]?://[\w./-]+'),
+    ('pattern', '[A-Z]{5,}', 0.2, 'Pattern: [A-Z]{5,}')
+) AS defaults (rule_type, pattern, weight, description)
+WHERE NOT EXISTS (SELECT 1 FROM spam_rules);
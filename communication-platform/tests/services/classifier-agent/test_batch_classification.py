@@ -0,0 +1,76 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import json
+import pytest
+from unittest.mock import AsyncMock, PropertyMock, patch
+from communication_platform.shared.models import ConversationCategory
+from communication_platform.services.classifier_agent import handlers
+from communication_platform.services.classifier_agent.models import AIClassificationResult
+
+def ai_result(category="support", confidence=0.9):
+    return AIClassificationResult(category=category, confidence=confidence, reasoning="", model_used="test")
+
+def test_parse_batch_maps_elements_by_id():
+    content = "Here you go:\n" + json.dumps([
+        {"id": 1, "category": "spam", "confidence": 0.95, "reasoning": "unsubscribe"},
+        {"id": 0, "category": "Support", "confidence": 0.8, "reasoning": "needs help"},
+    ])
+    results = handlers.parse_batch_classification(content, 2)
+    assert [r.category for r in results] == [ConversationCategory.support, ConversationCategory.spam]
+
+def test_parse_batch_leaves_invalid_elements_empty():
+    content = json.dumps([
+        {"id": 0, "category": "support", "confidence": 1.7},
+        {"category": "spam", "confidence": 0.9},
+        "not an object",
+        {"id": 2, "category": "made_up", "confidence": 0.9},
+    ])
+    results = handlers.parse_batch_classification(content, 3)
+    assert results[0] is None and results[1] is None
+    assert results[2].category == ConversationCategory.other
+
+def test_parse_batch_without_array_returns_all_none():
+    assert handlers.parse_batch_classification("Sorry, I can't help with that.", 2) == [None, None]
+
+@pytest.mark.asyncio
+async def test_batch_uses_cache_and_falls_back_per_item():
+    handlers.classification_cache.local.clear()
+    items = [("cached text", {}), ("batched text", {}), ("unparsed text", {})]
+    key = handlers.classification_key("cached text", {}, handlers.PROMPT_VERSION, handlers.OPENAI_MODEL)
+    await handlers.classification_cache.set(key, ai_result("reminder"))
+    batch = AsyncMock(return_value=[ai_result("new_lead"), None])
+    single = AsyncMock(return_value=ai_result("spam"))
+    with patch.object(handlers, "classify_batch_with_openai", batch), patch.object(handlers, "classify_with_openai", single):
+        results = await handlers.classify_batch_with_cache(items)
+    assert [r.category for r in results] == ["reminder", ConversationCategory.new_lead, ConversationCategory.spam]
+    batch.assert_awaited_once_with([items[1], items[2]])
+    single.assert_awaited_once_with("unparsed text", {})
+
+@pytest.mark.asyncio
+async def test_batch_is_split_into_request_sized_chunks():
+    handlers.classification_cache.local.clear()
+    items = [(f"text {i}", {}) for i in range(5)]
+    batch = AsyncMock(side_effect=lambda chunk: [ai_result() for _ in chunk])
+    with patch.object(handlers, "OPENAI_BATCH_SIZE", 2), patch.object(handlers, "classify_batch_with_openai", batch):
+        results = await handlers.classify_batch_with_cache(items)
+    assert all(r is not None for r in results)
+    assert [len(call.args[0]) for call in batch.await_args_list] == [2, 2, 1]
+
+@pytest.mark.asyncio
+async def test_failed_per_item_fallback_yields_none():
+    handlers.classification_cache.local.clear()
+    with patch.object(handlers, "classify_batch_with_openai", AsyncMock(return_value=[None])), \
+            patch.object(handlers, "classify_with_openai", AsyncMock(side_effect=RuntimeError("down"))):
+        assert await handlers.classify_batch_with_cache([("text", {})]) == [None]
+
+@pytest.mark.asyncio
+async def test_per_item_fallback_skipped_while_breaker_open():
+    handlers.classification_cache.local.clear()
+    single = AsyncMock(return_value=ai_result())
+    with patch.object(handlers, "classify_batch_with_openai", AsyncMock(return_value=[None])), \
+            patch.object(handlers, "classify_with_openai", single), \
+            patch.object(type(handlers.openai_client.breaker), "is_open", new_callable=PropertyMock, return_value=True):
+        assert await handlers.classify_batch_with_cache([("text", {})]) == [None]
+    single.assert_not_awaited()
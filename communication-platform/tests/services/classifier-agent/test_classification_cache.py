@@ -0,0 +1,64 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import pytest
+from pydantic import BaseModel
+from communication_platform.services.classifier_agent.cache import ClassificationCache, classification_key
+
+class Result(BaseModel):
+    category: str
+    confidence: float
+
+class FakeRedis:
+    def __init__(self, fail=False):
+        self.store = {}
+        self.fail = fail
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis down")
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.store[key] = value
+
+def test_key_ignores_case_and_whitespace_but_not_prompt_or_model():
+    base = classification_key("Need a QUOTE\n please", {"customer_id": None}, "1", "gpt-4-turbo")
+    assert base == classification_key("need a quote please ", {"customer_id": None}, "1", "gpt-4-turbo")
+    assert base != classification_key("need a quote please", {"customer_id": None}, "2", "gpt-4-turbo")
+    assert base != classification_key("need a quote please", {"customer_id": None}, "1", "gpt-4o")
+    assert base != classification_key("need an invoice", {"customer_id": None}, "1", "gpt-4-turbo")
+
+@pytest.mark.asyncio
+async def test_local_hit_and_miss_are_counted():
+    cache = ClassificationCache(Result)
+    assert await cache.get("k") is None
+    await cache.set("k", Result(category="support", confidence=0.9))
+    assert (await cache.get("k")).category == "support"
+    stats = cache.stats()
+    assert (stats["local_hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+@pytest.mark.asyncio
+async def test_redis_tier_is_shared_and_backfills_local(monkeypatch):
+    redis = FakeRedis()
+    writer = ClassificationCache(Result, redis_url="redis://test")
+    reader = ClassificationCache(Result, redis_url="redis://test")
+    monkeypatch.setattr(writer, "_redis", lambda: redis)
+    monkeypatch.setattr(reader, "_redis", lambda: redis)
+    await writer.set("k", Result(category="new_lead", confidence=0.8))
+    assert (await reader.get("k")).category == "new_lead"
+    assert (await reader.get("k")).confidence == 0.8
+    assert reader.stats()["redis_hits"] == 1
+    assert reader.stats()["local_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_redis_errors_degrade_to_misses(monkeypatch):
+    cache = ClassificationCache(Result, redis_url="redis://test")
+    monkeypatch.setattr(cache, "_redis", lambda: FakeRedis(fail=True))
+    await cache.set("k", Result(category="spam", confidence=0.7))
+    cache.local.clear()
+    assert await cache.get("k") is None
+    assert cache.stats()["redis_errors"] == 2
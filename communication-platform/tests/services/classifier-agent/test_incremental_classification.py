@@ -0,0 +1,108 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+from unittest.mock import AsyncMock, MagicMock, patch
+from communication_platform.shared.models import ConversationCategory
+from communication_platform.services.classifier_agent import handlers
+
+CLASSIFIED_AT = datetime(2024, 1, 1, 12, 0)
+
+def make_conversation(last_message_at, category="quote_request", confidence=0.9, classified_by="gpt-3.5-turbo"):
+    return SimpleNamespace(
+        conversation_id=uuid4(),
+        category=category,
+        confidence=confidence,
+        classified_through=CLASSIFIED_AT,
+        last_message_at=last_message_at,
+        classified_by=classified_by,
+    )
+
+def make_db(new_messages):
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=new_messages)))
+    db.commit = AsyncMock()
+    return db
+
+@pytest.mark.parametrize("content,expected", [
+    ("ok thanks!", True),
+    ("Sounds good, see you then", True),
+    ("👍", True),
+    ("ok but can you also quote the fence", False),
+    ("thanks thanks thanks thanks thanks thanks thanks", False),
+    ("No problem, will do", True),
+    ("no", False),
+    ("problem", False),
+    ("will see", False),
+])
+def test_is_acknowledgement(content, expected):
+    assert handlers.is_acknowledgement(content) is expected
+
+def test_needs_reclassification_only_for_significant_new_content():
+    assert not handlers.needs_reclassification(["ok", "thank you"], ConversationCategory.support)
+    assert not handlers.needs_reclassification(["still need help with the issue"], ConversationCategory.support)
+    assert handlers.needs_reclassification(["please unsubscribe me"], ConversationCategory.support)
+    # Bare words that only acknowledge inside a phrase are not acknowledgements
+    assert handlers.needs_reclassification(["no"], ConversationCategory.support)
+    assert handlers.needs_reclassification(["problem"], ConversationCategory.quote_request)
+
+@pytest.mark.asyncio
+async def test_no_new_messages_keeps_label_without_querying():
+    conversation = make_conversation(last_message_at=CLASSIFIED_AT)
+    db = make_db([])
+    kept = await handlers.keep_prior_label(conversation, db)
+    assert kept.category == ConversationCategory.quote_request
+    db.execute.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_acknowledgement_advances_watermark_and_keeps_label():
+    newest = CLASSIFIED_AT + timedelta(minutes=5)
+    conversation = make_conversation(last_message_at=newest)
+    db = make_db([SimpleNamespace(content="ok thanks", timestamp=newest)])
+    kept = await handlers.keep_prior_label(conversation, db)
+    assert kept.confidence == 0.9
+    assert conversation.classified_through == newest
+    db.commit.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_significant_message_escalates():
+    newest = CLASSIFIED_AT + timedelta(minutes=5)
+    conversation = make_conversation(last_message_at=newest)
+    db = make_db([SimpleNamespace(content="Actually please remove me, stop texting", timestamp=newest)])
+    assert await handlers.keep_prior_label(conversation, db) is None
+    assert conversation.classified_through == CLASSIFIED_AT
+    db.commit.assert_not_called()
+
+def test_only_confident_watermarked_labels_are_reused():
+    assert handlers.has_confident_label(make_conversation(CLASSIFIED_AT))
+    assert not handlers.has_confident_label(make_conversation(CLASSIFIED_AT, confidence=0.5))
+    unmarked = make_conversation(CLASSIFIED_AT)
+    unmarked.classified_through = None
+    assert not handlers.has_confident_label(unmarked)
+
+def test_only_model_labels_are_confident_priors():
+    assert handlers.has_confident_label(make_conversation(CLASSIFIED_AT, classified_by="local:abc123"))
+    # Keyword-rule labels are fallbacks and get re-classified
+    assert not handlers.has_confident_label(make_conversation(CLASSIFIED_AT, classified_by=handlers.RULES_SOURCE))
+    assert not handlers.has_confident_label(make_conversation(CLASSIFIED_AT, classified_by=None))
+
+def test_build_conversation_text_keeps_most_recent_messages_and_chars():
+    contents = ["first", None, "second", "third", "fourth"]
+    with patch.object(handlers, "CLASSIFY_MAX_MESSAGES", 3), patch.object(handlers, "CLASSIFY_MAX_CHARS", 100):
+        assert handlers.build_conversation_text(contents) == "second\nthird\nfourth"
+    with patch.object(handlers, "CLASSIFY_MAX_MESSAGES", 10), patch.object(handlers, "CLASSIFY_MAX_CHARS", 13):
+        assert handlers.build_conversation_text(contents) == "third\nfourth"
+    with patch.object(handlers, "CLASSIFY_MAX_CHARS", 4):
+        assert handlers.build_conversation_text(["x" * 10]) == "xxxx"
+
+@pytest.mark.asyncio
+async def test_load_conversation_text_reads_newest_first_rows():
+    newest = CLASSIFIED_AT + timedelta(minutes=2)
+    rows = [SimpleNamespace(content="b", timestamp=newest), SimpleNamespace(content="a", timestamp=CLASSIFIED_AT)]
+    text, classified_through = await handlers.load_conversation_text(uuid4(), make_db(rows))
+    assert (text, classified_through) == ("a\nb", newest)
+    assert await handlers.load_conversation_text(uuid4(), make_db([])) == ("", None)
@@ -0,0 +1,77 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import pytest
+from unittest.mock import patch
+from communication_platform.shared.models import ConversationCategory
+from communication_platform.services.classifier_agent import handlers
+from communication_platform.services.classifier_agent.local_model import (
+    LocalClassifier, load_local_model, split_holdout, evaluate
+)
+
+TEMPLATES = {
+    "quote_request": ["how much would a {} cost", "can I get a quote for the {}", "what's your price for a {}"],
+    "support": ["my {} is broken, need help", "there is a problem with the {}", "the {} stopped working again"],
+    "reminder": ["reminder: your {} appointment is tomorrow", "don't forget the {} visit on friday"],
+}
+THINGS = ["fence", "deck", "roof", "driveway", "patio", "gutter"]
+
+def samples():
+    return [
+        (template.format(thing), category, 1.0)
+        for category, templates in TEMPLATES.items()
+        for template in templates
+        for thing in THINGS
+    ]
+
+@pytest.fixture(scope="module")
+def model():
+    return LocalClassifier(list(TEMPLATES), n_features=2 ** 12).fit(samples(), epochs=10)
+
+def test_fit_learns_separable_categories(model):
+    assert model.predict("could you quote me for a new shed")[0] == "quote_request"
+    assert model.predict("the shed door is broken")[0] == "support"
+    category, probability = model.predict("reminder: shed appointment tomorrow")
+    assert category == "reminder" and probability > 0.5
+    assert sum(model.predict_proba("anything").values()) == pytest.approx(1.0)
+
+def test_save_and_load_round_trip(model, tmp_path):
+    path = str(tmp_path / "model.json")
+    model.save(path)
+    loaded = load_local_model(path)
+    assert loaded.version == model.version
+    assert loaded.predict("the roof is broken")[1] == pytest.approx(model.predict("the roof is broken")[1], abs=1e-4)
+
+def test_load_local_model_disables_tier_on_bad_file(tmp_path):
+    path = tmp_path / "model.json"
+    path.write_text('{"format": 99}')
+    assert load_local_model(str(path)) is None
+    assert load_local_model("") is None
+
+def test_evaluation_report(model):
+    data = samples()
+    train, holdout = split_holdout(data, [text for text, _, _ in data], 0.25)
+    assert holdout and len(train) + len(holdout) == len(data)
+    report = evaluate(model, data, threshold=0.0)
+    assert report["samples"] == len(data)
+    assert report["accuracy"] == report["accuracy_at_threshold"] and report["coverage"] == 1.0
+    assert set(report["categories"]) == set(TEMPLATES)
+    assert report["categories"]["support"]["support"] == len(TEMPLATES["support"]) * len(THINGS)
+
+def test_local_tier_escalates_below_threshold(model):
+    with patch.object(handlers, "local_model", model), patch.object(handlers, "LOCAL_MODEL_THRESHOLD", 0.0):
+        result = handlers.classify_with_local_model("the gutter is broken, need help")
+        assert result.category == ConversationCategory.support
+        assert result.model_used == f"local:{model.version}"
+    with patch.object(handlers, "local_model", model), patch.object(handlers, "LOCAL_MODEL_THRESHOLD", 1.01):
+        assert handlers.classify_with_local_model("the gutter is broken, need help") is None
+    with patch.object(handlers, "local_model", None):
+        assert handlers.classify_with_local_model("anything") is None
+
+def test_training_excludes_unattributed_labels_unless_asked():
+    from communication_platform.services.classifier_agent.train_local_model import trainable_source, parse_args
+    assert "classified_by IS NOT NULL" in str(trainable_source())
+    assert "classified_by IS NULL" in str(trainable_source(include_legacy=True))
+    assert parse_args(["--output", "m.json"]).include_legacy is False
+    assert parse_args(["--output", "m.json", "--include-legacy"]).include_legacy is True
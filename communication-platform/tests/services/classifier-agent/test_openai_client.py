@@ -0,0 +1,116 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import pytest
+import openai
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from communication_platform.services.classifier_agent.openai_client import (
+    OpenAIClient, OpenAIUnavailable, CircuitBreaker, TokenBucket, LatencyHistogram
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def make_client(create, **kwargs):
+    client = OpenAIClient(api_key="test-key", retry_max_delay=0, **kwargs)
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    client._client = lambda: fake
+    return client
+
+def test_token_bucket_reserves_ahead_and_rejects_long_waits():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == pytest.approx(0.5)
+    assert bucket.reserve(0.5) is None
+    clock.now = 1.5
+    assert bucket.reserve(0) == 0
+
+def test_circuit_breaker_opens_and_probes_once_after_reset():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow()
+    clock.now = 31
+    assert not breaker.is_open
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now = 62
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+def test_latency_histogram_buckets_are_cumulative():
+    histogram = LatencyHistogram(buckets_ms=(100, 1000))
+    for seconds in (0.05, 0.5, 0.6, 5):
+        histogram.record(seconds)
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"le_100": 1, "le_1000": 3, "le_inf": 4}
+    assert snapshot["count"] == 4 and snapshot["max_ms"] == 5000
+
+@pytest.mark.asyncio
+async def test_chat_retries_degraded_errors_then_succeeds():
+    create = AsyncMock(side_effect=[openai.APITimeoutError(request=None), completion("{}")])
+    client = make_client(create)
+    assert await client.chat([], model="m", max_tokens=10) == "{}"
+    assert create.await_count == 2
+    assert client.stats()["request_latency"]["count"] == 2
+
+@pytest.mark.asyncio
+async def test_breaker_short_circuits_after_repeated_failures():
+    create = AsyncMock(side_effect=openai.APITimeoutError(request=None))
+    client = make_client(create, max_retries=1, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    for _ in range(2):
+        with pytest.raises(OpenAIUnavailable):
+            await client.chat([], model="m", max_tokens=10)
+    assert create.await_count == 4
+    with pytest.raises(OpenAIUnavailable, match="circuit breaker"):
+        await client.chat([], model="m", max_tokens=10)
+    assert create.await_count == 4
+    assert client.stats()["rejected"] == 1
+
+@pytest.mark.asyncio
+async def test_non_degraded_errors_are_not_retried():
+    create = AsyncMock(side_effect=ValueError("bad request"))
+    client = make_client(create)
+    with pytest.raises(ValueError):
+        await client.chat([], model="m", max_tokens=10)
+    assert create.await_count == 1
+    assert client.breaker.state == "closed"
+
+@pytest.mark.asyncio
+async def test_rate_limit_fails_fast():
+    create = AsyncMock(return_value=completion("ok"))
+    client = make_client(create, rate_limit=0.001, burst=1, max_rate_wait=1)
+    assert await client.chat([], model="m", max_tokens=10) == "ok"
+    with pytest.raises(OpenAIUnavailable, match="rate limit"):
+        await client.chat([], model="m", max_tokens=10)
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_frees_half_open_slot():
+    import asyncio
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.now = 31
+    create = AsyncMock(side_effect=[asyncio.CancelledError(), completion("ok")])
+    client = make_client(create, breaker=breaker)
+    with pytest.raises(asyncio.CancelledError):
+        await client.chat([], model="m", max_tokens=10)
+    assert breaker.state == "half_open"
+    assert await client.chat([], model="m", max_tokens=10) == "ok"
+    assert breaker.state == "closed"
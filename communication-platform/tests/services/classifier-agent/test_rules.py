@@ -0,0 +1,41 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import pytest
+from communication_platform.shared.models import ConversationCategory
+from communication_platform.services.classifier_agent.rules import KeywordMatcher, NO_MATCH_CONFIDENCE
+
+RULES = {
+    ConversationCategory.new_lead: {"interested": 1.0, "new customer": 1.5, "quote": 0.5},
+    ConversationCategory.quote_request: {"quote": 1.0, "estimate": 1.0, "cost": 0.75},
+    ConversationCategory.spam: ["stop", "unsubscribe"],
+}
+
+@pytest.fixture
+def matcher():
+    return KeywordMatcher(RULES)
+
+def test_finds_every_hit_on_word_boundaries(matcher):
+    text = "Quotes and an ESTIMATE please, we're a new\n customer. Don't stop; unstoppable."
+    assert matcher.hits(text) == ["quote", "estimate", "new customer", "stop"]
+
+def test_shared_keyword_no_longer_shadows_quote_request(matcher):
+    match = matcher.match("Can I get a quote and an estimate for the deck?")
+    assert match.category == ConversationCategory.quote_request
+    assert match.keywords == ["quote", "estimate"]
+
+def test_weighted_hits_decide_between_categories(matcher):
+    assert matcher.match("I'm interested, could you quote me?").category == ConversationCategory.new_lead
+
+def test_confidence_grows_with_evidence_and_drops_with_ambiguity(matcher):
+    single = matcher.match("what would it cost").confidence
+    agreeing = matcher.match("quote, estimate and cost please").confidence
+    ambiguous = matcher.match("what would it cost, please stop").confidence
+    assert 0.5 < single < agreeing < 0.9
+    assert ambiguous < single
+
+def test_no_hits_is_other(matcher):
+    match = matcher.match("See you on Tuesday")
+    assert match == (ConversationCategory.other, NO_MATCH_CONFIDENCE, [])
+    assert KeywordMatcher({}).match("anything").keywords == []
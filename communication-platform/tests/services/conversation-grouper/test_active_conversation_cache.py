@@ -0,0 +1,41 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+from uuid import uuid4
+from datetime import datetime, timedelta
+from communication_platform.services.conversation_grouper.cache import ActiveConversationCache
+
+WINDOW = timedelta(hours=2)
+
+def test_hit_inside_window_returns_cached_conversation():
+    cache = ActiveConversationCache(WINDOW)
+    conversation_id = uuid4()
+    last_activity = datetime(2024, 1, 1, 12, 0)
+    cache.put("+1234567890", conversation_id, last_activity, 3)
+    entry = cache.get("+1234567890", last_activity + timedelta(minutes=30))
+    assert entry.conversation_id == conversation_id
+    assert entry.message_count == 3
+    assert entry.window_end == last_activity + WINDOW
+    assert cache.stats()["hits"] == 1
+
+def test_message_outside_window_misses():
+    cache = ActiveConversationCache(WINDOW)
+    last_activity = datetime(2024, 1, 1, 12, 0)
+    cache.put("+1234567890", uuid4(), last_activity, 1)
+    assert cache.get("+1234567890", last_activity + timedelta(hours=3)) is None
+    assert cache.get("+1234567890", last_activity - timedelta(hours=3)) is None
+    assert cache.get("+1999999999", last_activity) is None
+    assert cache.stats()["misses"] == 3
+
+def test_invalidate_and_disable():
+    cache = ActiveConversationCache(WINDOW)
+    now = datetime(2024, 1, 1, 12, 0)
+    cache.put("+1234567890", uuid4(), now, 1)
+    cache.invalidate("+1234567890")
+    assert cache.get("+1234567890", now) is None
+    cache.put("+1234567890", uuid4(), now, 1)
+    cache.disable()
+    assert cache.get("+1234567890", now) is None
+    cache.put("+1234567890", uuid4(), now, 1)
+    assert len(cache) == 0
@@ -0,0 +1,174 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import asyncio
+import pytest
+from uuid import uuid4
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from sqlalchemy import Column, Table, create_engine, event, select, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from communication_platform.services.conversation_grouper import handlers
+from communication_platform.services.conversation_grouper.database import ConversationDB, ConversationMessageDB, MessageDB
+
+def test_conversation_counter_columns():
+    columns = ConversationDB.__table__.columns
+    assert not columns["message_count"].nullable
+    assert columns["message_count"].server_default.arg == "0"
+    assert columns["first_message_at"].nullable
+    assert columns["last_message_at"].nullable
+
+def test_open_conversation_lookup_index_orders_by_last_message():
+    index = next(i for i in ConversationDB.__table__.indexes if i.name == "idx_conversations_participant_last_message")
+    assert [c.name for c in index.columns] == ["participant_phone", "last_message_at"]
+
+PHONE = "+15550001111"
+START = datetime(2024, 1, 1, 12, 0)
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+# customers is created by sql/init and has no model; conversations reference it
+if "customers" not in ConversationDB.metadata.tables:
+    Table("customers", ConversationDB.metadata, Column("customer_id", UUID(as_uuid=True), primary_key=True))
+
+def _skip_nulls(pick):
+    # Postgres LEAST/GREATEST ignore NULL arguments
+    def aggregate(*values):
+        present = [v for v in values if v is not None]
+        return pick(present) if present else None
+    return aggregate
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+    @event.listens_for(engine, "connect")
+    def _register_functions(connection, _):
+        connection.create_function("least", -1, _skip_nulls(min))
+        connection.create_function("greatest", -1, _skip_nulls(max))
+        # Advisory locks are a no-op on a single SQLite connection
+        connection.create_function("hashtext", 1, lambda value: hash(value) & 0x7FFFFFFF)
+        connection.create_function("pg_advisory_xact_lock", 1, lambda key: None)
+
+    ConversationDB.metadata.create_all(engine, tables=[ConversationDB.__table__, ConversationMessageDB, MessageDB.__table__])
+    handlers.active_conversations.clear()
+    yield sessionmaker(bind=engine)
+    handlers.active_conversations.clear()
+
+@pytest.fixture
+def db(session_factory):
+    with session_factory() as session:
+        yield session
+
+def add_conversation(db, message_count=0, first_at=None, last_at=None):
+    conversation = ConversationDB(
+        conversation_id=uuid4(), participant_phone=PHONE, message_count=message_count,
+        first_message_at=first_at, last_message_at=last_at
+    )
+    db.add(conversation)
+    db.commit()
+    return conversation.conversation_id
+
+def test_record_activity_increments_and_widens_bounds(db):
+    conversation_id = add_conversation(db, 2, START, START + timedelta(minutes=10))
+    count = handlers.record_activity(conversation_id, 3, START - timedelta(minutes=5), START + timedelta(minutes=5), START, db)
+    db.commit()
+    assert count == 5
+    conversation = db.get(ConversationDB, conversation_id)
+    db.refresh(conversation)
+    assert conversation.first_message_at == START - timedelta(minutes=5)
+    assert conversation.last_message_at == START + timedelta(minutes=10)
+
+def test_record_activity_sets_bounds_on_empty_conversation(db):
+    conversation_id = add_conversation(db)
+    assert handlers.record_activity(conversation_id, 1, START, START, START, db) == 1
+    db.commit()
+    conversation = db.get(ConversationDB, conversation_id)
+    db.refresh(conversation)
+    assert (conversation.first_message_at, conversation.last_message_at) == (START, START)
+
+def test_assign_creates_then_updates_through_cache(db):
+    first, second = uuid4(), uuid4()
+    conversation_id, action, count = handlers.assign_to_conversation(PHONE, START, [first, first], db)
+    assert (action, count) == ("created", 1)
+    assert handlers.active_conversations.get(PHONE, START).message_count == 1
+
+    hits = handlers.active_conversations.hits
+    with patch.object(handlers, "find_existing_conversation") as find:
+        again, action, count = handlers.assign_to_conversation(PHONE, START + timedelta(minutes=1), [second], db)
+    find.assert_not_called()
+    assert handlers.active_conversations.hits == hits + 1
+    assert (again, action, count) == (conversation_id, "updated", 2)
+
+def test_assign_skips_already_attached_messages(db):
+    message_id = uuid4()
+    conversation_id, _, _ = handlers.assign_to_conversation(PHONE, START, [message_id], db)
+    handlers.active_conversations.clear()
+    # Redelivery of the same message: found via the index, not counted twice
+    again, action, count = handlers.assign_to_conversation(PHONE, START, [message_id], db)
+    assert (again, action, count) == (conversation_id, "updated", 1)
+    linked = db.execute(select(func.count()).select_from(ConversationMessageDB)).scalar_one()
+    assert linked == 1
+
+def test_find_existing_conversation_returns_most_recent_in_window(db):
+    add_conversation(db, 1, START - timedelta(hours=1), START - timedelta(hours=1))
+    newest = add_conversation(db, 1, START - timedelta(minutes=10), START - timedelta(minutes=10))
+    add_conversation(db, 1, START - timedelta(hours=5), START - timedelta(hours=5))
+    other = ConversationDB(conversation_id=uuid4(), participant_phone="+15550002222", message_count=1,
+                           first_message_at=START, last_message_at=START)
+    db.add(other)
+    db.commit()
+    assert handlers.find_existing_conversation(PHONE, START, db).conversation_id == newest
+
+def test_find_existing_conversation_ignores_conversations_outside_window(db):
+    add_conversation(db, 1, START - timedelta(hours=3), START - timedelta(hours=3))
+    assert handlers.find_existing_conversation(PHONE, START, db) is None
+    assert handlers.find_existing_conversation("+15550002222", START, db) is None
+
+def group_stream(session_factory, stream, invalidate_before=()):
+    """Store and group (minutes, content) messages one at a time; returns the conversation per message."""
+    conversations = []
+    with patch.object(handlers, "SessionLocal", session_factory):
+        for i, (minutes, content) in enumerate(stream):
+            sent_at = START + timedelta(minutes=minutes)
+            message_id = uuid4()
+            with session_factory() as session:
+                session.add(MessageDB(message_id=message_id, type="sms", from_phone=PHONE, to_phone="+15559990000",
+                                      content=content, timestamp=sent_at))
+                session.commit()
+            if i in invalidate_before:
+                handlers.active_conversations.invalidate(PHONE)
+            [response] = asyncio.run(handlers.group_incoming_messages(
+                PHONE, [(sent_at.replace(tzinfo=timezone.utc).timestamp(), message_id, content)], uuid4()))
+            conversations.append(response.conversation_id)
+    return conversations
+
+STREAM = [
+    (0, "Can I get a quote for a new deck?"),
+    (50, "What would the deck quote include?"),
+    (100, "Is the deck quote still valid next week?"),
+    # Still within two hours of the last message, but the segment would span 150 minutes
+    (150, "Is the deck quote still valid next week?"),
+]
+
+def layout(conversations):
+    ids = {}
+    return [ids.setdefault(c, len(ids)) for c in conversations]
+
+def test_cold_cache_segments_like_warm_cache(session_factory):
+    warm = group_stream(session_factory, STREAM)
+    handlers.active_conversations.clear()
+    with session_factory() as session:
+        session.execute(ConversationMessageDB.delete())
+        session.query(ConversationDB).delete()
+        session.query(MessageDB).delete()
+        session.commit()
+    cold = group_stream(session_factory, STREAM, invalidate_before=range(len(STREAM)))
+    assert layout(warm) == [0, 0, 0, 1]
+    assert layout(cold) == layout(warm)
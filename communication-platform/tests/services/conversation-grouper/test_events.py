@@ -0,0 +1,94 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import json
+import threading
+import pytest
+from uuid import uuid4
+from unittest.mock import AsyncMock, MagicMock, patch
+from communication_platform.shared.event_subscriber import EventSubscriber
+from communication_platform.services.conversation_grouper import events
+from communication_platform.services.conversation_grouper.models import GroupingResponse
+
+ALICE = "+15550001111"
+BOB = "+15550002222"
+BUSINESS = "+15559990000"
+
+def event(from_phone, timestamp, content, message_id=None):
+    payload = {"message_id": str(message_id or uuid4()), "to_phone": BUSINESS, "content": content}
+    if from_phone is not None:
+        payload.update(from_phone=from_phone, timestamp=timestamp)
+    return {"trace_id": str(uuid4()), "payload": payload}
+
+@pytest.mark.asyncio
+async def test_batch_is_partitioned_by_phone_pair_and_sorted_by_timestamp():
+    alice_late, alice_early, bob, legacy = uuid4(), uuid4(), uuid4(), uuid4()
+    batch = [
+        event(ALICE, 200.0, "second", alice_late),
+        event(BOB, 150.0, "hello", bob),
+        event(None, None, "", legacy),
+        event(ALICE, 100.0, "first", alice_early),
+    ]
+    alice_conversation, bob_conversation, legacy_conversation = uuid4(), uuid4(), uuid4()
+    async def grouped(phone, messages, trace_id):
+        if phone == ALICE:
+            return [GroupingResponse(conversation_id=alice_conversation, action="updated", message_count=2)]
+        return [GroupingResponse(conversation_id=bob_conversation, action="created", message_count=1)]
+    group_incoming = AsyncMock(side_effect=grouped)
+    legacy_phone = "+15550003333"
+    group_legacy = AsyncMock(return_value=GroupingResponse(conversation_id=legacy_conversation, action="created", message_count=1, participant_phone=legacy_phone))
+    publisher = MagicMock()
+    with patch.object(events, "group_incoming_messages", group_incoming), \
+            patch.object(events, "group_messages", group_legacy), \
+            patch.object(events, "publisher", publisher):
+        await events.handle_message_received_batch(batch)
+
+    calls = {call.args[0]: call.args[1] for call in group_incoming.await_args_list}
+    assert calls == {
+        ALICE: [(100.0, alice_early, "first"), (200.0, alice_late, "second")],
+        BOB: [(150.0, bob, "hello")],
+    }
+    # The event without from_phone falls back to loading the message by id
+    group_legacy.assert_awaited_once()
+    assert group_legacy.await_args.args[0] == [legacy]
+
+    published = [(call.args[0].payload["conversation_id"], call.args[0].payload["participant_phone"], call.kwargs["routing_key"])
+                 for call in publisher.publish.call_args_list]
+    assert sorted(published, key=str) == sorted([
+        # The id-only path still names the phone so other replicas can invalidate it
+        (str(legacy_conversation), legacy_phone, "conversation.updated.created"),
+        (str(alice_conversation), ALICE, "conversation.updated.updated"),
+        (str(bob_conversation), BOB, "conversation.updated.created"),
+    ], key=str)
+
+@pytest.mark.asyncio
+async def test_failed_run_does_not_block_other_senders_but_fails_the_batch():
+    async def grouped(phone, messages, trace_id):
+        if phone == ALICE:
+            raise RuntimeError("database down")
+        return [GroupingResponse(conversation_id=uuid4(), action="created", message_count=1)]
+    publisher = MagicMock()
+    with patch.object(events, "group_incoming_messages", AsyncMock(side_effect=grouped)), \
+            patch.object(events, "publisher", publisher):
+        with pytest.raises(RuntimeError, match="1 grouping run"):
+            await events.handle_message_received_batch([event(ALICE, 1.0, "a"), event(BOB, 2.0, "b")])
+    assert [call.args[0].payload["participant_phone"] for call in publisher.publish.call_args_list] == [BOB]
+
+def test_batch_is_nacked_when_grouping_fails():
+    subscriber = EventSubscriber.__new__(EventSubscriber)
+    subscriber._local = threading.local()
+    items = [(tag, "message.received.sms.new", json.dumps(event(ALICE, float(tag), "hi")).encode()) for tag in (1, 2)]
+    with patch.object(events, "group_incoming_messages", AsyncMock(side_effect=RuntimeError("database down"))), \
+            patch.object(events, "publisher", MagicMock()):
+        assert subscriber._handle_batch(events.handle_message_received_batch, items) == [False, False]
+
+def test_batch_is_nacked_when_publish_fails():
+    subscriber = EventSubscriber.__new__(EventSubscriber)
+    subscriber._local = threading.local()
+    items = [(1, "message.received.sms.new", json.dumps(event(ALICE, 1.0, "hi")).encode())]
+    publisher = MagicMock()
+    publisher.publish.return_value = False
+    grouped = AsyncMock(return_value=[GroupingResponse(conversation_id=uuid4(), action="created", message_count=1)])
+    with patch.object(events, "group_incoming_messages", grouped), patch.object(events, "publisher", publisher):
+        assert subscriber._handle_batch(events.handle_message_received_batch, items) == [False]
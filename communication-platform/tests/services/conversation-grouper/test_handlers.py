@@ -0,0 +1,49 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import time
+import asyncio
+import threading
+import pytest
+from uuid import uuid4
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from communication_platform.services.conversation_grouper import handlers
+
+PHONE = "+15550001111"
+
+@pytest.mark.asyncio
+async def test_failed_batch_drops_cached_profile():
+    start = datetime(2024, 1, 1, 12, 0).timestamp()
+    profile = handlers.segmenter.append(None, "booking an appointment for friday", start)
+    handlers.active_conversations.put(PHONE, uuid4(), datetime.utcfromtimestamp(start), 1, profile)
+    assign = MagicMock(side_effect=RuntimeError("commit failed"))
+    try:
+        with patch.object(handlers, "SessionLocal", MagicMock()), patch.object(handlers, "assign_to_conversation", assign):
+            with pytest.raises(RuntimeError):
+                await handlers.group_incoming_messages(PHONE, [(start + 30, uuid4(), "can the appointment be earlier")], uuid4())
+        # Extended in place, then dropped with the cache entry since nothing was committed
+        assert assign.call_args.kwargs["profile"] is profile
+        assert handlers.active_conversations.profile(PHONE, datetime.utcfromtimestamp(start)) is None
+    finally:
+        handlers.active_conversations.invalidate(PHONE)
+
+def test_batches_for_one_phone_are_serialized():
+    active, overlaps = [], []
+    def assign(phone_number, *args, **kwargs):
+        active.append(phone_number)
+        if active.count(phone_number) > 1:
+            overlaps.append(phone_number)
+        time.sleep(0.05)
+        active.remove(phone_number)
+        return uuid4(), "created", 1
+    def run(phone_number):
+        asyncio.run(handlers.group_incoming_messages(phone_number, [(0.0, uuid4(), "hello")], uuid4()))
+    with patch.object(handlers, "SessionLocal", MagicMock()), patch.object(handlers, "assign_to_conversation", assign):
+        threads = [threading.Thread(target=run, args=(PHONE,)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert overlaps == []
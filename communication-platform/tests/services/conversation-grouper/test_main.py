@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import threading
+from uuid import uuid4
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi.testclient import TestClient
+from communication_platform.services.conversation_grouper import events, main
+from communication_platform.services.conversation_grouper.cache import ActiveConversationCache
+from communication_platform.services.conversation_grouper.models import GroupingResponse
+
+PHONE = "+15550001111"
+
+def run_invalidation(cache, attempts):
+    """Run the invalidation loop over `attempts`, side effects for successive consumer runs."""
+    stop = threading.Event()
+    remaining = list(attempts)
+    def consumer():
+        effect = remaining.pop(0)
+        if not remaining:
+            stop.set()
+        return effect()
+    with patch.object(main, "active_conversations", cache), \
+            patch.object(main, "start_cache_invalidation", side_effect=consumer), \
+            patch.object(main, "cache_invalidation_stop", stop), \
+            patch.object(main, "CACHE_INVALIDATION_RETRY_SECONDS", 0):
+        main.run_cache_invalidation_bg()
+
+def test_cache_disabled_when_invalidation_consumer_returns():
+    # EventSubscriber.start_consuming logs broker errors and returns normally
+    cache = ActiveConversationCache(timedelta(hours=2))
+    run_invalidation(cache, [lambda: None])
+    assert cache.enabled is False
+
+def test_invalidation_consumer_reconnects_and_reenables_empty_cache():
+    cache = ActiveConversationCache(timedelta(hours=2))
+    seen = []
+    def broker_down():
+        raise RuntimeError("broker down")
+    def reconnected():
+        # What start_cache_invalidation does once subscribed again
+        cache.enable()
+        seen.append((cache.enabled, len(cache)))
+    cache.put(PHONE, uuid4(), datetime(2024, 1, 1, 12, 0), 1)
+    run_invalidation(cache, [broker_down, broker_down, reconnected])
+    assert seen == [(True, 0)]
+    # ...and disabled again once that consumer stops
+    assert cache.enabled is False
+
+def test_start_cache_invalidation_enables_cache_once_subscribed():
+    cache = ActiveConversationCache(timedelta(hours=2))
+    cache.disable()
+    subscriber = MagicMock()
+    subscriber.start_consuming.side_effect = lambda: seen.append(cache.enabled)
+    seen = []
+    with patch.object(events, "active_conversations", cache), patch.object(events, "EventSubscriber", return_value=subscriber):
+        events.start_cache_invalidation()
+    assert seen == [True]
+
+def test_group_endpoint_publishes_update_with_participant_phone():
+    conversation_id = uuid4()
+    response = GroupingResponse(conversation_id=conversation_id, action="updated", message_count=2, participant_phone=PHONE)
+    publish = MagicMock(return_value=True)
+    with patch.object(main, "group_messages", AsyncMock(return_value=response)), \
+            patch.object(main, "publish_conversation_updated_event", publish):
+        result = TestClient(main.app).post("/group", json={"message_ids": [str(uuid4())]})
+    assert result.status_code == 200
+    args = publish.call_args.args
+    assert (args[0], args[1], args[3]) == (conversation_id, "updated", PHONE)
@@ -0,0 +1,62 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import pytest
+from communication_platform.services.conversation_grouper.segmentation import Segmenter, SegmentProfile, tokenize
+
+MINUTE = 60
+
+def test_tokenize_drops_punctuation_case_and_stopwords():
+    assert tokenize("Is the QUOTE ready? I'm asking for my deck.") == ["quote", "ready", "asking", "deck"]
+
+def test_similar_messages_form_one_segment():
+    segmenter = Segmenter(reply_gap_seconds=0)
+    segments = segmenter.segment([
+        (0, "Can I get a quote for a new deck?"),
+        (30 * MINUTE, "What would the deck quote include?"),
+        (50 * MINUTE, "Is the deck quote still valid next week?"),
+    ])
+    assert [indices for indices, _ in segments] == [[0, 1, 2]]
+    assert segments[0][1].similar_count == 2
+
+def test_unrelated_message_after_reply_gap_splits():
+    segmenter = Segmenter(reply_gap_seconds=5 * MINUTE)
+    segments = segmenter.segment([
+        (0, "Can I get a quote for a new deck?"),
+        (2 * MINUTE, "ok thanks"),
+        (40 * MINUTE, "Your invoice payment failed yesterday"),
+    ])
+    assert [indices for indices, _ in segments] == [[0, 1], [2]]
+
+def test_long_silence_splits_even_when_similar():
+    segmenter = Segmenter(max_gap_seconds=60 * MINUTE)
+    segments = segmenter.segment([(0, "deck quote"), (61 * MINUTE, "deck quote")])
+    assert len(segments) == 2
+
+def test_window_span_splits_chain_of_quick_replies():
+    segmenter = Segmenter(window_seconds=30 * MINUTE)
+    messages = [(i * 9 * MINUTE, "deck quote") for i in range(5)]
+    assert [indices for indices, _ in segmenter.segment(messages)] == [[0, 1, 2, 3], [4]]
+
+def test_append_continues_or_starts_profile():
+    segmenter = Segmenter(reply_gap_seconds=0)
+    profile = segmenter.append(None, "booking an appointment for friday", 0)
+    assert isinstance(profile, SegmentProfile)
+    assert segmenter.append(profile, "can the appointment be earlier", MINUTE) is None
+    assert profile.message_count == 2
+    assert segmenter.append(profile, "refund my invoice", 2 * MINUTE) is not None
+
+@pytest.mark.parametrize("similarity", ["overlap", "jaccard", "minhash"])
+def test_similarity_methods_rank_related_text_higher(similarity):
+    segmenter = Segmenter(similarity=similarity)
+    profile = SegmentProfile()
+    profile.add(segmenter.features("quote for deck staining and repair"), 0)
+    related = segmenter.score(segmenter.features("deck staining quote"), profile)
+    unrelated = segmenter.score(segmenter.features("invoice payment failed"), profile)
+    assert related > unrelated
+    assert unrelated == 0.0
+
+def test_unknown_similarity_is_rejected():
+    with pytest.raises(ValueError):
+        Segmenter(similarity="cosine")
@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from communication_platform.services.spam_detector.reputation import ReputationCache, NEGATIVE
+
+def make_cache(check_result=(0, 1), external=0.9, **kwargs):
+    cache = ReputationCache("redis://unused", "https://api.example/lookup", **kwargs)
+    cache._check_redis = AsyncMock(return_value=check_result)
+    cache._store_redis = AsyncMock()
+    cache._fetch_external = AsyncMock(return_value=external)
+    return cache
+
+@pytest.mark.asyncio
+async def test_miss_goes_external_then_serves_from_local_tier():
+    cache = make_cache()
+    assert await cache.lookup("+15550001111") == 0.9
+    assert await cache.lookup("+15550001111") == 0.9
+    cache._check_redis.assert_awaited_once()
+    cache._fetch_external.assert_awaited_once_with("+15550001111")
+    cache._store_redis.assert_awaited_once_with("+15550001111", 0.9)
+    assert cache.stats()["local_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_redis_hit_skips_external_call():
+    cache = make_cache(check_result=(1, "0.25"))
+    assert await cache.lookup("+15550001111") == 0.25
+    cache._fetch_external.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_failures_and_rate_limits_are_negatively_cached():
+    failing = make_cache(external=None)
+    assert await failing.lookup("+15550002222") is None
+    assert await failing.lookup("+15550002222") is None
+    failing._fetch_external.assert_awaited_once()
+    failing._store_redis.assert_awaited_once_with("+15550002222", None)
+
+    limited = make_cache(check_result=(2, 11))
+    assert await limited.lookup("+15550003333") is None
+    assert await limited.lookup("+15550003333") is None
+    limited._check_redis.assert_awaited_once()
+    limited._fetch_external.assert_not_awaited()
+    assert limited.stats()["rate_limited"] == 1 and limited.stats()["negative_hits"] == 1
+
+    stored_negative = make_cache(check_result=(1, NEGATIVE))
+    assert await stored_negative.lookup("+15550004444") is None
+    stored_negative._fetch_external.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_of_one_number_are_coalesced():
+    cache = make_cache()
+    release = asyncio.Event()
+
+    async def slow_external(phone_number):
+        await release.wait()
+        return 0.4
+
+    cache._fetch_external = AsyncMock(side_effect=slow_external)
+    lookups = [asyncio.ensure_future(cache.lookup("+15550005555")) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*lookups) == [0.4] * 5
+    cache._fetch_external.assert_awaited_once()
+    assert cache.stats()["coalesced"] == 4
+
+@pytest.mark.asyncio
+async def test_redis_outage_falls_back_without_external_call():
+    cache = make_cache()
+    cache._check_redis = AsyncMock(side_effect=ConnectionError("redis down"))
+    assert await cache.lookup("+15550006666") is None
+    cache._fetch_external.assert_not_awaited()
+    assert cache.stats()["redis_errors"] == 1
@@ -0,0 +1,91 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import importlib
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from communication_platform.services.spam_detector import handlers, rule_store, ruleset
+from communication_platform.services.spam_detector.database import SpamRuleDB, SpamRulesetVersionDB
+from communication_platform.services.spam_detector.models import SpamRule
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+def keyword(pattern, weight=0.2):
+    return SpamRule(rule_type="keyword", pattern=pattern, weight=weight, description=pattern)
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SpamRuleDB.metadata.create_all(engine, tables=[SpamRuleDB.__table__, SpamRulesetVersionDB.__table__])
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(SpamRulesetVersionDB(id=1, version=1))
+        db.commit()
+    original = ruleset.get_active()
+    yield factory
+    ruleset.set_rules(original.ruleset.rules, version=original.version)
+
+def test_crud_bumps_version_and_applies_rules(session_factory):
+    with session_factory() as db:
+        created = rule_store.create_rule(db, keyword("lottery", 0.5))
+        assert created.rule_id is not None
+        assert rule_store.current_version(db) == 2
+        assert ruleset.get_active().version == 2
+        assert ruleset.get_ruleset().evaluate("lottery winner")[0] == 0.5
+
+        assert rule_store.update_rule(db, created.rule_id, keyword("jackpot", 0.7)).pattern == "jackpot"
+        assert ruleset.get_ruleset().evaluate("JACKPOT")[0] == 0.7
+        assert rule_store.current_version(db) == 3
+
+        assert rule_store.delete_rule(db, created.rule_id)
+        assert not rule_store.delete_rule(db, created.rule_id)
+        assert rule_store.list_rules(db) == []
+        assert ruleset.get_active().version == 4
+
+def test_invalid_rule_is_rejected_without_changing_anything(session_factory):
+    with session_factory() as db:
+        rule_store.replace_rules(db, [keyword("free"), keyword("cash")])
+        version = rule_store.current_version(db)
+        with pytest.raises(ValueError):
+            rule_store.create_rule(db, SpamRule(rule_type="pattern", pattern="(unclosed", weight=0.2, description=""))
+        with pytest.raises(ValueError):
+            rule_store.create_rule(db, keyword("heavy", 1.5))
+        assert rule_store.current_version(db) == version
+        assert [r.pattern for r in rule_store.list_rules(db)] == ["free", "cash"]
+
+def test_poller_recompiles_only_when_version_changes(session_factory, monkeypatch):
+    poller = rule_store.RulePoller(session_factory=session_factory)
+    assert poller.poll_once()
+    assert not poller.poll_once()
+    compiled = []
+    monkeypatch.setattr(rule_store, "set_rules", lambda rules, version: compiled.append(version))
+    with session_factory() as db:
+        db.add(SpamRuleDB(rule_type="keyword", pattern="prize", weight=0.2, description="prize"))
+        rule_store._bump_version(db)
+        db.commit()
+    assert poller.poll_once()
+    assert compiled == [2]
+
+def test_poller_keeps_current_rules_when_store_unreachable():
+    def broken_session():
+        raise RuntimeError("database down")
+    assert not rule_store.RulePoller(session_factory=broken_session).poll_once()
+
+def test_first_poll_after_import_loads_stored_rules(session_factory):
+    importlib.reload(handlers)
+    assert ruleset.get_active().version == 0
+    with session_factory() as db:
+        db.add(SpamRuleDB(rule_type="keyword", pattern="free", weight=0.2, description="Keyword: free"))
+        db.commit()
+    assert rule_store.RulePoller(session_factory=session_factory).poll_once()
+    active = ruleset.get_active()
+    assert active.version == 1
+    assert [r.pattern for r in active.ruleset.rules] == ["free"]
+    assert all(r.rule_id is not None for r in active.ruleset.rules)
@@ -0,0 +1,96 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import pytest
+from communication_platform.services.spam_detector.models import SpamRule
+from communication_platform.services.spam_detector import ruleset
+from communication_platform.services.spam_detector.ruleset import CompiledRuleset, KeywordAutomaton
+
+def keyword(pattern, weight=0.2):
+    return SpamRule(rule_type="keyword", pattern=pattern, weight=weight, description=pattern)
+
+def pattern(regex, weight=0.2):
+    return SpamRule(rule_type="pattern", pattern=regex, weight=weight, description=regex)
+
+def test_automaton_finds_overlapping_keywords_on_word_boundaries():
+    automaton = KeywordAutomaton([("win", 0), ("winner", 1), ("inner", 2), ("buy now", 3)])
+    hits = sorted(automaton.scan("winner! buy now, window"))
+    assert hits == [(0, 6, 1), (8, 15, 3)]
+    assert sorted(automaton.scan("win inner")) == [(0, 3, 0), (4, 9, 2)]
+
+def test_scan_returns_keyword_and_overlapping_pattern_hits():
+    compiled = CompiledRuleset([keyword("claim"), pattern(r"[A-Z]{5,}"), pattern(r"\b\d{10,}\b"), pattern(r"https?://[\w./-]+")])
+    hits = {(h.rule.pattern, h.start) for h in compiled.scan("CLAIM at http://x.co/12345678901")}
+    assert ("claim", 0) in hits and ("[A-Z]{5,}", 0) in hits
+    assert (r"https?://[\w./-]+", 9) in hits and (r"\b\d{10,}\b", 21) in hits
+
+def test_patterns_use_single_escapes():
+    compiled = CompiledRuleset([pattern(r"\b(?:\d{10,})\b"), pattern(r"http[s]?://[\w./-]+")])
+    score, reasons = compiled.evaluate("Call 5551234567890 or visit https://spam.example/win")
+    assert score == pytest.approx(0.4) and len(reasons) == 2
+    assert compiled.evaluate("order 12345") == (0.0, [])
+
+def test_each_rule_counts_once():
+    compiled = CompiledRuleset([keyword("free", 0.3), keyword("cash", 0.25)])
+    score, reasons = compiled.evaluate("free free FREE cash")
+    assert score == pytest.approx(0.55)
+    assert reasons == ["Keyword detected: 'free'", "Keyword detected: 'cash'"]
+
+def test_set_rules_swaps_atomically_and_rejects_invalid_rules():
+    original = ruleset.get_active()
+    try:
+        active = ruleset.set_rules([keyword("lottery", 0.9)])
+        assert active.version == original.version + 1
+        assert ruleset.get_ruleset().evaluate("You won the lottery")[0] == 0.9
+        with pytest.raises(ValueError):
+            ruleset.set_rules([pattern("(unclosed")])
+        with pytest.raises(ValueError):
+            ruleset.set_rules([SpamRule(rule_type="regex", pattern="x", weight=1, description="")])
+        assert ruleset.get_active() is active
+        assert ruleset.compile_ruleset([keyword("lottery", 0.9)]) is active.ruleset
+    finally:
+        ruleset.set_rules(original.ruleset.rules)
+
+def test_default_rules_score_messages():
+    from communication_platform.services.spam_detector.handlers import analyze_message_content
+    score, reasons = analyze_message_content("Call 5551234567890 now to claim your prize at https://spam.example/win")
+    assert "Pattern matched: \\b(?:\\d{10,})\\b" in reasons
+    assert "Pattern matched: http[s]?://[\\w./-]+" in reasons
+    assert "Keyword detected: 'claim'" in reasons and "Keyword detected: 'prize'" in reasons
+    assert score == 1.0
+    assert analyze_message_content("Can you fix the window on Tuesday?") == (0.0, [])
+
+def test_overlapping_patterns_all_fire():
+    compiled = CompiledRuleset([pattern(r"http[s]?://[\w./-]+"), pattern(r"https://bit\.ly"), pattern(r"[A-Z]{5,}"), pattern(r"CDE")])
+    score, reasons = compiled.evaluate("go to https://bit.ly/abc")
+    assert reasons == ["Pattern matched: http[s]?://[\\w./-]+", "Pattern matched: https://bit\\.ly"]
+    assert score == pytest.approx(0.4)
+    # a pattern that only matches inside another pattern's match
+    assert compiled.evaluate("ABCDEFG")[1] == ["Pattern matched: [A-Z]{5,}", "Pattern matched: CDE"]
+
+def test_dense_pattern_matches_are_reported_once_per_match():
+    compiled = CompiledRuleset([pattern(r"[A-Z]{5,}")])
+    hits = compiled.scan("A" * 20000)
+    assert [(h.start, h.end) for h in hits] == [(0, 20000)]
+
+def test_only_matching_patterns_are_searched_for_positions():
+    pytest.importorskip("re2")
+    rules = [pattern(rf"\bcode{i}\b") for i in range(500)] + [pattern(r"(?<=win )\d+")]
+    compiled = CompiledRuleset(rules)
+    # Everything but the lookbehind runs in the RE2 set
+    assert [index for index, _ in compiled._fallback] == [500]
+    searched = []
+    for index, compiled_pattern in list(compiled._re2_patterns.items()):
+        compiled._re2_patterns[index] = SearchRecorder(compiled_pattern, index, searched)
+    hits = {(h.rule.pattern, h.start) for h in compiled.scan("code7 and code42, win 100")}
+    assert hits == {(r"\bcode7\b", 0), (r"\bcode42\b", 10), (r"(?<=win )\d+", 22)}
+    assert sorted(searched) == [7, 42]
+
+class SearchRecorder:
+    def __init__(self, compiled, index, searched):
+        self.compiled, self.index, self.searched = compiled, index, searched
+
+    def finditer(self, text):
+        self.searched.append(self.index)
+        return self.compiled.finditer(text)
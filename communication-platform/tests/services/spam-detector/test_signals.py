@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import time
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from communication_platform.services.spam_detector.signals import SignalPipeline, SignalContext, SignalResult
+from communication_platform.services.spam_detector.models import Action
+
+CONTEXT = SignalContext("+15550001111", "hello", datetime(2024, 1, 1, 12, 0))
+
+def slow(score, delay, reasons=()):
+    async def signal(context):
+        await asyncio.sleep(delay)
+        return SignalResult(score, list(reasons))
+    return signal
+
+@pytest.mark.asyncio
+async def test_signals_run_concurrently_and_combine_as_weighted_mean():
+    pipeline = SignalPipeline(deadline=1.0)
+    pipeline.register("a", weight=0.5)(slow(1.0, 0.05, ["a fired"]))
+    pipeline.register("b", weight=0.3)(slow(0.0, 0.05))
+    pipeline.register("c", weight=0.2)(lambda context: SignalResult(0.5, ["c fired"]))
+    started = time.monotonic()
+    result = await pipeline.evaluate(CONTEXT)
+    assert time.monotonic() - started < 0.09
+    assert result.score == pytest.approx(0.6)
+    assert result.reasons == ["a fired", "c fired"]
+    assert result.scores == {"a": 1.0, "b": 0.0, "c": 0.5}
+
+@pytest.mark.asyncio
+async def test_late_signal_is_dropped_and_recorded():
+    pipeline = SignalPipeline(deadline=0.05)
+    pipeline.register("content", weight=0.5)(lambda context: SignalResult(0.8))
+    pipeline.register("lookup", weight=0.5)(slow(0.0, 5))
+    started = time.monotonic()
+    result = await pipeline.evaluate(CONTEXT)
+    assert time.monotonic() - started < 0.5
+    assert result.score == pytest.approx(0.8)
+    assert result.scores["lookup"] is None
+    assert result.reasons == ["Signal 'lookup' missed the 50ms deadline.", "Signal 'lookup' unavailable; excluded from score."]
+
+@pytest.mark.asyncio
+async def test_fallback_used_when_signal_is_late_fails_or_abstains():
+    async def failing(context):
+        raise RuntimeError("boom")
+    pipeline = SignalPipeline(deadline=0.05)
+    pipeline.register("late", weight=1.0, fallback=slow(0.2, 0, ["late fallback"]))(slow(0.9, 5))
+    pipeline.register("failing", weight=1.0, fallback=lambda context: SignalResult(0.4, ["failing fallback"]))(failing)
+    pipeline.register("abstains", weight=1.0, fallback=lambda context: SignalResult(0.6))(lambda context: None)
+    result = await pipeline.evaluate(CONTEXT)
+    assert result.scores == {"late": 0.2, "failing": 0.4, "abstains": 0.6}
+    assert result.reasons == ["Signal 'late' missed the 50ms deadline.", "late fallback", "failing fallback"]
+
+def test_duplicate_signal_names_are_rejected():
+    pipeline = SignalPipeline(deadline=1.0)
+    pipeline.register("a", weight=1.0)(lambda context: None)
+    with pytest.raises(ValueError):
+        pipeline.register("a", weight=1.0)(lambda context: None)
+
+@pytest.mark.asyncio
+async def test_evaluate_spam_falls_back_to_internal_reputation_when_lookup_is_late():
+    from communication_platform.services.spam_detector import handlers
+    async def hanging_lookup(phone_number):
+        await asyncio.sleep(5)
+    with patch.object(handlers, "check_external_spam_db", hanging_lookup), \
+            patch.object(handlers.spam_signals, "deadline", 0.05):
+        started = time.monotonic()
+        result = await handlers.evaluate_spam("+15550009999", "hello there", datetime(2024, 1, 1, 12, 0), None)
+    assert time.monotonic() - started < 0.5
+    # content 0.0, internal reputation 0.9, timing 0.1
+    assert result.score == pytest.approx(0.3 * 0.9 + 0.2 * 0.1)
+    assert "Signal 'reputation' missed the 50ms deadline." in result.reasons
+    assert "Phone number has poor reputation." in result.reasons
+    assert "External spam DB unavailable, used internal rules." in result.reasons
+
+@pytest.mark.asyncio
+async def test_evaluate_spam_flags_sender_over_velocity_limit():
+    from communication_platform.services.spam_detector import handlers
+    async def unknown_reputation(phone_number):
+        return None
+    start = datetime(2024, 1, 1, 12, 0)
+    with patch.object(handlers, "check_external_spam_db", unknown_reputation):
+        for i in range(30):
+            result = await handlers.evaluate_spam("+15550004444", "see you at the meeting", start + timedelta(seconds=i * 2), None)
+    # content 0.0, internal reputation 0.1, timing 1.0: well under the FLAG threshold on its own
+    assert result.score == pytest.approx(0.3 * 0.1 + 0.2 * 1.0)
+    assert result.action == Action.FLAG
+    assert result.is_spam
+    assert "High sending rate: 30 messages in the last minute." in result.reasons
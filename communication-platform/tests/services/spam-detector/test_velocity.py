@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import pytest
+from datetime import datetime, timedelta
+from communication_platform.services.spam_detector.velocity import RingCounter, VelocityTracker, VelocityLimits
+
+START = datetime(2024, 1, 1, 12, 0)
+
+def test_ring_counter_slides_and_ignores_stale_events():
+    counter = RingCounter(1, 60)
+    for second in range(10):
+        counter.add(1000 + second)
+    assert counter.total == 10
+    assert counter.recent(5) == 5
+    counter.add(1065)  # the first six seconds fall out of the window
+    assert counter.total == 5
+    counter.add(1000)  # older than the window
+    assert counter.total == 5
+    counter.add(5000)  # long silence clears everything
+    assert counter.total == 1
+
+def test_tracker_counts_each_window_per_sender():
+    tracker = VelocityTracker()
+    for minute in range(90):
+        velocity = tracker.record("+15550001111", START + timedelta(minutes=minute))
+    assert velocity.per_minute == 1
+    assert velocity.per_hour == 60
+    assert velocity.per_day == 90
+    assert tracker.record("+15550002222", START).per_day == 1
+    assert len(tracker) == 2
+
+def test_blast_sender_scores_high_with_reasons():
+    tracker = VelocityTracker(VelocityLimits(per_minute=20, burst=10, burst_seconds=10))
+    for i in range(30):
+        velocity = tracker.record("+15550001111", START + timedelta(seconds=i * 0.2))
+    assert velocity.burst == 30
+    score, reasons = tracker.score(velocity)
+    assert score == 1.0
+    assert reasons == [
+        "Burst of 30 messages within 10s.",
+        "High sending rate: 30 messages in the last minute.",
+    ]
+
+def test_occasional_sender_scores_low():
+    tracker = VelocityTracker()
+    for i in range(3):
+        velocity = tracker.record("+15550001111", START + timedelta(minutes=i * 10))
+    score, reasons = tracker.score(velocity)
+    assert score < 0.2
+    assert reasons == []
+
+def test_least_recently_seen_senders_are_evicted():
+    tracker = VelocityTracker(max_senders=2)
+    for phone_number in ("+1", "+2", "+3"):
+        tracker.record(phone_number, START)
+    assert len(tracker) == 2
+    assert tracker.record("+1", START).per_minute == 1
+
+def test_invalid_burst_window_is_rejected():
+    with pytest.raises(ValueError):
+        VelocityTracker(VelocityLimits(burst_seconds=120))
+
+def test_timing_pattern_check_flags_blast_sender():
+    from communication_platform.services.spam_detector import handlers
+    for i in range(25):
+        score, reasons = handlers.check_timing_patterns("+15550003333", START + timedelta(seconds=i))
+    assert score == 1.0
+    assert "High sending rate: 25 messages in the last minute." in reasons
@@ -0,0 +1,59 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+
+import pytest
+from uuid import uuid4
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock
+from communication_platform.services.twilio_monitor import handlers
+from communication_platform.services.twilio_monitor.models import IncomingMessageRequest
+
+def make_request(from_phone="+1234567890", content="Hello"):
+    return IncomingMessageRequest(**{"type": "sms", "from": from_phone, "to": "+1098765432", "content": content})
+
+@pytest.mark.asyncio
+async def test_batch_stores_valid_items_in_one_call():
+    requests = [make_request(), make_request(from_phone="notaphone"), make_request(content="<script>x</script>hi")]
+    db = MagicMock()
+    with patch.object(handlers, "store_messages_bulk") as mock_bulk:
+        items = await handlers.process_incoming_batch(requests, uuid4(), db)
+    mock_bulk.assert_called_once()
+    stored = mock_bulk.call_args.args[0]
+    assert [m.content for m in stored] == ["Hello", "hi"]
+    assert [item.status for item in items] == ["received", "error", "received"]
+    assert items[1].reason == "Invalid from_phone format"
+    assert items[0].message_id == str(stored[0].message_id)
+
+@pytest.mark.asyncio
+async def test_batch_store_failure_marks_items_failed():
+    db = MagicMock()
+    with patch.object(handlers, "store_messages_bulk", side_effect=Exception("db down")):
+        items = await handlers.process_incoming_batch([make_request(), make_request()], uuid4(), db)
+    db.rollback.assert_called_once()
+    assert all(item.status == "error" and item.message_id is None for item in items)
+
+@pytest.mark.asyncio
+async def test_batch_with_no_valid_items_skips_store():
+    with patch.object(handlers, "store_messages_bulk") as mock_bulk:
+        items = await handlers.process_incoming_batch([make_request(from_phone="bad")], uuid4(), MagicMock())
+    mock_bulk.assert_not_called()
+    assert items[0].status == "error"
+
+@pytest.mark.asyncio
+async def test_malformed_item_fails_alone():
+    raw = [
+        {"type": "sms", "from": "+1234567890", "to": "+1098765432", "content": "Hello"},
+        {"type": "sms", "from": "+1234567890", "content": "no recipient"},
+        "not an object",
+    ]
+    with patch.object(handlers, "store_messages_bulk") as mock_bulk:
+        items = await handlers.process_incoming_batch(raw, uuid4(), MagicMock())
+    assert len(mock_bulk.call_args.args[0]) == 1
+    assert [item.status for item in items] == ["received", "error", "error"]
+    assert "to" in items[1].reason
+
+def test_naive_send_time_is_utc():
+    request = IncomingMessageRequest(**{"type": "sms", "from": "+1234567890", "to": "+1098765432", "content": "Hi", "timestamp": "2024-01-01T12:00:00"})
+    message, _ = handlers.build_message(request, 0.0)
+    assert message.timestamp == datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc).timestamp()
@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from communication_platform.shared import event_publisher, events
+from uuid import uuid4
+from datetime import datetime
+
+def make_event():
+    return events.MessageReceivedEvent(
+        event_id=uuid4(),
+        event_type=events.EventType.MESSAGE_RECEIVED,
+        timestamp=datetime.utcnow(),
+        trace_id=uuid4(),
+        source_service="test_service",
+        payload={"foo": "bar"}
+    )
+
+def connected_publisher(exchange, **kwargs):
+    publisher = event_publisher.AsyncEventPublisher("amqp://test", **kwargs)
+    publisher.exchange = exchange
+    publisher._queue = asyncio.Queue()
+    publisher._flusher = asyncio.create_task(publisher._flush_loop())
+    return publisher
+
+@pytest.mark.asyncio
+async def test_publish_batches_within_window():
+    exchange = AsyncMock()
+    publisher = connected_publisher(exchange, confirm_window=0.05, max_batch_size=10)
+    futures = [publisher.publish_nowait(make_event(), "message.received.sms") for _ in range(3)]
+    assert await asyncio.gather(*futures) == [True, True, True]
+    assert exchange.publish.await_count == 3
+    await publisher.close()
+
+@pytest.mark.asyncio
+async def test_publish_reports_per_event_failure():
+    exchange = AsyncMock()
+    exchange.publish.side_effect = [None, Exception("nack"), None]
+    publisher = connected_publisher(exchange, confirm_window=0.05)
+    results = await asyncio.gather(*(publisher.publish(make_event(), "message.received.sms") for _ in range(3)))
+    assert results == [True, False, True]
+    await publisher.close()
+
+@pytest.mark.asyncio
+async def test_publish_without_connection_returns_false():
+    publisher = event_publisher.AsyncEventPublisher("amqp://test")
+    assert await publisher.publish(make_event(), "message.received.sms") is False
+
+@pytest.mark.asyncio
+async def test_unconfirmed_publish_times_out():
+    async def stalled(message, routing_key):
+        await asyncio.sleep(5)
+    exchange = AsyncMock()
+    exchange.publish.side_effect = stalled
+    publisher = connected_publisher(exchange, confirm_window=0.01, confirm_timeout=0.05)
+    assert await asyncio.wait_for(publisher.publish(make_event(), "message.received.sms"), 1) is False
+    await publisher.close()
+
+@pytest.mark.asyncio
+async def test_close_gives_up_on_stalled_events():
+    async def stalled(message, routing_key):
+        await asyncio.sleep(5)
+    exchange = AsyncMock()
+    exchange.publish.side_effect = stalled
+    publisher = connected_publisher(exchange, confirm_window=0.01, max_batch_size=1, confirm_timeout=5, close_timeout=0.05)
+    futures = [publisher.publish_nowait(make_event(), "message.received.sms") for _ in range(2)]
+    await asyncio.wait_for(publisher.close(), 1)
+    assert [future.result() for future in futures] == [False, False]
@@ -0,0 +1,134 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+import json
+import asyncio
+import time
+import threading
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from communication_platform.shared import event_subscriber
+
+def delivery(tag, routing_key="message.received.sms"):
+    return SimpleNamespace(delivery_tag=tag, routing_key=routing_key)
+
+def body(tag):
+    return json.dumps({"payload": {"tag": tag}}).encode()
+
+@pytest.fixture
+def connection():
+    with patch("communication_platform.shared.event_subscriber.pika.BlockingConnection") as MockConnection:
+        conn = MockConnection.return_value
+        conn.add_callback_threadsafe.side_effect = lambda cb: cb()
+        yield conn
+
+def run_deliveries(subscriber, deliveries, expected_acks):
+    channel = subscriber.channel
+
+    def fake_start_consuming():
+        callback = channel.basic_consume.call_args.kwargs["on_message_callback"]
+        for method in deliveries:
+            callback(channel, method, None, body(method.delivery_tag))
+        deadline = time.time() + 5
+        while channel.basic_ack.call_count + channel.basic_nack.call_count < expected_acks and time.time() < deadline:
+            time.sleep(0.01)
+
+    channel.start_consuming.side_effect = fake_start_consuming
+    subscriber.start_consuming()
+
+def test_prefetch_defaults_to_worker_count(connection):
+    subscriber = event_subscriber.EventSubscriber("amqp://test", "svc", workers=3)
+    subscriber.subscribe("message.received.sms", lambda event_data: None)
+    run_deliveries(subscriber, [], 0)
+    subscriber.channel.basic_qos.assert_called_once_with(prefetch_count=3)
+
+def test_out_of_order_completion_acks_each_tag(connection):
+    second_done = threading.Event()
+    order = []
+
+    def handler(event_data):
+        if event_data["payload"]["tag"] == 1:
+            second_done.wait(2)
+            order.append("first-done")
+        else:
+            order.append("second-done")
+            second_done.set()
+
+    subscriber = event_subscriber.EventSubscriber("amqp://test", "svc", prefetch_count=4, workers=2)
+    subscriber.subscribe("message.received.sms", handler)
+    run_deliveries(subscriber, [delivery(1), delivery(2)], 2)
+    acked = [c.kwargs["delivery_tag"] for c in subscriber.channel.basic_ack.call_args_list]
+    assert acked == [2, 1]
+    assert order == ["second-done", "first-done"]
+
+def test_failed_handler_is_nacked(connection):
+    def handler(event_data):
+        raise RuntimeError("boom")
+
+    subscriber = event_subscriber.EventSubscriber("amqp://test", "svc")
+    subscriber.subscribe("message.received.sms", handler)
+    run_deliveries(subscriber, [delivery(7)], 1)
+    subscriber.channel.basic_nack.assert_called_once_with(delivery_tag=7, requeue=False)
+    subscriber.channel.basic_ack.assert_not_called()
+
+def test_coroutine_handler_is_awaited_before_ack(connection):
+    seen = []
+
+    async def handle(event_data):
+        await asyncio.sleep(0)
+        seen.append((event_data["payload"]["tag"], id(asyncio.get_running_loop())))
+
+    subscriber = event_subscriber.EventSubscriber("amqp://test", "svc")
+    subscriber.subscribe("message.received.sms", lambda event_data: handle(event_data))
+    run_deliveries(subscriber, [delivery(1), delivery(2)], 2)
+    assert [tag for tag, _ in seen] == [1, 2]
+    # The same loop is reused for every message on the consuming thread
+    assert len({loop_id for _, loop_id in seen}) == 1
+    assert [c.kwargs["delivery_tag"] for c in subscriber.channel.basic_ack.call_args_list] == [1, 2]
+
+def run_batched_deliveries(subscriber, deliveries, expected_acks):
+    """Like run_deliveries, but fires pending call_later timers once deliveries stop."""
+    timers = []
+    subscriber.connection.call_later.side_effect = lambda delay, cb: timers.append(cb) or len(timers)
+    channel = subscriber.channel
+
+    def fake_start_consuming():
+        callback = channel.basic_consume.call_args.kwargs["on_message_callback"]
+        for method in deliveries:
+            callback(channel, method, None, body(method.delivery_tag))
+        while timers:
+            timers.pop(0)()
+        deadline = time.time() + 5
+        while channel.basic_ack.call_count + channel.basic_nack.call_count < expected_acks and time.time() < deadline:
+            time.sleep(0.01)
+
+    channel.start_consuming.side_effect = fake_start_consuming
+    subscriber.start_consuming()
+
+def test_batch_flushes_on_size_and_timer(connection):
+    batches = []
+    subscriber = event_subscriber.EventSubscriber("amqp://test", "svc")
+    subscriber.subscribe_batch("message.received.*", lambda events: batches.append([e["payload"]["tag"] for e in events]), max_batch=2, max_wait=0.05)
+    run_batched_deliveries(subscriber, [delivery(1), delivery(2), delivery(3)], 3)
+    assert batches == [[1, 2], [3]]
+    assert [c.kwargs["delivery_tag"] for c in subscriber.channel.basic_ack.call_args_list] == [1, 2, 3]
+    # The size-triggered flush cancelled the timer armed by the first delivery
+    subscriber.connection.remove_timeout.assert_called_once()
+
+def test_batch_prefetch_covers_a_batch_per_worker(connection):
+    subscriber = event_subscriber.EventSubscriber("amqp://test", "svc", prefetch_count=4, workers=2)
+    subscriber.subscribe_batch("message.received.*", lambda events: None, max_batch=10)
+    run_batched_deliveries(subscriber, [], 0)
+    subscriber.channel.basic_qos.assert_called_once_with(prefetch_count=20)
+
+def test_failed_batch_nacks_every_event(connection):
+    async def handle(events):
+        raise RuntimeError("boom")
+
+    subscriber = event_subscriber.EventSubscriber("amqp://test", "svc", workers=2)
+    subscriber.subscribe_batch("message.received.*", handle, max_batch=2)
+    run_batched_deliveries(subscriber, [delivery(1), delivery(2)], 2)
+    assert sorted(c.kwargs["delivery_tag"] for c in subscriber.channel.basic_nack.call_args_list) == [1, 2]
+    subscriber.channel.basic_ack.assert_not_called()
@@ -0,0 +1,68 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from communication_platform.shared import outbox, events
+from uuid import uuid4
+from datetime import datetime
+
+def make_row(row_id):
+    event = events.MessageReceivedEvent(
+        event_id=uuid4(),
+        event_type=events.EventType.MESSAGE_RECEIVED,
+        timestamp=datetime.utcnow(),
+        trace_id=uuid4(),
+        source_service="twilio-monitor",
+        payload={"message_id": str(uuid4())}
+    )
+    return outbox.OutboxEventDB(
+        id=row_id,
+        event_id=event.event_id,
+        event_type=event.event_type.value,
+        routing_key="message.received.sms",
+        body=event.model_dump_json(),
+        attempts=0,
+    )
+
+def fake_publisher(results):
+    publisher = MagicMock()
+    outcomes = iter(results)
+
+    def publish_nowait(event, routing_key):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(next(outcomes))
+        return future
+
+    publisher.publish_nowait.side_effect = publish_nowait
+    return publisher
+
+def test_add_outbox_event_does_not_commit():
+    db = MagicMock()
+    row = make_row(None)
+    event = events.BaseEvent.model_validate_json(row.body)
+    staged = outbox.add_outbox_event(db, event, "message.received.sms")
+    db.add.assert_called_once_with(staged)
+    db.commit.assert_not_called()
+    assert staged.event_id == event.event_id
+
+@pytest.mark.asyncio
+async def test_drain_deletes_confirmed_and_retries_failed():
+    rows = [make_row(1), make_row(2), make_row(3)]
+    db = MagicMock()
+    relay = outbox.OutboxRelay(fake_publisher([True, False, True]), session_factory=lambda: db)
+    relay._claim_batch = MagicMock(return_value=rows)
+    relay._finish_batch = MagicMock()
+    assert await relay.drain_once() == 2
+    relay._finish_batch.assert_called_once_with(db, [1, 3], [rows[1]])
+    db.close.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_drain_empty_outbox():
+    db = MagicMock()
+    relay = outbox.OutboxRelay(fake_publisher([]), session_factory=lambda: db)
+    relay._claim_batch = MagicMock(return_value=[])
+    assert await relay.drain_once() == 0
+    db.rollback.assert_called_once()
@@ -0,0 +1,54 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from communication_platform.shared import database
+from communication_platform.shared.config import DatabasePoolConfig
+
+def make_engine(metrics, **pool_kwargs):
+    return create_engine(
+        "sqlite:///:memory:",
+        poolclass=database._instrumented(QueuePool, metrics),
+        **pool_kwargs
+    )
+
+def test_checkouts_and_overflow_are_recorded():
+    metrics = database.PoolMetrics("test", slow_checkout_ms=10_000)
+    engine = make_engine(metrics, pool_size=1, max_overflow=1)
+    first = engine.connect()
+    second = engine.connect()
+    snapshot = metrics.snapshot()
+    assert snapshot["checkouts"] == 2
+    assert snapshot["overflow_high_water"] == 1
+    assert engine.pool.checkedout() == 2
+    first.close()
+    second.close()
+
+def test_checkout_timeout_is_counted():
+    metrics = database.PoolMetrics("test", slow_checkout_ms=10_000)
+    engine = make_engine(metrics, pool_size=1, max_overflow=0, pool_timeout=0.01)
+    held = engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    assert metrics.snapshot()["checkout_timeouts"] == 1
+    held.close()
+
+def test_metrics_survive_pool_recreate():
+    metrics = database.PoolMetrics("test", slow_checkout_ms=10_000)
+    engine = make_engine(metrics)
+    engine.dispose()
+    engine.connect().close()
+    assert engine.pool.metrics is metrics
+    assert metrics.snapshot()["checkouts"] == 1
+
+def test_pool_config_env_overrides(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "12")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "true")
+    config = DatabasePoolConfig.from_env(DatabasePoolConfig(max_overflow=3))
+    assert config.pool_size == 12
+    assert config.pool_pre_ping is True
+    assert config.max_overflow == 3
@@ -0,0 +1,50 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+import pytest
+from communication_platform.shared.topic_router import TopicRouter
+
+def handler_a(event_data):
+    pass
+
+def handler_b(event_data):
+    pass
+
+@pytest.mark.parametrize("pattern,routing_key,expected", [
+    ("message.received.*", "message.received.sms", True),
+    ("message.received.*", "message.received.sms.trial", False),
+    ("message.received.*", "message.received", False),
+    ("conversation.categorized.#", "conversation.categorized.new_lead.87", True),
+    ("conversation.categorized.#", "conversation.categorized", True),
+    ("#", "anything.at.all", True),
+    ("*.updated.*", "conversation.updated.created", True),
+    ("conversation.#.87", "conversation.categorized.new_lead.87", True),
+    ("conversation.#.87", "conversation.categorized.new_lead.88", False),
+    ("call.missed", "call.missed", True),
+    ("call.missed", "call.answered", False),
+])
+def test_wildcard_matching(pattern, routing_key, expected):
+    router = TopicRouter()
+    router.add(pattern, handler_a)
+    assert (router.match(routing_key) == (handler_a,)) is expected
+
+def test_multiple_handlers_in_subscription_order():
+    router = TopicRouter()
+    router.add("conversation.categorized.#", handler_b)
+    router.add("conversation.categorized.*.*", handler_a)
+    router.add("conversation.categorized.#", handler_a)
+    assert router.match("conversation.categorized.new_lead.87") == (handler_b, handler_a, handler_a)
+
+def test_overlapping_hash_paths_do_not_duplicate():
+    router = TopicRouter()
+    router.add("a.#.#", handler_a)
+    assert router.match("a.b.c") == (handler_a,)
+
+def test_resolution_is_cached_and_reset_on_subscribe():
+    router = TopicRouter()
+    router.add("message.received.*", handler_a)
+    first = router.match("message.received.sms")
+    assert router.match("message.received.sms") is first
+    router.add("message.#", handler_b)
+    assert router.match("message.received.sms") == (handler_a, handler_b)